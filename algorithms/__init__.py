@@ -1,7 +1,12 @@
 from algorithms.measurements import calculate_polygon_area, calculate_perimeter, calculate_wall_surface
+from algorithms.geometry import PolygonMetrics, polygon_metrics, batch_polygon_metrics
+from algorithms.spatial import GridIndex, bbox_of, point_in_polygon
+from algorithms.planar import PlanarFace, planar_faces
 from algorithms.pricing import apply_tier_coefficient, calculate_line_total, calculate_quote_totals
 
 __all__ = [
     'calculate_polygon_area', 'calculate_perimeter', 'calculate_wall_surface',
+    'PolygonMetrics', 'polygon_metrics', 'batch_polygon_metrics',
+    'GridIndex', 'bbox_of', 'point_in_polygon', 'PlanarFace', 'planar_faces',
     'apply_tier_coefficient', 'calculate_line_total', 'calculate_quote_totals'
 ]
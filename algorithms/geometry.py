@@ -0,0 +1,110 @@
+from collections import namedtuple
+import numpy as np
+
+
+PolygonMetrics = namedtuple('PolygonMetrics', ['area', 'perimeter', 'centroid', 'bbox'])
+
+EMPTY_METRICS = PolygonMetrics(0.0, 0.0, None, None)
+
+
+def to_coords(points):
+    """
+    Packs a polygon into an (n, 2) float array.
+    Accepts a list of {'x', 'y'} dicts (the format stored in polygon_data),
+    a list of (x, y) pairs or an existing array.
+    """
+    if points is None or len(points) == 0:
+        return np.empty((0, 2))
+    if isinstance(points, np.ndarray):
+        return points.astype(float, copy=False).reshape(-1, 2)
+    if isinstance(points[0], dict):
+        return np.array([(p['x'], p['y']) for p in points], dtype=float)
+    return np.asarray(points, dtype=float).reshape(-1, 2)
+
+
+def pack_polygons(polygons):
+    """Concatenates polygons into one coordinate array plus per-polygon start offsets and sizes."""
+    arrays = [to_coords(points) for points in polygons]
+    sizes = np.array([len(a) for a in arrays], dtype=np.intp)
+    starts = np.zeros(len(arrays), dtype=np.intp)
+    if len(arrays) > 1:
+        starts[1:] = np.cumsum(sizes)[:-1]
+    coords = np.concatenate(arrays) if arrays else np.empty((0, 2))
+    return coords, starts, sizes
+
+
+def batch_polygon_metrics(polygons, scale_factor=1.0):
+    """
+    Area, perimeter, centroid and bounding box of many polygons in one vectorized pass.
+
+    `scale_factor` converts plan units to meters (area is scaled by its square);
+    centroid and bbox ((min_x, min_y, max_x, max_y)) stay in plan units.
+    Polygons are implicitly closed. Fewer than 3 vertices give a zero area,
+    fewer than 2 a zero perimeter and no centroid/bbox.
+    """
+    coords, starts, sizes = pack_polygons(polygons)
+    results = [EMPTY_METRICS] * len(sizes)
+
+    valid = np.flatnonzero(sizes > 0)
+    if not len(valid):
+        return results
+
+    starts, sizes = starts[valid], sizes[valid]
+    x, y = coords[:, 0], coords[:, 1]
+
+    # Index of the next vertex, wrapping each polygon's last vertex to its first
+    following = np.arange(1, len(coords) + 1)
+    following[starts + sizes - 1] = starts
+    x_next, y_next = x[following], y[following]
+
+    cross = x * y_next - x_next * y
+    segments = np.hypot(x_next - x, y_next - y)
+
+    doubled_area = np.add.reduceat(cross, starts)
+    perimeter = np.add.reduceat(segments, starts)
+    centroid_x = np.add.reduceat((x + x_next) * cross, starts)
+    centroid_y = np.add.reduceat((y + y_next) * cross, starts)
+    mean_x = np.add.reduceat(x, starts) / sizes
+    mean_y = np.add.reduceat(y, starts) / sizes
+    min_x, min_y = np.minimum.reduceat(x, starts), np.minimum.reduceat(y, starts)
+    max_x, max_y = np.maximum.reduceat(x, starts), np.maximum.reduceat(y, starts)
+
+    has_area = (sizes >= 3) & (np.abs(doubled_area) > 1e-12)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        centroid_x = np.where(has_area, centroid_x / (3 * doubled_area), mean_x)
+        centroid_y = np.where(has_area, centroid_y / (3 * doubled_area), mean_y)
+
+    area = np.where(sizes >= 3, np.abs(doubled_area) / 2, 0.0) * scale_factor ** 2
+    perimeter = np.where(sizes >= 2, perimeter, 0.0) * scale_factor
+
+    for k, index in enumerate(valid):
+        results[index] = PolygonMetrics(
+            area=float(area[k]),
+            perimeter=float(perimeter[k]),
+            centroid=(float(centroid_x[k]), float(centroid_y[k])),
+            bbox=(float(min_x[k]), float(min_y[k]), float(max_x[k]), float(max_y[k]))
+        )
+
+    return results
+
+
+def polygon_metrics(points, scale_factor=1.0):
+    return batch_polygon_metrics([points], scale_factor)[0]
+
+
+def batch_polyline_lengths(polylines, scale_factor=1.0):
+    """Length of open polylines (no closing segment), vectorized like batch_polygon_metrics."""
+    coords, starts, sizes = pack_polygons(polylines)
+    lengths = np.zeros(len(sizes))
+
+    valid = np.flatnonzero(sizes >= 2)
+    if not len(valid):
+        return lengths.tolist()
+
+    segments = np.hypot(np.diff(coords[:, 0]), np.diff(coords[:, 1]))
+    # Drop the segments that would join one polyline to the next
+    segments = np.append(segments, 0.0)
+    segments[starts + sizes - 1] = 0.0
+
+    lengths[valid] = np.add.reduceat(segments, starts[valid]) * scale_factor
+    return lengths.tolist()
@@ -1,22 +1,13 @@
 import math
 from decimal import Decimal
+from algorithms.geometry import polygon_metrics
 
 
 def calculate_polygon_area(points, scale_factor=1.0):
     if not points or len(points) < 3:
         return Decimal('0')
     
-    n = len(points)
-    area = 0.0
-    
-    for i in range(n):
-        j = (i + 1) % n
-        area += points[i]['x'] * points[j]['y']
-        area -= points[j]['x'] * points[i]['y']
-    
-    area = abs(area) / 2.0
-    
-    area_real = area * (scale_factor ** 2)
+    area_real = polygon_metrics(points, scale_factor).area
     
     return Decimal(str(round(area_real, 4)))
 
@@ -25,16 +16,7 @@ def calculate_perimeter(points, scale_factor=1.0):
     if not points or len(points) < 2:
         return Decimal('0')
     
-    perimeter = 0.0
-    n = len(points)
-    
-    for i in range(n):
-        j = (i + 1) % n
-        dx = points[j]['x'] - points[i]['x']
-        dy = points[j]['y'] - points[i]['y']
-        perimeter += math.sqrt(dx**2 + dy**2)
-    
-    perimeter_real = perimeter * scale_factor
+    perimeter_real = polygon_metrics(points, scale_factor).perimeter
     
     return Decimal(str(round(perimeter_real, 4)))
 
@@ -0,0 +1,174 @@
+import math
+from collections import defaultdict, namedtuple
+from algorithms.spatial import GridIndex, bbox_of, point_in_polygon
+
+
+PlanarFace = namedtuple('PlanarFace', ['points', 'area', 'holes'])
+
+
+def _split_params(p1, p2, q1, q2, tolerance):
+    """
+    Positions (0..1 along p1-p2) where segment q1-q2 crosses or touches
+    segment p1-p2, including endpoints of q lying within tolerance of it.
+    """
+    dx, dy = p2[0] - p1[0], p2[1] - p1[1]
+    ex, ey = q2[0] - q1[0], q2[1] - q1[1]
+    length = math.hypot(dx, dy)
+    params = []
+
+    denominator = dx * ey - dy * ex
+    if abs(denominator) > 1e-12:
+        t = ((q1[0] - p1[0]) * ey - (q1[1] - p1[1]) * ex) / denominator
+        u = ((q1[0] - p1[0]) * dy - (q1[1] - p1[1]) * dx) / denominator
+        slack_t = tolerance / length
+        slack_u = tolerance / max(math.hypot(ex, ey), 1e-12)
+        if -slack_t <= t <= 1 + slack_t and -slack_u <= u <= 1 + slack_u:
+            params.append(min(1.0, max(0.0, t)))
+
+    # T-junctions and collinear overlaps: endpoints of q close to p
+    for q in (q1, q2):
+        t = ((q[0] - p1[0]) * dx + (q[1] - p1[1]) * dy) / (length * length)
+        if 0 < t < 1 and abs((q[0] - p1[0]) * dy - (q[1] - p1[1]) * dx) / length <= tolerance:
+            params.append(t)
+    return params
+
+
+def _drop_collinear(points, tolerance):
+    """Removes vertices lying on the line through their neighbours."""
+    kept = []
+    count = len(points)
+    for i, point in enumerate(points):
+        previous, following = points[i - 1], points[(i + 1) % count]
+        length = math.dist(previous, following)
+        cross = (point[0] - previous[0]) * (following[1] - previous[1]) - (point[1] - previous[1]) * (following[0] - previous[0])
+        if length == 0 or abs(cross) / length > tolerance / 4:
+            kept.append(point)
+    return kept if len(kept) >= 3 else points
+
+
+def planar_faces(segments, tolerance=1.0):
+    """
+    Bounded faces of the planar graph formed by line segments.
+
+    Segments are split where they cross or where an endpoint lies on another
+    segment, endpoints closer than `tolerance` are snapped together (both
+    through a GridIndex, so only neighbouring segments are compared),
+    dangling edges are pruned, and faces are traced by always taking the
+    next edge clockwise.
+
+    Returns PlanarFace tuples for the bounded faces. The outer boundary of a
+    connected component drawn inside a face (an inner wall outline, a
+    column) is one of its holes, and `area` is net of them.
+    """
+    segments = [(tuple(a), tuple(b)) for a, b in segments if math.dist(a, b) > tolerance]
+    if not segments:
+        return []
+
+    index = GridIndex.for_extent(bbox_of([p for s in segments for p in s]), len(segments))
+    for position, (a, b) in enumerate(segments):
+        index.insert(position, (min(a[0], b[0]) - tolerance, min(a[1], b[1]) - tolerance,
+                                max(a[0], b[0]) + tolerance, max(a[1], b[1]) + tolerance))
+
+    # Node snapping: each point joins the first node found within tolerance
+    nodes = []
+    node_index = GridIndex(max(tolerance * 4, index.cell_size / 4))
+
+    def node_for(point):
+        for candidate in node_index.query_point(point[0], point[1], tolerance):
+            if math.dist(nodes[candidate], point) <= tolerance:
+                return candidate
+        nodes.append(point)
+        node_index.insert(len(nodes) - 1, (point[0], point[1], point[0], point[1]))
+        return len(nodes) - 1
+
+    edges = set()
+    for position, (a, b) in enumerate(segments):
+        params = {0.0, 1.0}
+        for other in index.query(index.boxes[position]):
+            if other != position:
+                params.update(_split_params(a, b, *segments[other], tolerance))
+
+        chain = []
+        for t in sorted(params):
+            node = node_for((a[0] + (b[0] - a[0]) * t, a[1] + (b[1] - a[1]) * t))
+            if not chain or chain[-1] != node:
+                chain.append(node)
+        for u, v in zip(chain, chain[1:]):
+            if u != v:
+                edges.add((min(u, v), max(u, v)))
+
+    adjacency = defaultdict(set)
+    for u, v in edges:
+        adjacency[u].add(v)
+        adjacency[v].add(u)
+
+    # Dangling edges never bound a face
+    stack = [node for node, neighbours in adjacency.items() if len(neighbours) < 2]
+    while stack:
+        node = stack.pop()
+        for neighbour in adjacency.pop(node, ()):
+            adjacency[neighbour].discard(node)
+            if len(adjacency[neighbour]) < 2:
+                stack.append(neighbour)
+
+    ordered = {
+        node: sorted(neighbours, key=lambda n: math.atan2(nodes[n][1] - nodes[node][1], nodes[n][0] - nodes[node][0]))
+        for node, neighbours in adjacency.items() if neighbours
+    }
+
+    component = {}
+    for node in ordered:
+        if node in component:
+            continue
+        component[node] = node
+        stack = [node]
+        while stack:
+            for neighbour in ordered[stack.pop()]:
+                if neighbour not in component:
+                    component[neighbour] = node
+                    stack.append(neighbour)
+
+    faces = []
+    boundaries = []
+    visited = set()
+    for start in ordered:
+        for first in ordered[start]:
+            if (start, first) in visited:
+                continue
+
+            face = []
+            u, v = start, first
+            while (u, v) not in visited:
+                visited.add((u, v))
+                face.append(u)
+                around = ordered[v]
+                # Next edge clockwise from the one we arrived by
+                u, v = v, around[(around.index(u) - 1) % len(around)]
+
+            points = _drop_collinear([nodes[n] for n in face], tolerance)
+            area = sum(x1 * y2 - x2 * y1 for (x1, y1), (x2, y2) in zip(points, points[1:] + points[:1])) / 2
+            # With this turn rule bounded faces come out with a positive area;
+            # each component's outer boundary is traced the other way round
+            if area > 0:
+                faces.append((points, area, component[start]))
+            else:
+                boundaries.append((points, -area, component[start]))
+
+    face_index = GridIndex.for_extent(bbox_of(nodes), len(faces))
+    for position, (points, _, _) in enumerate(faces):
+        face_index.insert(position, bbox_of(points))
+
+    holes = defaultdict(list)
+    for points, area, owner in boundaries:
+        x, y = points[0]
+        containers = [
+            position for position in face_index.query_point(x, y)
+            if faces[position][2] != owner and point_in_polygon(x, y, faces[position][0])
+        ]
+        if containers:
+            holes[min(containers, key=lambda position: faces[position][1])].append((points, area))
+
+    return [
+        PlanarFace(points, area - sum(hole_area for _, hole_area in holes[position]), [hole for hole, _ in holes[position]])
+        for position, (points, area, _) in enumerate(faces)
+    ]
@@ -0,0 +1,95 @@
+import math
+from collections import defaultdict
+
+
+class GridIndex:
+    """
+    Uniform grid over bounding boxes, for plans with thousands of vector
+    entities. Each item is registered in every cell its bbox overlaps, so a
+    window or radius query only looks at the items of the cells it covers.
+    """
+
+    def __init__(self, cell_size):
+        if cell_size <= 0:
+            raise ValueError('cell_size doit être positif')
+        self.cell_size = float(cell_size)
+        self.cells = defaultdict(list)
+        self.boxes = {}
+        self.order = {}
+        self.cell_bounds = None
+
+    @classmethod
+    def for_extent(cls, bbox, count, items_per_cell=8):
+        """Index sized so that `count` evenly spread items give about items_per_cell per cell."""
+        width = max(bbox[2] - bbox[0], 1e-9)
+        height = max(bbox[3] - bbox[1], 1e-9)
+        cells = max(1.0, count / items_per_cell)
+        return cls(max(math.sqrt(width * height / cells), max(width, height) / 256))
+
+    def __len__(self):
+        return len(self.boxes)
+
+    def _range(self, bbox):
+        size = self.cell_size
+        return (
+            range(math.floor(bbox[0] / size), math.floor(bbox[2] / size) + 1),
+            range(math.floor(bbox[1] / size), math.floor(bbox[3] / size) + 1)
+        )
+
+    def insert(self, item, bbox):
+        """Registers a hashable item with its (min_x, min_y, max_x, max_y) box."""
+        self.order.setdefault(item, len(self.order))
+        self.boxes[item] = bbox
+        columns, rows = self._range(bbox)
+        for i in columns:
+            for j in rows:
+                self.cells[(i, j)].append(item)
+
+        bounds = (columns.start, rows.start, columns.stop, rows.stop)
+        if self.cell_bounds:
+            bounds = (min(bounds[0], self.cell_bounds[0]), min(bounds[1], self.cell_bounds[1]),
+                      max(bounds[2], self.cell_bounds[2]), max(bounds[3], self.cell_bounds[3]))
+        self.cell_bounds = bounds
+
+    def query(self, bbox):
+        """Items whose box intersects bbox, in insertion order."""
+        if not self.cell_bounds:
+            return []
+        columns, rows = self._range(bbox)
+        # Only visit the cells that can hold items
+        columns = range(max(columns.start, self.cell_bounds[0]), min(columns.stop, self.cell_bounds[2]))
+        rows = range(max(rows.start, self.cell_bounds[1]), min(rows.stop, self.cell_bounds[3]))
+        found = set()
+        for i in columns:
+            for j in rows:
+                for item in self.cells.get((i, j), ()):
+                    if item in found:
+                        continue
+                    box = self.boxes[item]
+                    if box[0] <= bbox[2] and box[2] >= bbox[0] and box[1] <= bbox[3] and box[3] >= bbox[1]:
+                        found.add(item)
+        return sorted(found, key=self.order.__getitem__)
+
+    def query_point(self, x, y, radius=0.0):
+        """Items whose box lies within radius of the point."""
+        return self.query((x - radius, y - radius, x + radius, y + radius))
+
+
+def bbox_of(points):
+    """(min_x, min_y, max_x, max_y) of a sequence of (x, y) pairs."""
+    xs = [p[0] for p in points]
+    ys = [p[1] for p in points]
+    return (min(xs), min(ys), max(xs), max(ys))
+
+
+def point_in_polygon(x, y, polygon):
+    """Even-odd ray casting test against a list of (x, y) vertices."""
+    inside = False
+    j = len(polygon) - 1
+    for i in range(len(polygon)):
+        xi, yi = polygon[i]
+        xj, yj = polygon[j]
+        if (yi > y) != (yj > y) and x < (xj - xi) * (y - yi) / (yj - yi) + xi:
+            inside = not inside
+        j = i
+    return inside
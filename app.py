@@ -39,6 +39,12 @@ def create_app():
     from services.i18n_service import i18n
     i18n.init_app(app)
 
+    from services.export_jobs import export_jobs
+    export_jobs.init_app(app)
+
+    from services.plan_analysis import plan_analysis
+    plan_analysis.init_app(app)
+
     from flask import session, redirect, request
 
     @app.route('/set_language/<lang>')
@@ -51,6 +57,7 @@ def create_app():
         db.create_all()
         from scripts.seed_data import seed_initial_data
         seed_initial_data()
+        export_jobs.resume()
     
     return app
 
@@ -2,6 +2,7 @@
 import os
 import sys
 from sqlalchemy import text, inspect
+from sqlalchemy.schema import CreateIndex
 
 # Ensure a valid DATABASE_URL is set
 if not os.environ.get('DATABASE_URL'):
@@ -14,7 +15,7 @@ from models import db
 
 def update_schema(app):
     """
-    Checks for missing columns in existing tables and adds them.
+    Checks for missing columns and indexes in existing tables and adds them.
     This ensures the database schema is up-to-date without losing data.
     """
     print("\nVérification de la structure de la base de données (Migrations)...")
@@ -69,6 +70,113 @@ def update_schema(app):
                                 except Exception as e2:
                                     print(f"    [ECHEC] Abandon de l'ajout de la colonne: {e2}")
 
+                update_indexes(table_name, table)
+
+
+def update_indexes(table_name, table):
+    """
+    Creates the indexes declared on a model that its existing table lacks.
+    On PostgreSQL they are built CONCURRENTLY, outside of a transaction, so
+    the table stays writable while the index of a large table is built.
+    """
+    postgres = db.engine.dialect.name == 'postgresql'
+
+    # Read from the catalog: reflection skips expression-based indexes
+    with db.engine.connect() as conn:
+        if postgres:
+            rows = conn.execute(text(
+                "SELECT c.relname, i.indisvalid FROM pg_index i "
+                "JOIN pg_class c ON c.oid = i.indexrelid JOIN pg_class t ON t.oid = i.indrelid "
+                "WHERE t.relname = :table"
+            ), {'table': table_name}).all()
+        else:
+            rows = conn.execute(text(
+                "SELECT name, 1 FROM sqlite_master WHERE type = 'index' AND tbl_name = :table"
+            ), {'table': table_name}).all()
+    existing_indexes = {name for name, valid in rows if valid}
+    # A concurrent build that was interrupted leaves an invalid index behind
+    invalid = {name for name, valid in rows if not valid}
+
+    for index in sorted(table.indexes, key=lambda i: i.name):
+        if index.name in existing_indexes:
+            continue
+
+        print(f"    ! Index manquant détecté: {index.name}")
+        stmt = str(CreateIndex(index, if_not_exists=True).compile(dialect=db.engine.dialect))
+        if postgres:
+            stmt = stmt.replace('INDEX', 'INDEX CONCURRENTLY', 1)
+
+        try:
+            with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+                if index.name in invalid:
+                    conn.execute(text(f'DROP INDEX CONCURRENTLY IF EXISTS {index.name}'))
+                conn.execute(text(stmt))
+            print(f"    [OK] Index créé.")
+        except Exception as e:
+            print(f"    [ERREUR] Impossible de créer l'index: {e}")
+
+
+BACKFILLS = [
+    # quotes.company_id, copied from the project of the quote
+    "UPDATE quotes SET company_id = (SELECT projects.company_id FROM projects WHERE projects.id = quotes.project_id) "
+    "WHERE company_id IS NULL",
+]
+
+
+def backfill_columns(app):
+    """Fills the columns added by update_schema() whose value derives from other tables."""
+    with app.app_context():
+        with db.engine.begin() as conn:
+            for stmt in BACKFILLS:
+                count = conn.execute(text(stmt)).rowcount
+                if count:
+                    print(f"  [OK] {count} ligne(s) complétée(s): {stmt.split()[1]}")
+
+
+SEARCH_SETUP = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE EXTENSION IF NOT EXISTS unaccent",
+    # unaccent() is only STABLE, index expressions need IMMUTABLE functions
+    """CREATE OR REPLACE FUNCTION devispro_search_text(text) RETURNS text
+        LANGUAGE sql IMMUTABLE STRICT PARALLEL SAFE
+        AS $$ SELECT lower(public.unaccent('public.unaccent'::regdictionary, $1)) $$""",
+    """CREATE OR REPLACE FUNCTION devispro_code_key(text) RETURNS text
+        LANGUAGE sql IMMUTABLE STRICT PARALLEL SAFE
+        AS $$ SELECT regexp_replace(devispro_search_text($1), '[^a-z0-9]+', '', 'g') $$""",
+]
+
+SEARCH_INDEXES = [
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_bpu_articles_search ON bpu_articles "
+    "USING gin (devispro_search_text(code || ' ' || designation) gin_trgm_ops)",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_bpu_articles_code_key ON bpu_articles "
+    "(library_id, devispro_code_key(code) text_pattern_ops)",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_company_bpu_articles_search ON company_bpu_articles "
+    "USING gin (devispro_search_text(code || ' ' || designation) gin_trgm_ops)",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_company_bpu_articles_code_key ON company_bpu_articles "
+    "(company_id, devispro_code_key(code) text_pattern_ops)",
+]
+
+
+def update_search_indexes(app):
+    """
+    PostgreSQL only: the pg_trgm and unaccent extensions, the normalization
+    functions and the trigram indexes used by services.article_search.
+    Without them, or on SQLite, the search falls back to ILIKE.
+    """
+    with app.app_context():
+        if db.engine.dialect.name != 'postgresql':
+            return
+
+        print("\nIndex de recherche des articles (pg_trgm)...")
+        try:
+            with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+                for stmt in SEARCH_SETUP + SEARCH_INDEXES:
+                    conn.execute(text(stmt))
+            print("  [OK] Index de recherche à jour.")
+        except Exception as e:
+            print(f"  [ERREUR] Recherche par trigrammes indisponible, index en mémoire utilisés: {e}")
+
+
 def init_database():
     print("Initialisation de la base de données DevisPro...")
     print("-" * 50)
@@ -77,12 +185,15 @@ def init_database():
     
     # Check and update schema first
     update_schema(app)
+    backfill_columns(app)
 
     with app.app_context():
         print("\nCréation des tables manquantes...")
         db.create_all()
         print("Tables vérifiées/créées!")
         
+        update_search_indexes(app)
+        
         print("\nTables disponibles:")
         from sqlalchemy import inspect
         inspector = inspect(db.engine)
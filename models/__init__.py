@@ -1,18 +1,24 @@
 from models.base import db
 from models.company import Company, CompanyBranding, TaxProfile, PricingTier
 from models.user import User, Role, UserRole, AuditLog, RoleType
-from models.project import Project, ProjectPlan, PlanVersion, Room, Measurement, ProjectType, ProjectTypology, ProjectStatus
+from models.project import Project, ProjectPlan, PlanMetadata, PlanVersion, Room, Measurement, ProjectType, ProjectTypology, ProjectStatus
 from models.bpu import BPULibrary, BPUArticle, CompanyBPUOverride, CompanyBPUArticle
 from models.quote import Quote, QuoteVersion, QuoteLine, QuoteAssumption, QuoteStatus
 from models.question import QuestionTemplate, ProjectAnswer
+from models.job import ExportJob, JobStatus
+from models.stats import CompanyStats
+from models.facets import BPUCategoryFacet
 
 __all__ = [
     'db',
     'Company', 'CompanyBranding', 'TaxProfile', 'PricingTier',
     'User', 'Role', 'UserRole', 'AuditLog', 'RoleType',
-    'Project', 'ProjectPlan', 'PlanVersion', 'Room', 'Measurement',
+    'Project', 'ProjectPlan', 'PlanMetadata', 'PlanVersion', 'Room', 'Measurement',
     'ProjectType', 'ProjectTypology', 'ProjectStatus',
     'BPULibrary', 'BPUArticle', 'CompanyBPUOverride', 'CompanyBPUArticle',
     'Quote', 'QuoteVersion', 'QuoteLine', 'QuoteAssumption', 'QuoteStatus',
-    'QuestionTemplate', 'ProjectAnswer'
+    'QuestionTemplate', 'ProjectAnswer',
+    'ExportJob', 'JobStatus',
+    'CompanyStats',
+    'BPUCategoryFacet'
 ]
@@ -41,8 +41,17 @@ class BPUArticle(db.Model, TimestampMixin):
     
     __table_args__ = (
         db.UniqueConstraint('library_id', 'code', name='uq_bpu_article_code'),
+        # Order of the BPU listing, see listing_keys()
+        db.Index('ix_bpu_articles_library_order', 'library_id', 'category', db.text('coalesce(sort_order, 0)'), 'id'),
+        # Library part of the price book stamp, see company_bpu_stamp()
+        db.Index('ix_bpu_articles_library_updated', 'library_id', 'updated_at'),
     )
 
+    @classmethod
+    def listing_keys(cls):
+        """Keyset of the BPU listing; the 0 is inlined so the expression matches the index."""
+        return [cls.category, db.func.coalesce(cls.sort_order, db.literal_column('0')), cls.id]
+
 
 class CompanyBPUOverride(db.Model, TimestampMixin):
     __tablename__ = 'company_bpu_overrides'
@@ -0,0 +1,258 @@
+from collections import Counter, defaultdict
+from datetime import datetime
+from sqlalchemy import event, func, inspect
+from sqlalchemy.orm import Session
+from models.base import db, TimestampMixin
+from models.bpu import BPUArticle, BPULibrary, CompanyBPUArticle
+from models.company import Company
+
+
+# Key of the row marking a scope counted without any article
+EMPTY_KEY = ('', '')
+
+
+class BPUCategoryFacet(db.Model, TimestampMixin):
+    """
+    Article count of a category and subcategory ('' for none), either of a
+    library (`library_id`) or of the active custom articles of a company
+    (`company_id`). Kept up to date by the flush listener below; the bulk
+    updates of the BPU category page call rename_category() and
+    archive_category(), the Excel import recount().
+    """
+    __tablename__ = 'bpu_category_facets'
+
+    id = db.Column(db.Integer, primary_key=True)
+    library_id = db.Column(db.Integer, db.ForeignKey('bpu_libraries.id'))
+    company_id = db.Column(db.Integer, db.ForeignKey('companies.id'))
+    category = db.Column(db.String(100), nullable=False)
+    subcategory = db.Column(db.String(100), nullable=False, default='')
+    article_count = db.Column(db.Integer, nullable=False, default=0)
+
+    library = db.relationship('BPULibrary', backref=db.backref('facets', lazy='dynamic', cascade='all, delete-orphan'))
+    company = db.relationship('Company', backref=db.backref('bpu_facets', lazy='dynamic', cascade='all, delete-orphan'))
+
+    # One row per key and scope, the target of the ON CONFLICT of _upsert()
+    __table_args__ = (
+        db.Index('uq_bpu_category_facets_library', 'library_id', 'category', 'subcategory', unique=True,
+                 postgresql_where=library_id.isnot(None), sqlite_where=library_id.isnot(None)),
+        db.Index('uq_bpu_category_facets_company', 'company_id', 'category', 'subcategory', unique=True,
+                 postgresql_where=company_id.isnot(None), sqlite_where=company_id.isnot(None)),
+    )
+
+    @staticmethod
+    def scope_column(scope):
+        return BPUCategoryFacet.library_id if scope[0] == 'library' else BPUCategoryFacet.company_id
+
+    @classmethod
+    def counted(cls, scope, session=None):
+        """Counts of a ('library', id) or ('company', id) scope, from the articles tables."""
+        session = session or db.session
+        if scope[0] == 'library':
+            model, criteria = BPUArticle, [BPUArticle.library_id == scope[1]]
+        else:
+            model, criteria = CompanyBPUArticle, [
+                CompanyBPUArticle.company_id == scope[1],
+                CompanyBPUArticle.is_active.is_(True)
+            ]
+
+        rows = session.query(model.category, func.coalesce(model.subcategory, ''), func.count(model.id))\
+            .filter(*criteria)\
+            .group_by(model.category, func.coalesce(model.subcategory, ''))
+        return Counter({(category, subcategory): count for category, subcategory, count in rows})
+
+    @classmethod
+    def for_scopes(cls, *scopes):
+        """
+        Facets of the scopes, counted and stored on first use. The first count
+        is committed by a session of its own, the caller's session is left
+        as it is.
+        """
+        scopes = [scope for scope in scopes if scope[1] is not None]
+        if not scopes:
+            return []
+
+        facets = cls.query.filter(db.or_(*(cls.scope_column(scope) == scope[1] for scope in scopes))).all()
+        missing = [scope for scope in scopes if not any(cls._in_scope(facet, scope) for facet in facets)]
+        if not missing:
+            return facets
+
+        with Session(db.engine) as session:
+            for scope in missing:
+                cls._store(scope, cls.counted(scope, session), session)
+            try:
+                session.commit()
+            except Exception:
+                # Counted concurrently by another request, on backends without ON CONFLICT
+                session.rollback()
+        return cls.query.filter(db.or_(*(cls.scope_column(scope) == scope[1] for scope in scopes))).all()
+
+    @classmethod
+    def rename_category(cls, company_id, old_name, new_name):
+        """The active custom articles of `old_name` moved to `new_name`."""
+        if old_name == new_name:
+            return
+        moved = cls.query.filter(cls.company_id == company_id, cls.category == old_name, cls.article_count > 0).all()
+        for facet in moved:
+            cls._increment(db.session, ('company', company_id), (new_name, facet.subcategory), facet.article_count)
+            facet.article_count = cls.article_count - facet.article_count
+
+    @classmethod
+    def archive_category(cls, company_id, name):
+        """Every active custom article of `name` archived."""
+        cls.query.filter(cls.company_id == company_id, cls.category == name)\
+            .update({cls.article_count: 0}, synchronize_session=False)
+
+    @classmethod
+    def recount(cls, scope):
+        cls.query.filter(cls.scope_column(scope) == scope[1]).delete(synchronize_session=False)
+        cls._store(scope, cls.counted(scope))
+
+    @classmethod
+    def _store(cls, scope, counts, session=None):
+        """Stores the counts of a scope, keeping the rows stored meanwhile by another transaction."""
+        session = session or db.session
+        # A scope without articles is stored as counted too, with an empty key
+        counts = counts or {EMPTY_KEY: 0}
+        if cls._upsert(session, scope, counts):
+            return
+        for (category, subcategory), count in counts.items():
+            session.add(cls(**{f'{scope[0]}_id': scope[1]}, category=category, subcategory=subcategory, article_count=count))
+
+    @classmethod
+    def _upsert(cls, session, scope, counts, increment=False):
+        """
+        INSERT of the counts of a scope, ON CONFLICT adding them to the stored
+        rows (`increment`) or leaving those as they are. Returns False on the
+        backends without ON CONFLICT.
+        """
+        dialect = session.get_bind().dialect.name
+        if dialect not in ('postgresql', 'sqlite'):
+            return False
+        if not counts:
+            return True
+        if dialect == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+
+        table = cls.__table__
+        column = table.c[f'{scope[0]}_id']
+        stmt = insert(table)
+        target = dict(index_elements=[column, table.c.category, table.c.subcategory], index_where=column.isnot(None))
+        if increment:
+            stmt = stmt.on_conflict_do_update(**target, set_={
+                'article_count': table.c.article_count + stmt.excluded.article_count,
+                'updated_at': stmt.excluded.updated_at
+            })
+        else:
+            stmt = stmt.on_conflict_do_nothing(**target)
+
+        now = datetime.utcnow()
+        session.execute(stmt, [
+            {column.name: scope[1], 'category': category, 'subcategory': subcategory,
+             'article_count': count, 'created_at': now, 'updated_at': now}
+            for (category, subcategory), count in counts.items()
+        ])
+        return True
+
+    @staticmethod
+    def _in_scope(facet, scope):
+        return (facet.library_id if scope[0] == 'library' else facet.company_id) == scope[1]
+
+    @classmethod
+    def _increment(cls, session, scope, key, delta):
+        if cls._upsert(session, scope, {key: delta}, increment=True):
+            return
+        facet = session.query(cls).filter(
+            cls.scope_column(scope) == scope[1],
+            cls.category == key[0],
+            cls.subcategory == key[1]
+        ).first()
+        if facet is None:
+            session.add(cls(**{f'{scope[0]}_id': scope[1]}, category=key[0], subcategory=key[1], article_count=delta))
+        else:
+            # SQL increment, so concurrent writers do not overwrite each other
+            facet.article_count = cls.article_count + delta
+
+    def __repr__(self):
+        return f'<BPUCategoryFacet {self.category}/{self.subcategory}: {self.article_count}>'
+
+
+def _facet_scope(obj):
+    if isinstance(obj, BPUArticle):
+        return ('library', obj.library_id)
+    return ('company', obj.company_id)
+
+
+COUNTED_ATTRIBUTES = ('category', 'subcategory', 'is_active')
+
+
+def _counted_key(session, obj, previous=False):
+    """(category, subcategory) an article is counted in, None when it is not counted."""
+    model = type(obj)
+    names = [name for name in COUNTED_ATTRIBUTES if hasattr(model, name)]
+    values = {name: getattr(obj, name) for name in names}
+
+    if previous:
+        state = inspect(obj)
+        histories = {name: state.attrs[name].history for name in names}
+        if any(history.added and not history.deleted for history in histories.values()):
+            # Set while expired: the previous values are those stored
+            values = session.query(*(getattr(model, name) for name in names))\
+                .filter(model.id == obj.id).one()._asdict()
+        else:
+            values.update({name: history.deleted[0] for name, history in histories.items() if history.deleted})
+
+    if values.get('is_active') is False:
+        return None
+    return values['category'], values['subcategory'] or ''
+
+
+@event.listens_for(Session, 'before_flush')
+def _track_category_facets(session, flush_context, instances):
+    deltas = defaultdict(Counter)
+
+    for obj in session.new:
+        if isinstance(obj, (BPUArticle, CompanyBPUArticle)):
+            key = _counted_key(session, obj)
+            if key:
+                deltas[_facet_scope(obj)][key] += 1
+
+    for obj in session.deleted:
+        if isinstance(obj, (BPUArticle, CompanyBPUArticle)):
+            key = _counted_key(session, obj, previous=True)
+            if key:
+                deltas[_facet_scope(obj)][key] -= 1
+
+    for obj in session.dirty:
+        if isinstance(obj, (BPUArticle, CompanyBPUArticle)) and session.is_modified(obj):
+            before, after = _counted_key(session, obj, previous=True), _counted_key(session, obj)
+            if before != after:
+                if before:
+                    deltas[_facet_scope(obj)][before] -= 1
+                if after:
+                    deltas[_facet_scope(obj)][after] += 1
+
+    deleted_scopes = {
+        ('library', obj.id) if isinstance(obj, BPULibrary) else ('company', obj.id)
+        for obj in session.deleted if isinstance(obj, (BPULibrary, Company))
+    }
+
+    for scope, counts in deltas.items():
+        counts = {key: delta for key, delta in counts.items() if delta}
+        if scope[1] is None or scope in deleted_scopes or not counts:
+            continue
+
+        stored = session.query(BPUCategoryFacet.id).filter(BPUCategoryFacet.scope_column(scope) == scope[1]).first()
+        if stored is None:
+            # Counted from the rows already stored, before this flush
+            counted = +BPUCategoryFacet.counted(scope, session)
+            if not BPUCategoryFacet._upsert(session, scope, counted):
+                counted.update(counts)
+                BPUCategoryFacet._store(scope, +counted, session)
+                continue
+
+        if BPUCategoryFacet._upsert(session, scope, counts, increment=True):
+            continue
+        for key, delta in counts.items():
+            BPUCategoryFacet._increment(session, scope, key, delta)
@@ -0,0 +1,46 @@
+from models.base import db, TimestampMixin
+import enum
+
+
+class JobStatus(enum.Enum):
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+
+
+class ExportJob(db.Model, TimestampMixin):
+    __tablename__ = 'export_jobs'
+
+    id = db.Column(db.Integer, primary_key=True)
+    company_id = db.Column(db.Integer, db.ForeignKey('companies.id'), nullable=False)
+    quote_id = db.Column(db.Integer, db.ForeignKey('quotes.id'), nullable=False)
+    version_id = db.Column(db.Integer, db.ForeignKey('quote_versions.id'), nullable=False)
+    export_format = db.Column(db.String(10), nullable=False)
+    status = db.Column(db.Enum(JobStatus), default=JobStatus.PENDING, nullable=False)
+    file_path = db.Column(db.String(500))
+    error = db.Column(db.Text)
+    requested_by_id = db.Column(db.Integer, db.ForeignKey('users.id'))
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+
+    # At most one pending or running job per version and format, see ExportJobQueue.enqueue()
+    __table_args__ = (
+        db.Index('uq_export_jobs_active', 'version_id', 'export_format', unique=True,
+                 postgresql_where=status.in_([JobStatus.PENDING, JobStatus.RUNNING]),
+                 sqlite_where=status.in_([JobStatus.PENDING, JobStatus.RUNNING])),
+    )
+
+    quote = db.relationship('Quote')
+    version = db.relationship('QuoteVersion')
+    requested_by = db.relationship('User')
+
+    @property
+    def is_finished(self):
+        return self.status in (JobStatus.DONE, JobStatus.FAILED)
+
+    @property
+    def download_name(self):
+        suffix = 'pdf' if self.export_format == 'pdf' else 'xlsx'
+        label = '' if self.export_format == 'pdf' else '_DQE'
+        return f"{self.quote.reference}{label}_V{self.version.version_number}.{suffix}"
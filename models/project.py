@@ -1,4 +1,5 @@
 from models.base import db, TimestampMixin
+from models.job import JobStatus
 from datetime import datetime
 import enum
 
@@ -29,6 +30,10 @@ class ProjectStatus(enum.Enum):
     ARCHIVED = 'archived'
 
 
+# Statuses counted as "en cours" on the dashboard
+ACTIVE_PROJECT_STATUSES = (ProjectStatus.DRAFT, ProjectStatus.IN_PROGRESS, ProjectStatus.PENDING_QUESTIONS)
+
+
 class Project(db.Model, TimestampMixin):
     __tablename__ = 'projects'
     
@@ -42,7 +47,8 @@ class Project(db.Model, TimestampMixin):
     client_address = db.Column(db.Text)
     project_type = db.Column(db.Enum(ProjectType), nullable=False)
     typology = db.Column(db.Enum(ProjectTypology), nullable=False)
-    status = db.Column(db.Enum(ProjectStatus), default=ProjectStatus.DRAFT)
+    # The previous status is loaded on change, even once expired, for the company_stats listener
+    status = db.column_property(db.Column(db.Enum(ProjectStatus), default=ProjectStatus.DRAFT), active_history=True)
     default_tier_id = db.Column(db.Integer, db.ForeignKey('pricing_tiers.id'))
     total_surface = db.Column(db.Numeric(12, 2))
     notes = db.Column(db.Text)
@@ -53,6 +59,10 @@ class Project(db.Model, TimestampMixin):
     rooms = db.relationship('Room', back_populates='project', cascade='all, delete-orphan')
     quotes = db.relationship('Quote', back_populates='project', cascade='all, delete-orphan')
     answers = db.relationship('ProjectAnswer', back_populates='project', cascade='all, delete-orphan')
+    
+    __table_args__ = (
+        db.Index('ix_projects_company_updated', 'company_id', 'updated_at', 'id'),
+    )
 
     def generate_reference(self):
         year = datetime.utcnow().year
@@ -75,10 +85,52 @@ class ProjectPlan(db.Model, TimestampMixin):
     is_calibrated = db.Column(db.Boolean, default=False)
     scale_factor = db.Column(db.Numeric(10, 6))
     calibration_data = db.Column(db.JSON)
+    raster_data = db.Column(db.JSON)
     
     project = db.relationship('Project', back_populates='plans')
     versions = db.relationship('PlanVersion', back_populates='plan', lazy='dynamic', cascade='all, delete-orphan')
     measurements = db.relationship('Measurement', back_populates='plan', lazy='dynamic', cascade='all, delete-orphan')
+    analysis = db.relationship('PlanMetadata', back_populates='plan', uselist=False, cascade='all, delete-orphan')
+    
+    __table_args__ = (
+        db.Index('ix_project_plans_project', 'project_id'),
+    )
+
+
+class PlanMetadata(db.Model, TimestampMixin):
+    """Result of the background analysis of an uploaded plan, polled by the UI."""
+    __tablename__ = 'plan_metadata'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    plan_id = db.Column(db.Integer, db.ForeignKey('project_plans.id'), nullable=False, unique=True)
+    status = db.Column(db.Enum(JobStatus), default=JobStatus.PENDING, nullable=False)
+    page_count = db.Column(db.Integer)
+    is_vector = db.Column(db.Boolean)
+    is_scanned = db.Column(db.Boolean)
+    dimensions = db.Column(db.JSON)
+    recommendations = db.Column(db.JSON)
+    details = db.Column(db.JSON)
+    error = db.Column(db.Text)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    
+    plan = db.relationship('ProjectPlan', back_populates='analysis')
+    
+    @property
+    def is_finished(self):
+        return self.status in (JobStatus.DONE, JobStatus.FAILED)
+    
+    def to_dict(self):
+        return {
+            'status': self.status.value,
+            'page_count': self.page_count,
+            'is_vector': self.is_vector,
+            'is_scanned': self.is_scanned,
+            'dimensions': self.dimensions,
+            'recommendations': self.recommendations or [],
+            'candidate_rooms': (self.details or {}).get('candidate_rooms', []),
+            'error': self.error
+        }
 
 
 class PlanVersion(db.Model, TimestampMixin):
@@ -108,9 +160,16 @@ class Room(db.Model, TimestampMixin):
     perimeter = db.Column(db.Numeric(12, 2))
     ceiling_height = db.Column(db.Numeric(5, 2), default=2.80)
     polygon_data = db.Column(db.JSON)
+    # Pixels of polygon_data: 'plan' image pixels, or 'canvas' pixels of the viewer (NULL, older rows)
+    pixel_space = db.Column(db.String(10))
     
     project = db.relationship('Project', back_populates='rooms')
     plan = db.relationship('ProjectPlan')
+    
+    __table_args__ = (
+        db.Index('ix_rooms_project', 'project_id'),
+        db.Index('ix_rooms_plan', 'plan_id'),
+    )
 
 
 class Measurement(db.Model, TimestampMixin):
@@ -125,8 +184,14 @@ class Measurement(db.Model, TimestampMixin):
     confidence = db.Column(db.String(20), default='medium')
     source = db.Column(db.String(50), default='manual')
     polygon_data = db.Column(db.JSON)
+    pixel_space = db.Column(db.String(10))
     created_by_id = db.Column(db.Integer, db.ForeignKey('users.id'))
     
     plan = db.relationship('ProjectPlan', back_populates='measurements')
     room = db.relationship('Room')
     created_by = db.relationship('User')
+    
+    __table_args__ = (
+        db.Index('ix_measurements_plan', 'plan_id'),
+        db.Index('ix_measurements_room', 'room_id'),
+    )
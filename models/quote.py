@@ -17,6 +17,8 @@ class Quote(db.Model, TimestampMixin):
     
     id = db.Column(db.Integer, primary_key=True)
     project_id = db.Column(db.Integer, db.ForeignKey('projects.id'), nullable=False)
+    # Company of the project, so the tenant listings page on an index of quotes
+    company_id = db.Column(db.Integer, db.ForeignKey('companies.id'), nullable=False)
     reference = db.Column(db.String(50), nullable=False)
     status = db.Column(db.Enum(QuoteStatus), default=QuoteStatus.DRAFT)
     current_version = db.Column(db.Integer, default=1)
@@ -26,6 +28,12 @@ class Quote(db.Model, TimestampMixin):
     
     project = db.relationship('Project', back_populates='quotes')
     versions = db.relationship('QuoteVersion', back_populates='quote', lazy='dynamic', cascade='all, delete-orphan', order_by='QuoteVersion.version_number.desc()')
+    
+    __table_args__ = (
+        # Quotes of a project, and the recent quotes of a company
+        db.Index('ix_quotes_project_updated', 'project_id', 'updated_at'),
+        db.Index('ix_quotes_company_updated', 'company_id', 'updated_at', 'id'),
+    )
 
     def generate_reference(self):
         from models.project import Project
@@ -39,11 +47,19 @@ class Quote(db.Model, TimestampMixin):
             # Should not happen if flow is correct
             return
 
-        count = Quote.query.join(Project).filter(
-            Project.company_id == project.company_id,
+        self.reference = Quote.format_reference(year, Quote.count_for_year(project.company_id, year) + 1)
+
+    @staticmethod
+    def count_for_year(company_id, year):
+        from models.project import Project
+        return Quote.query.join(Project).filter(
+            Project.company_id == company_id,
             db.extract('year', Quote.created_at) == year
-        ).count() + 1
-        self.reference = f"DEV-{year}-{count:04d}"
+        ).count()
+
+    @staticmethod
+    def format_reference(year, number):
+        return f"DEV-{year}-{number:04d}"
 
 
 class QuoteVersion(db.Model, TimestampMixin):
@@ -73,6 +89,97 @@ class QuoteVersion(db.Model, TimestampMixin):
         db.UniqueConstraint('quote_id', 'version_number', name='uq_quote_version'),
     )
 
+    DEFAULT_VAT_RATE = 20
+
+    @classmethod
+    def _totals_values(cls, subtotal):
+        rate = db.func.coalesce(cls.vat_rate, cls.DEFAULT_VAT_RATE)
+        return {
+            cls.subtotal_ht: subtotal,
+            cls.vat_amount: subtotal * rate / 100,
+            cls.total_ttc: subtotal + subtotal * rate / 100
+        }
+
+    def apply_line_delta(self, delta):
+        """
+        Shifts subtotal, VAT and TTC by a line total delta (HT) in a single UPDATE,
+        without reading the lines of the version.
+        """
+        if not delta:
+            return
+
+        QuoteVersion.query.filter_by(id=self.id).update(
+            self._totals_values(QuoteVersion.subtotal_ht + delta),
+            synchronize_session=False
+        )
+        db.session.expire(self, ['subtotal_ht', 'vat_amount', 'total_ttc'])
+
+    @classmethod
+    def _lines_sum(cls):
+        return db.select(db.func.coalesce(db.func.sum(QuoteLine.total_price), 0))\
+            .where(QuoteLine.version_id == cls.id)\
+            .scalar_subquery()
+
+    @classmethod
+    def verify_totals(cls, version_ids=None):
+        """Returns (version_id, stored_subtotal, lines_subtotal) for every version whose totals drifted."""
+        lines_sum = cls._lines_sum()
+        query = db.session.query(cls.id, cls.subtotal_ht, lines_sum)\
+            .filter(db.func.abs(db.func.coalesce(cls.subtotal_ht, 0) - lines_sum) >= 0.01)
+        if version_ids is not None:
+            query = query.filter(cls.id.in_(version_ids))
+        return query.order_by(cls.id).all()
+
+    @classmethod
+    def recalculate_totals(cls, version_ids=None):
+        """Recomputes the totals from the lines in one set-based UPDATE. Returns the row count."""
+        query = cls.query
+        if version_ids is not None:
+            query = query.filter(cls.id.in_(version_ids))
+        return query.update(cls._totals_values(cls._lines_sum()), synchronize_session=False)
+
+    def clone(self, version_number, created_by_id):
+        """
+        Creates the next version of the quote as a copy of this one.
+        Lines and assumptions are copied server-side with one INSERT ... SELECT each,
+        and the totals are carried over since the lines are identical.
+        """
+        new_version = QuoteVersion(
+            quote_id=self.quote_id,
+            version_number=version_number,
+            tier_id=self.tier_id,
+            vat_rate=self.vat_rate,
+            subtotal_ht=self.subtotal_ht,
+            vat_amount=self.vat_amount,
+            total_ttc=self.total_ttc,
+            created_by_id=created_by_id
+        )
+        db.session.add(new_version)
+        db.session.flush()
+
+        now = datetime.utcnow()
+        for model, columns in (
+            (QuoteLine, ('article_id', 'custom_article_id', 'category', 'designation', 'unit',
+                         'quantity', 'unit_price', 'total_price', 'measurement_id', 'room_id',
+                         'quantity_source', 'sort_order')),
+            (QuoteAssumption, ('category', 'description', 'value', 'is_confirmed', 'source')),
+        ):
+            source = db.select(
+                db.literal(new_version.id),
+                *[getattr(model, column) for column in columns],
+                db.literal(now),
+                db.literal(now)
+            ).where(model.version_id == self.id)
+
+            db.session.execute(
+                db.insert(model).from_select(
+                    ['version_id', *columns, 'created_at', 'updated_at'],
+                    source
+                )
+            )
+
+        return new_version
+
 
 class QuoteLine(db.Model, TimestampMixin):
     __tablename__ = 'quote_lines'
@@ -97,6 +204,10 @@ class QuoteLine(db.Model, TimestampMixin):
     custom_article = db.relationship('CompanyBPUArticle')
     measurement = db.relationship('Measurement')
     room = db.relationship('Room')
+    
+    __table_args__ = (
+        db.Index('ix_quote_lines_version_order', 'version_id', 'sort_order'),
+    )
 
 
 class QuoteAssumption(db.Model, TimestampMixin):
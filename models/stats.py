@@ -0,0 +1,166 @@
+from collections import Counter, defaultdict
+from itertools import chain
+from sqlalchemy import event, func, inspect
+from sqlalchemy.orm import Session
+from models.base import db, TimestampMixin
+from models.company import Company
+from models.project import Project, ProjectStatus, ACTIVE_PROJECT_STATUSES
+from models.quote import Quote
+
+
+class CompanyStats(db.Model, TimestampMixin):
+    """
+    Per-company dashboard counters, kept up to date by the flush listener
+    below whenever projects or quotes are created, change status or are
+    deleted. `version` moves on every project or quote write and stamps the
+    cached dashboard snapshots.
+    """
+    __tablename__ = 'company_stats'
+
+    company_id = db.Column(db.Integer, db.ForeignKey('companies.id'), primary_key=True)
+    project_count = db.Column(db.Integer, nullable=False, default=0)
+    active_project_count = db.Column(db.Integer, nullable=False, default=0)
+    quote_count = db.Column(db.Integer, nullable=False, default=0)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+    company = db.relationship('Company', backref=db.backref('stats', uselist=False, cascade='all, delete-orphan'))
+
+    @classmethod
+    def counted(cls, company_id, session=None):
+        """Builds the counters of a company from the projects and quotes tables."""
+        session = session or db.session
+        project_count, active_count = session.query(
+            func.count(Project.id),
+            func.count(Project.id).filter(Project.status.in_(ACTIVE_PROJECT_STATUSES))
+        ).filter(Project.company_id == company_id).one()
+        quote_count = session.query(func.count(Quote.id)).join(Project).filter(Project.company_id == company_id).scalar()
+
+        return cls(
+            company_id=company_id,
+            project_count=project_count,
+            active_project_count=active_count,
+            quote_count=quote_count,
+            version=0
+        )
+
+    @classmethod
+    def for_company(cls, company_id):
+        """
+        Counters of a company, counted and stored on first use by a session
+        of its own, the caller's session is left as it is.
+        """
+        stats = db.session.get(cls, company_id)
+        if stats is None:
+            with Session(db.engine) as session:
+                if not cls.store_counted(session, company_id):
+                    session.add(cls.counted(company_id, session))
+                try:
+                    session.commit()
+                except Exception:
+                    # Created concurrently by another request, on backends without ON CONFLICT
+                    session.rollback()
+            stats = db.session.get(cls, company_id)
+        return stats
+
+    @classmethod
+    def store_counted(cls, session, company_id):
+        """
+        INSERT of the counters counted from the tables, ON CONFLICT leaving
+        the row stored meanwhile by another transaction. Returns False on the
+        backends without ON CONFLICT.
+        """
+        dialect = session.get_bind().dialect.name
+        if dialect not in ('postgresql', 'sqlite'):
+            return False
+        if dialect == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+
+        counted = cls.counted(company_id, session)
+        session.execute(insert(cls.__table__).values(
+            company_id=company_id,
+            project_count=counted.project_count,
+            active_project_count=counted.active_project_count,
+            quote_count=counted.quote_count,
+            version=0
+        ).on_conflict_do_nothing(index_elements=['company_id']))
+        return True
+
+    def __repr__(self):
+        return f'<CompanyStats {self.company_id}>'
+
+
+def _is_active(status):
+    # Unset until the insert applies the column default
+    return (status or ProjectStatus.DRAFT) in ACTIVE_PROJECT_STATUSES
+
+
+def _quote_company_id(session, quote):
+    if quote.company_id is not None:
+        return quote.company_id
+    if quote.project is not None:
+        return quote.project.company_id
+    return session.query(Project.company_id).filter(Project.id == quote.project_id).scalar()
+
+
+@event.listens_for(Session, 'before_flush')
+def _track_company_stats(session, flush_context, instances):
+    if not any(isinstance(obj, (Project, Quote)) for obj in chain(session.new, session.deleted, session.dirty)):
+        return
+
+    deltas = defaultdict(Counter)
+    touched = set()
+
+    for obj in session.new:
+        if isinstance(obj, Project):
+            deltas[obj.company_id]['project_count'] += 1
+            deltas[obj.company_id]['active_project_count'] += _is_active(obj.status)
+            touched.add(obj.company_id)
+        elif isinstance(obj, Quote):
+            company_id = _quote_company_id(session, obj)
+            deltas[company_id]['quote_count'] += 1
+            touched.add(company_id)
+
+    for obj in session.deleted:
+        if isinstance(obj, Project):
+            deltas[obj.company_id]['project_count'] -= 1
+            deltas[obj.company_id]['active_project_count'] -= _is_active(obj.status)
+            touched.add(obj.company_id)
+        elif isinstance(obj, Quote):
+            company_id = _quote_company_id(session, obj)
+            deltas[company_id]['quote_count'] -= 1
+            touched.add(company_id)
+
+    for obj in session.dirty:
+        if isinstance(obj, Project) and session.is_modified(obj):
+            history = inspect(obj).attrs.status.history
+            if history.added and history.deleted:
+                deltas[obj.company_id]['active_project_count'] += (
+                    _is_active(history.added[0]) - _is_active(history.deleted[0])
+                )
+            touched.add(obj.company_id)
+        elif isinstance(obj, Quote) and session.is_modified(obj):
+            touched.add(_quote_company_id(session, obj))
+
+    deleted_companies = {obj.id for obj in session.deleted if isinstance(obj, Company)}
+
+    for company_id in touched - deleted_companies - {None}:
+        stats = session.get(CompanyStats, company_id)
+        if stats is None and CompanyStats.store_counted(session, company_id):
+            # Counted from the rows already stored, before this flush
+            stats = session.get(CompanyStats, company_id)
+        if stats is None:
+            # Backends without ON CONFLICT: counted the same way, stored with this flush
+            stats = CompanyStats.counted(company_id, session)
+            for column, delta in deltas[company_id].items():
+                setattr(stats, column, getattr(stats, column) + delta)
+            stats.version = 1
+            session.add(stats)
+            continue
+
+        # SQL increments, so concurrent writers do not overwrite each other
+        for column, delta in deltas[company_id].items():
+            if delta:
+                setattr(stats, column, getattr(CompanyStats, column) + delta)
+        stats.version = CompanyStats.version + 1
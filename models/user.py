@@ -97,3 +97,8 @@ class AuditLog(db.Model, TimestampMixin):
     user_agent = db.Column(db.String(500))
     
     user = db.relationship('User', back_populates='audit_logs')
+    
+    __table_args__ = (
+        db.Index('ix_audit_logs_company_created', 'company_id', 'created_at', 'id'),
+        db.Index('ix_audit_logs_entity', 'entity_type', 'entity_id', 'created_at'),
+    )
@@ -3,6 +3,8 @@ from flask_login import login_required, current_user
 from models import db, User, Role, UserRole, AuditLog, Company
 from security.decorators import require_permission
 from security.audit import log_action
+from services.export_cache import export_cache
+from utils.pagination import keyset_paginate
 
 admin_bp = Blueprint('admin', __name__)
 
@@ -121,11 +123,13 @@ def toggle_user(user_id):
 @require_permission('can_manage_users')
 def audit_log():
     company = current_user.company
-    page = request.args.get('page', 1, type=int)
     
-    logs = AuditLog.query.filter_by(company_id=company.id)\
-        .order_by(AuditLog.created_at.desc())\
-        .paginate(page=page, per_page=50, error_out=False)
+    logs = keyset_paginate(
+        AuditLog.query.filter_by(company_id=company.id).options(db.joinedload(AuditLog.user)),
+        [AuditLog.created_at, AuditLog.id],
+        cursor=request.args.get('cursor'),
+        descending=True
+    )
     
     return render_template('admin/audit_log.html', logs=logs)
 
@@ -189,6 +193,7 @@ def settings():
                     branding.logo_path = logo_path
         
         db.session.commit()
+        export_cache.invalidate_company(company.id)
         
         log_action('update', 'settings', company.id, None, {'section': section})
         flash('Paramètres enregistrés.', 'success')
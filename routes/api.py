@@ -1,6 +1,17 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, jsonify, request, send_file, abort
 from flask_login import login_required, current_user
-from models import db, Project, ProjectPlan, Room, Measurement, BPUArticle, CompanyBPUArticle, QuoteLine, QuoteVersion
+from models import db, Project, ProjectPlan, Room, Measurement, CompanyBPUArticle, QuoteLine, QuoteVersion, PricingTier, JobStatus
+from services.export_service import ExportService
+from services.quote_batch import BatchQuoteGenerator
+from services.plan_measurement import PlanMeasurementService
+from services.plan_raster import PlanRasterizer
+from services.plan_analysis import plan_analysis, plan_tiles_dir
+from services.article_search import ArticleSearch
+from services.quote_generator import QuoteGenerator
+import os
+from security.decorators import require_permission
+from security.audit import log_action
+from algorithms.pricing import calculate_line_total
 from decimal import Decimal
 
 api_bp = Blueprint('api', __name__)
@@ -30,6 +41,11 @@ def create_room(project_id):
     
     data = request.get_json()
     
+    plan = ProjectPlan.query.filter_by(id=data['plan_id'], project_id=project_id).first() if data.get('plan_id') else None
+    pixel_space = _pixel_space(data, plan)
+    if PlanMeasurementService.validate_pixel_space(pixel_space):
+        return jsonify({'error': PlanMeasurementService.validate_pixel_space(pixel_space)}), 400
+    
     room = Room(
         project_id=project_id,
         plan_id=data.get('plan_id'),
@@ -39,7 +55,8 @@ def create_room(project_id):
         area=data.get('area'),
         perimeter=data.get('perimeter'),
         ceiling_height=data.get('ceiling_height', 2.80),
-        polygon_data=data.get('polygon_data')
+        polygon_data=data.get('polygon_data'),
+        pixel_space=pixel_space if data.get('polygon_data') else None
     )
     db.session.add(room)
     db.session.commit()
@@ -72,13 +89,97 @@ def update_room(project_id, room_id):
     if 'ceiling_height' in data:
         room.ceiling_height = data['ceiling_height']
     if 'polygon_data' in data:
+        pixel_space = _pixel_space(data, room.plan)
+        if PlanMeasurementService.validate_pixel_space(pixel_space):
+            return jsonify({'error': PlanMeasurementService.validate_pixel_space(pixel_space)}), 400
         room.polygon_data = data['polygon_data']
+        room.pixel_space = pixel_space if data['polygon_data'] else None
     
     db.session.commit()
     
     return jsonify({'success': True})
 
 
+@api_bp.route('/projects/<int:project_id>/rooms/batch', methods=['POST'])
+@login_required
+def create_rooms_batch(project_id):
+    project = Project.query.filter_by(id=project_id, company_id=current_user.company_id).first_or_404()
+    
+    items = (request.get_json() or {}).get('rooms')
+    error = _check_batch(items)
+    if error:
+        return jsonify({'error': error}), 400
+    
+    plans = {plan.id: plan for plan in ProjectPlan.query.filter_by(project_id=project_id)}
+    
+    rows = []
+    results = []
+    for index, item in enumerate(items):
+        errors = []
+        if not isinstance(item, dict):
+            results.append({'index': index, 'errors': ['Objet attendu']})
+            continue
+        
+        plan_id = item.get('plan_id')
+        if plan_id is not None and plan_id not in plans:
+            errors.append('Plan inconnu')
+        
+        polygon = item.get('polygon_data')
+        pixel_space = _pixel_space(item, plans.get(plan_id))
+        if polygon is not None:
+            polygon_error = PlanMeasurementService.validate_polygon(polygon) or \
+                PlanMeasurementService.validate_pixel_space(pixel_space)
+            if polygon_error:
+                errors.append(polygon_error)
+        
+        values = _batch_numbers(item, {'area': None, 'perimeter': None, 'ceiling_height': 2.80, 'level': 0}, errors)
+        values.update(_batch_strings(item, Room, {'name': 'Nouvelle pièce', 'room_type': None}, errors))
+        
+        results.append({'index': index, 'errors': errors})
+        rows.append({
+            'project_id': project_id,
+            'plan_id': plan_id,
+            'name': values['name'],
+            'room_type': values['room_type'],
+            'level': int(values['level']) if values['level'] is not None else 0,
+            'area': values['area'],
+            'perimeter': values['perimeter'],
+            'ceiling_height': values['ceiling_height'],
+            'polygon_data': polygon,
+            'pixel_space': pixel_space if polygon else None
+        })
+    
+    if any(result['errors'] for result in results):
+        return jsonify({'error': 'Données invalides', 'results': results}), 400
+    
+    # Rooms traced on a plan get their area and perimeter from the polygon at the plan scale
+    by_plan = {}
+    for row in rows:
+        if row['plan_id'] is not None and row['polygon_data'] and \
+                PlanMeasurementService(plans[row['plan_id']]).measurable(row['pixel_space']):
+            by_plan.setdefault(row['plan_id'], []).append(row)
+    for plan_id, plan_rows in by_plan.items():
+        measures = PlanMeasurementService(plans[plan_id]).room_measures([row['polygon_data'] for row in plan_rows])
+        for row, (area, perimeter) in zip(plan_rows, measures):
+            row['area'], row['perimeter'] = area, perimeter
+    
+    ids = db.session.execute(
+        db.insert(Room).returning(Room.id, sort_by_parameter_order=True).execution_options(render_nulls=True),
+        rows
+    ).scalars().all()
+    db.session.commit()
+    
+    return jsonify({
+        'created': len(ids),
+        'results': [{
+            'index': index,
+            'id': room_id,
+            'area': float(row['area']) if row['area'] is not None else 0,
+            'perimeter': float(row['perimeter']) if row['perimeter'] is not None else 0
+        } for index, (room_id, row) in enumerate(zip(ids, rows))]
+    }), 201
+
+
 @api_bp.route('/plans/<int:plan_id>/calibrate', methods=['POST'])
 @login_required
 def calibrate_plan(plan_id):
@@ -107,22 +208,86 @@ def calibrate_plan(plan_id):
     else:
         return jsonify({'error': 'Distance pixels invalide'}), 400
     
+    pixel_space = data.get('pixel_space', 'canvas')
+    if PlanMeasurementService.validate_pixel_space(pixel_space):
+        return jsonify({'error': PlanMeasurementService.validate_pixel_space(pixel_space)}), 400
+    
     plan.scale_factor = scale_factor
     plan.is_calibrated = True
     plan.calibration_data = {
         'point1': point1,
         'point2': point2,
         'real_distance': real_distance,
-        'pixel_distance': pixel_distance
+        'pixel_distance': pixel_distance,
+        'pixel_space': pixel_space
     }
+    
+    remeasured = PlanMeasurementService(plan).remeasure()
     db.session.commit()
     
     return jsonify({
         'success': True,
-        'scale_factor': scale_factor
+        'scale_factor': scale_factor,
+        'rooms': remeasured['rooms'],
+        'measurements_updated': remeasured['measurements_updated'],
+        'skipped': remeasured['skipped']
     })
 
 
+@api_bp.route('/plans/<int:plan_id>/analysis')
+@login_required
+def get_plan_analysis(plan_id):
+    plan = ProjectPlan.query.join(Project).filter(
+        ProjectPlan.id == plan_id,
+        Project.company_id == current_user.company_id
+    ).first_or_404()
+    
+    if not plan.analysis:
+        return jsonify({'status': None})
+    
+    return jsonify(plan.analysis.to_dict())
+
+
+@api_bp.route('/plans/<int:plan_id>/tiles')
+@login_required
+def get_plan_tiles(plan_id):
+    plan = ProjectPlan.query.join(Project).filter(
+        ProjectPlan.id == plan_id,
+        Project.company_id == current_user.company_id
+    ).first_or_404()
+    
+    if plan.analysis and not plan.analysis.is_finished:
+        return jsonify({'available': False, 'status': plan.analysis.status.value}), 202
+    
+    # Plans uploaded before background analysis, or whose tiles were evicted
+    # from the plan cache, are rendered in the background on first use
+    rendered = plan.raster_data and os.path.isdir(plan_tiles_dir(plan))
+    failed = plan.analysis and plan.analysis.status == JobStatus.FAILED
+    if not rendered and not failed and os.path.isfile(plan.file_path):
+        record = plan_analysis.enqueue(plan)
+        return jsonify({'available': False, 'status': record.status.value}), 202
+    
+    if not rendered:
+        return jsonify({'available': False})
+    
+    return jsonify(dict(plan.raster_data, available=True))
+
+
+@api_bp.route('/plans/<int:plan_id>/tiles/<int:page>/<int:z>/<int:x>/<int:y>.png')
+@login_required
+def get_plan_tile(plan_id, page, z, x, y):
+    plan = ProjectPlan.query.join(Project).filter(
+        ProjectPlan.id == plan_id,
+        Project.company_id == current_user.company_id
+    ).first_or_404()
+    
+    tile_path = PlanRasterizer(plan.file_path, output_dir=plan_tiles_dir(plan)).tile_path(page, z, x, y)
+    if not os.path.isfile(tile_path):
+        abort(404)
+    
+    return send_file(os.path.abspath(tile_path), mimetype='image/png', max_age=86400)
+
+
 @api_bp.route('/plans/<int:plan_id>/measurements', methods=['POST'])
 @login_required
 def add_measurement(plan_id):
@@ -133,6 +298,10 @@ def add_measurement(plan_id):
     
     data = request.get_json()
     
+    pixel_space = _pixel_space(data, plan)
+    if PlanMeasurementService.validate_pixel_space(pixel_space):
+        return jsonify({'error': PlanMeasurementService.validate_pixel_space(pixel_space)}), 400
+    
     measurement = Measurement(
         plan_id=plan_id,
         room_id=data.get('room_id'),
@@ -142,6 +311,7 @@ def add_measurement(plan_id):
         confidence=data.get('confidence', 'medium'),
         source='manual',
         polygon_data=data.get('polygon_data'),
+        pixel_space=pixel_space if data.get('polygon_data') else None,
         created_by_id=current_user.id
     )
     db.session.add(measurement)
@@ -154,47 +324,198 @@ def add_measurement(plan_id):
     }), 201
 
 
+@api_bp.route('/plans/<int:plan_id>/measurements/batch', methods=['POST'])
+@login_required
+def add_measurements_batch(plan_id):
+    plan = ProjectPlan.query.join(Project).filter(
+        ProjectPlan.id == plan_id,
+        Project.company_id == current_user.company_id
+    ).first_or_404()
+    
+    items = (request.get_json() or {}).get('measurements')
+    error = _check_batch(items)
+    if error:
+        return jsonify({'error': error}), 400
+    
+    room_ids = {room_id for room_id, in db.session.query(Room.id).filter_by(project_id=plan.project_id)}
+    
+    rows = []
+    results = []
+    for index, item in enumerate(items):
+        errors = []
+        if not isinstance(item, dict):
+            results.append({'index': index, 'errors': ['Objet attendu']})
+            continue
+        
+        room_id = item.get('room_id')
+        if room_id is not None and room_id not in room_ids:
+            errors.append('Pièce inconnue')
+        
+        polygon = item.get('polygon_data')
+        pixel_space = _pixel_space(item, plan)
+        if polygon is not None:
+            polygon_error = PlanMeasurementService.validate_polygon(polygon) or \
+                PlanMeasurementService.validate_pixel_space(pixel_space)
+            if polygon_error:
+                errors.append(polygon_error)
+        
+        values = _batch_numbers(item, {'quantity': 0}, errors)
+        values.update(_batch_strings(item, Measurement, {'measurement_type': 'area', 'unit': 'm²', 'confidence': 'medium'}, errors))
+        
+        results.append({'index': index, 'errors': errors})
+        rows.append({
+            'plan_id': plan_id,
+            'room_id': room_id,
+            'measurement_type': values['measurement_type'],
+            'unit': values['unit'],
+            'quantity': values['quantity'],
+            'confidence': values['confidence'],
+            'source': 'manual',
+            'polygon_data': polygon,
+            'pixel_space': pixel_space if polygon else None,
+            'created_by_id': current_user.id
+        })
+    
+    if any(result['errors'] for result in results):
+        return jsonify({'error': 'Données invalides', 'results': results}), 400
+    
+    # Geometric quantities are recomputed from the polygon rather than trusted from the client
+    service = PlanMeasurementService(plan)
+    quantities = service.quantities([
+        (row['measurement_type'], row['polygon_data'] or []) for row in rows
+    ])
+    for row, quantity in zip(rows, quantities):
+        if quantity is not None and row['polygon_data'] and service.measurable(row['pixel_space']):
+            row['quantity'] = quantity
+    
+    ids = db.session.execute(
+        db.insert(Measurement).returning(Measurement.id, sort_by_parameter_order=True).execution_options(render_nulls=True),
+        rows
+    ).scalars().all()
+    db.session.commit()
+    
+    return jsonify({
+        'created': len(ids),
+        'results': [{
+            'index': index,
+            'id': measurement_id,
+            'quantity': float(row['quantity']),
+            'unit': row['unit']
+        } for index, (measurement_id, row) in enumerate(zip(ids, rows))]
+    }), 201
+
+
+def _pixel_space(data, plan):
+    """Pixel space of a request polygon, by default that of the plan calibration."""
+    if 'pixel_space' in data:
+        return data['pixel_space']
+    return PlanMeasurementService(plan).pixel_space if plan else 'canvas'
+
+
+BATCH_MAX_ITEMS = 500
+
+
+def _check_batch(items):
+    if not isinstance(items, list) or not items:
+        return 'Aucun élément fourni'
+    if len(items) > BATCH_MAX_ITEMS:
+        return f'Maximum {BATCH_MAX_ITEMS} éléments par lot'
+    return None
+
+
+def _batch_numbers(item, defaults, errors):
+    values = {}
+    for field, default in defaults.items():
+        value = item.get(field)
+        if value is None:
+            values[field] = Decimal(str(default)) if default is not None else None
+            continue
+        try:
+            values[field] = Decimal(str(value))
+            if not values[field].is_finite():
+                raise ValueError
+        except Exception:
+            errors.append(f'{field} invalide')
+            values[field] = None
+    return values
+
+
+def _batch_strings(item, model, defaults, errors):
+    """Text fields of a batch item, checked against the length of their column."""
+    values = {}
+    for field, default in defaults.items():
+        value = item.get(field) or default
+        length = model.__table__.c[field].type.length
+        if value is not None and (not isinstance(value, str) or len(value) > length):
+            errors.append(f'{field} invalide ({length} caractères maximum)')
+            value = None
+        values[field] = value
+    return values
+
+
 @api_bp.route('/bpu/search')
 @login_required
 def search_bpu():
     query = request.args.get('q', '')
-    category = request.args.get('category', '')
-    
-    from models import BPULibrary
+    category = request.args.get('category', '') or None
+    limit = request.args.get('limit', 50, type=int)
     
-    library = BPULibrary.query.filter_by(
-        country=current_user.company.country,
-        is_active=True
-    ).order_by(BPULibrary.version.desc()).first()
-    
-    if not library:
+    if not query:
         return jsonify([])
     
-    articles_query = BPUArticle.query.filter_by(library_id=library.id)
-    
-    if query:
-        articles_query = articles_query.filter(
-            db.or_(
-                BPUArticle.code.ilike(f'%{query}%'),
-                BPUArticle.designation.ilike(f'%{query}%')
-            )
+    tier_id = request.args.get('tier_id', type=int)
+    tier = PricingTier.query.filter_by(id=tier_id, company_id=current_user.company_id).first() if tier_id else None
+    tier = tier or QuoteGenerator.resolve_tier(current_user.company)
+    
+    articles = ArticleSearch(current_user.company).search(query, limit=min(limit, 50), category=category)
+    
+    results = []
+    for a in articles:
+        unit_price = ArticleSearch.tier_price(a, tier) if tier else None
+        results.append({
+            'id': a.id,
+            'source': a.source,
+            'article_id': a.id if a.source == 'library' else None,
+            'custom_article_id': a.id if a.source == 'custom' else None,
+            'code': a.code,
+            'category': a.category,
+            'designation': a.designation,
+            'unit': a.unit,
+            'price_eco': float(a.unit_price_eco) if a.unit_price_eco else 0,
+            'price_std': float(a.unit_price_standard) if a.unit_price_standard else 0,
+            'price_prem': float(a.unit_price_premium) if a.unit_price_premium else 0,
+            'tier_id': tier.id if tier else None,
+            'unit_price': float(unit_price) if unit_price is not None else None
+        })
+    
+    return jsonify(results)
+
+
+@api_bp.route('/quotes/batch', methods=['POST'])
+@login_required
+@require_permission('can_manage_quotes')
+def batch_generate_quotes():
+    data = request.get_json() or {}
+    
+    try:
+        project_ids = [int(project_id) for project_id in data.get('project_ids', [])]
+        tier_ids = [int(tier_id) for tier_id in data.get('tier_ids', [])]
+        valid_days = int(data.get('valid_days', 30))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'Paramètres invalides'}), 400
+    
+    try:
+        summary = BatchQuoteGenerator(current_user.company, current_user).generate(
+            project_ids, tier_ids, valid_days, (data.get('notes') or '').strip()
         )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
-    if category:
-        articles_query = articles_query.filter_by(category=category)
-    
-    articles = articles_query.limit(50).all()
+    log_action('batch_create', 'quote', None, None, {
+        'references': [q['reference'] for project in summary for q in project.get('quotes', [])]
+    })
     
-    return jsonify([{
-        'id': a.id,
-        'code': a.code,
-        'category': a.category,
-        'designation': a.designation,
-        'unit': a.unit,
-        'price_eco': float(a.unit_price_eco) if a.unit_price_eco else 0,
-        'price_std': float(a.unit_price_standard) if a.unit_price_standard else 0,
-        'price_prem': float(a.unit_price_premium) if a.unit_price_premium else 0
-    } for a in articles])
+    return jsonify({'projects': summary}), 201
 
 
 @api_bp.route('/quotes/<int:quote_id>/versions/<int:version_id>/lines', methods=['POST'])
@@ -213,7 +534,7 @@ def add_quote_line(quote_id, version_id):
     
     quantity = Decimal(str(data.get('quantity', 0)))
     unit_price = Decimal(str(data.get('unit_price', 0)))
-    total_price = quantity * unit_price
+    total_price = calculate_line_total(quantity, unit_price)
     
     line = QuoteLine(
         version_id=version_id,
@@ -231,10 +552,9 @@ def add_quote_line(quote_id, version_id):
     )
     db.session.add(line)
     
-    version.subtotal_ht = sum(l.total_price for l in version.lines) + total_price
-    version.vat_amount = version.subtotal_ht * (version.vat_rate or Decimal('20')) / 100
-    version.total_ttc = version.subtotal_ht + version.vat_amount
+    version.apply_line_delta(total_price)
     
+    ExportService(current_user.company).invalidate_version(quote, version)
     db.session.commit()
     
     return jsonify({
@@ -243,6 +563,43 @@ def add_quote_line(quote_id, version_id):
     }), 201
 
 
+@api_bp.route('/quotes/<int:quote_id>/versions/<int:version_id>/lines/<int:line_id>', methods=['PUT'])
+@login_required
+def update_quote_line(quote_id, version_id, line_id):
+    from models import Quote, Project
+    
+    quote = Quote.query.join(Project).filter(
+        Quote.id == quote_id,
+        Project.company_id == current_user.company_id
+    ).first_or_404()
+    
+    version = QuoteVersion.query.filter_by(id=version_id, quote_id=quote_id).first_or_404()
+    line = QuoteLine.query.filter_by(id=line_id, version_id=version_id).first_or_404()
+    
+    data = request.get_json()
+    
+    for field in ('category', 'designation', 'unit', 'room_id', 'quantity_source', 'sort_order'):
+        if field in data:
+            setattr(line, field, data[field])
+    if 'quantity' in data:
+        line.quantity = Decimal(str(data['quantity']))
+    if 'unit_price' in data:
+        line.unit_price = Decimal(str(data['unit_price']))
+    
+    old_total = line.total_price
+    line.total_price = calculate_line_total(line.quantity, line.unit_price)
+    
+    version.apply_line_delta(line.total_price - old_total)
+    
+    ExportService(current_user.company).invalidate_version(quote, version)
+    db.session.commit()
+    
+    return jsonify({
+        'id': line.id,
+        'total_price': float(line.total_price)
+    })
+
+
 @api_bp.route('/quotes/<int:quote_id>/versions/<int:version_id>/lines/<int:line_id>', methods=['DELETE'])
 @login_required
 def delete_quote_line(quote_id, version_id, line_id):
@@ -258,10 +615,26 @@ def delete_quote_line(quote_id, version_id, line_id):
     
     db.session.delete(line)
     
-    version.subtotal_ht = sum(l.total_price for l in version.lines if l.id != line_id)
-    version.vat_amount = version.subtotal_ht * (version.vat_rate or Decimal('20')) / 100
-    version.total_ttc = version.subtotal_ht + version.vat_amount
+    version.apply_line_delta(-line.total_price)
     
+    ExportService(current_user.company).invalidate_version(quote, version)
     db.session.commit()
     
     return jsonify({'success': True})
+
+
+@api_bp.route('/exports/<int:job_id>')
+@login_required
+def get_export_job(job_id):
+    from models import ExportJob, JobStatus
+    from flask import url_for
+    
+    job = ExportJob.query.filter_by(id=job_id, company_id=current_user.company_id).first_or_404()
+    
+    return jsonify({
+        'id': job.id,
+        'format': job.export_format,
+        'status': job.status.value,
+        'error': job.error,
+        'download_url': url_for('quotes.download_export', job_id=job.id) if job.status == JobStatus.DONE else None
+    })
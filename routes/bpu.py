@@ -1,9 +1,14 @@
 from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify, send_file
 from flask_login import login_required, current_user
-from models import db, BPULibrary, BPUArticle, CompanyBPUOverride, CompanyBPUArticle
+from models import db, BPUArticle, CompanyBPUOverride, CompanyBPUArticle, BPUCategoryFacet
 from security.decorators import require_permission
 from security.audit import log_action
 from services.bpu_service import BPUService
+from services.price_cache import price_book_cache
+from services.article_search import ArticleSearch
+from services.library_registry import library_registry
+from services.bpu_facets import CategoryFacets
+from utils.pagination import keyset_paginate
 import io
 
 bpu_bp = Blueprint('bpu', __name__)
@@ -14,8 +19,7 @@ bpu_bp = Blueprint('bpu', __name__)
 def index():
     company = current_user.company
     
-    library = BPULibrary.query.filter_by(country=company.country, is_active=True)\
-        .order_by(BPULibrary.version.desc()).first()
+    library = library_registry.active_library(company.country)
     
     if not library:
         flash('Aucune bibliothèque BPU disponible pour votre pays.', 'warning')
@@ -29,24 +33,24 @@ def index():
     if category:
         query = query.filter_by(category=category)
     
+    truncated = False
     if search:
-        query = query.filter(
-            db.or_(
-                BPUArticle.code.ilike(f'%{search}%'),
-                BPUArticle.designation.ilike(f'%{search}%')
-            )
-        )
+        # One more than shown, to tell the user when the best matches leave some out
+        matching_ids = ArticleSearch(company, library).library_ids(
+            search, category=category or None, limit=ArticleSearch.LISTING_LIMIT + 1)
+        truncated = len(matching_ids) > ArticleSearch.LISTING_LIMIT
+        query = query.filter(BPUArticle.id.in_(matching_ids[:ArticleSearch.LISTING_LIMIT]))
     
-    articles = query.order_by(BPUArticle.category, BPUArticle.sort_order).all()
+    articles = keyset_paginate(query, BPUArticle.listing_keys(),
+        cursor=request.args.get('cursor'))
     
-    categories = db.session.query(BPUArticle.category)\
-        .filter_by(library_id=library.id)\
-        .distinct()\
-        .order_by(BPUArticle.category)\
-        .all()
-    categories = [c[0] for c in categories]
+    categories = CategoryFacets(company, library).library_categories()
     
-    overrides = {o.article_id: o for o in company.bpu_overrides.all()}
+    article_ids = [article.id for article in articles]
+    overrides = {
+        o.article_id: o
+        for o in company.bpu_overrides.filter(CompanyBPUOverride.article_id.in_(article_ids))
+    } if article_ids else {}
     
     return render_template('bpu/index.html',
         library=library,
@@ -54,7 +58,9 @@ def index():
         categories=categories,
         overrides=overrides,
         current_category=category,
-        search_term=search
+        search_term=search,
+        search_truncated=truncated,
+        search_limit=ArticleSearch.LISTING_LIMIT
     )
 
 
@@ -106,6 +112,7 @@ def new_custom_article():
         )
         db.session.add(article)
         db.session.commit()
+        price_book_cache.invalidate(current_user.company_id)
         
         log_action('create', 'bpu_article', article.id, None, {'code': code, 'designation': designation})
         
@@ -170,6 +177,7 @@ def edit_custom_article(article_id):
         article.unit_price_premium = price_prem
 
         db.session.commit()
+        price_book_cache.invalidate(current_user.company_id)
 
         log_action('update', 'bpu_article', article.id, old_values, {'code': code})
 
@@ -196,6 +204,7 @@ def delete_custom_article(article_id):
     # Soft delete
     article.is_active = False
     db.session.commit()
+    price_book_cache.invalidate(current_user.company_id)
 
     log_action('delete', 'bpu_article', article.id, None, {'code': article.code})
 
@@ -240,6 +249,7 @@ def override_article(article_id):
     override.is_disabled = is_disabled
     
     db.session.commit()
+    price_book_cache.invalidate(company.id)
     
     new_values = {
         'price_eco': price_eco,
@@ -260,12 +270,16 @@ def override_article(article_id):
 def export_excel():
     company = current_user.company
     bpu_service = BPUService(company)
-    excel_buffer = bpu_service.export_to_excel()
+    excel_file = bpu_service.export_to_excel()
+    
+    if not excel_file:
+        flash('Aucune bibliothèque BPU disponible pour votre pays.', 'warning')
+        return redirect(url_for('bpu.index'))
     
     log_action('export', 'bpu', None, None, {'format': 'excel'})
     
     return send_file(
-        excel_buffer,
+        excel_file,
         as_attachment=True,
         download_name=f"BPU_{company.slug}.xlsx",
         mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
@@ -295,6 +309,9 @@ def import_excel():
     if result['success']:
         log_action('import', 'bpu', None, None, result['stats'])
         flash(f"Import réussi: {result['stats']['created']} créés, {result['stats']['updated']} mis à jour.", 'success')
+        if result['errors']:
+            details = ', '.join(f"ligne {e['row']} ({e['error']})" for e in result['errors'][:5])
+            flash(f"{result['stats']['errors']} lignes ignorées: {details}", 'warning')
     else:
         flash(f"Erreur lors de l'import: {result['error']}", 'error')
     
@@ -306,25 +323,8 @@ def import_excel():
 def categories():
     company = current_user.company
 
-    # Get categories from Standard BPU (Library)
-    library = BPULibrary.query.filter_by(country=company.country, is_active=True)\
-        .order_by(BPULibrary.version.desc()).first()
-
-    lib_categories = []
-    if library:
-        lib_cats = db.session.query(BPUArticle.category)\
-            .filter_by(library_id=library.id)\
-            .distinct().all()
-        lib_categories = [c[0] for c in lib_cats]
-
-    # Get categories from Custom BPU
-    custom_cats = db.session.query(CompanyBPUArticle.category)\
-        .filter_by(company_id=company.id, is_active=True)\
-        .distinct().all()
-    custom_categories = [c[0] for c in custom_cats]
-
-    # Merge and sort
-    all_categories = sorted(list(set(lib_categories + custom_categories)))
+    # Standard BPU (Library) and Custom BPU categories, with their article counts
+    all_categories = CategoryFacets(company).categories()
 
     return render_template('bpu/categories.html', categories=all_categories)
 
@@ -345,6 +345,7 @@ def rename_category():
         company_id=current_user.company_id,
         category=old_name
     ).update({CompanyBPUArticle.category: new_name})
+    BPUCategoryFacet.rename_category(current_user.company_id, old_name, new_name)
 
     db.session.commit()
 
@@ -367,8 +368,10 @@ def delete_category():
         company_id=current_user.company_id,
         category=name
     ).update({CompanyBPUArticle.is_active: False})
+    BPUCategoryFacet.archive_category(current_user.company_id, name)
 
     db.session.commit()
+    price_book_cache.invalidate(current_user.company_id)
 
     if count > 0:
         flash(f'Catégorie supprimée ({count} articles archivés).', 'success')
@@ -1,7 +1,6 @@
 from flask import Blueprint, render_template, redirect, url_for
 from flask_login import login_required, current_user
-from models import Project, Quote, ProjectStatus
-from sqlalchemy import func
+from services.dashboard import dashboard_cache
 
 main_bp = Blueprint('main', __name__)
 
@@ -21,26 +20,12 @@ def dashboard():
     if not current_user.company.onboarding_completed:
         return redirect(url_for('onboarding.index'))
     
-    company = current_user.company
-    
-    total_projects = Project.query.filter_by(company_id=company.id).count()
-    active_projects = Project.query.filter(
-        Project.company_id == company.id,
-        Project.status.in_([ProjectStatus.DRAFT, ProjectStatus.IN_PROGRESS, ProjectStatus.PENDING_QUESTIONS])
-    ).count()
-    
-    total_quotes = Quote.query.join(Project).filter(Project.company_id == company.id).count()
-    
-    recent_projects = Project.query.filter_by(company_id=company.id)\
-        .order_by(Project.updated_at.desc()).limit(5).all()
-    
-    recent_quotes = Quote.query.join(Project).filter(Project.company_id == company.id)\
-        .order_by(Quote.updated_at.desc()).limit(5).all()
+    snapshot = dashboard_cache.snapshot(current_user.company_id)
     
     return render_template('dashboard.html',
-        total_projects=total_projects,
-        active_projects=active_projects,
-        total_quotes=total_quotes,
-        recent_projects=recent_projects,
-        recent_quotes=recent_quotes
+        total_projects=snapshot.total_projects,
+        active_projects=snapshot.active_projects,
+        total_quotes=snapshot.total_quotes,
+        recent_projects=snapshot.recent_projects,
+        recent_quotes=snapshot.recent_quotes
     )
@@ -1,6 +1,8 @@
 from flask import Blueprint, render_template, redirect, url_for, flash, request
 from flask_login import login_required, current_user
-from models import db, BPULibrary, CompanyBranding, TaxProfile, PricingTier
+from models import db, CompanyBranding, TaxProfile, PricingTier
+from services.export_cache import export_cache
+from services.library_registry import library_registry
 from werkzeug.utils import secure_filename
 import os
 
@@ -58,6 +60,7 @@ def step_country():
                 tax_profile.default_vat_rate = COUNTRIES[country]['vat']
             
             db.session.commit()
+            export_cache.invalidate_company(company.id)
             
             flash('Pays configuré avec succès!', 'success')
             return redirect(url_for('onboarding.step_tax'))
@@ -82,6 +85,7 @@ def step_tax():
         
         company.onboarding_step = 3
         db.session.commit()
+        export_cache.invalidate_company(company.id)
         
         flash('Profil fiscal configuré!', 'success')
         return redirect(url_for('onboarding.step_bpu'))
@@ -94,8 +98,7 @@ def step_tax():
 def step_bpu():
     company = current_user.company
     
-    libraries = BPULibrary.query.filter_by(country=company.country, is_active=True)\
-        .order_by(BPULibrary.version.desc()).all()
+    libraries = library_registry.active_libraries(company.country)
     
     if request.method == 'POST':
         company.onboarding_step = 4
@@ -165,6 +168,7 @@ def step_branding():
         
         company.onboarding_step = 6
         db.session.commit()
+        export_cache.invalidate_company(company.id)
         
         flash('Identité visuelle configurée!', 'success')
         return redirect(url_for('onboarding.step_complete'))
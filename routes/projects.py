@@ -4,6 +4,9 @@ from models import db, Project, ProjectPlan, Room, Measurement, PricingTier, Pro
 from werkzeug.utils import secure_filename
 from security.decorators import require_permission
 from security.audit import log_action
+from services.plan_raster import PlanRasterizer
+from services.plan_analysis import plan_analysis
+from utils.pagination import keyset_paginate
 import os
 import uuid
 
@@ -39,7 +42,8 @@ def index():
         except ValueError:
             pass
     
-    projects = query.order_by(Project.updated_at.desc()).all()
+    projects = keyset_paginate(query, [Project.updated_at, Project.id],
+        cursor=request.args.get('cursor'), descending=True)
     
     return render_template('projects/index.html', 
         projects=projects,
@@ -163,6 +167,8 @@ def plans(project_id):
             
             log_action('upload', 'plan', plan.id, None, {'filename': filename, 'type': file_type})
             
+            plan_analysis.enqueue(plan)
+            
             flash('Plan uploadé avec succès!', 'success')
             return redirect(url_for('projects.calibrate', project_id=project_id, plan_id=plan.id))
         else:
@@ -177,7 +183,7 @@ def plans(project_id):
 def calibrate(project_id, plan_id):
     project = Project.query.filter_by(id=project_id, company_id=current_user.company_id).first_or_404()
     plan = ProjectPlan.query.filter_by(id=plan_id, project_id=project_id).first_or_404()
-    return render_template('projects/calibrate.html', project=project, plan=plan)
+    return render_template('projects/calibrate.html', project=project, plan=plan, plan_raster_dpi=PlanRasterizer.DPI)
 
 
 @projects_bp.route('/<int:project_id>/plans/<int:plan_id>/measure')
@@ -186,7 +192,7 @@ def calibrate(project_id, plan_id):
 def measure(project_id, plan_id):
     project = Project.query.filter_by(id=project_id, company_id=current_user.company_id).first_or_404()
     plan = ProjectPlan.query.filter_by(id=plan_id, project_id=project_id).first_or_404()
-    return render_template('projects/measure.html', project=project, plan=plan)
+    return render_template('projects/measure.html', project=project, plan=plan, plan_raster_dpi=PlanRasterizer.DPI)
 
 
 @projects_bp.route('/<int:project_id>/questions')
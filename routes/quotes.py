@@ -1,11 +1,14 @@
 from flask import Blueprint, render_template, redirect, url_for, flash, request, send_file
 from flask_login import login_required, current_user
-from models import db, Quote, QuoteVersion, QuoteLine, QuoteAssumption, Project, QuoteStatus, AuditLog
+from models import db, Quote, Project, QuoteStatus, AuditLog, ExportJob, JobStatus
 from security.decorators import require_permission
 from security.audit import log_action
 from services.quote_generator import QuoteGenerator
-from services.export_service import ExportService
+from services.export_jobs import export_jobs
+from utils.pagination import keyset_paginate
+from sqlalchemy.orm import contains_eager
 from datetime import datetime, timedelta
+import os
 
 quotes_bp = Blueprint('quotes', __name__)
 
@@ -16,7 +19,8 @@ def index():
     company = current_user.company
     status_filter = request.args.get('status', '')
     
-    query = Quote.query.join(Project).filter(Project.company_id == company.id)
+    query = Quote.query.join(Project).options(contains_eager(Quote.project))\
+        .filter(Quote.company_id == company.id)
     
     if status_filter:
         try:
@@ -25,7 +29,8 @@ def index():
         except ValueError:
             pass
     
-    quotes = query.order_by(Quote.updated_at.desc()).all()
+    quotes = keyset_paginate(query, [Quote.updated_at, Quote.id],
+        cursor=request.args.get('cursor'), descending=True)
     
     return render_template('quotes/index.html',
         quotes=quotes,
@@ -47,6 +52,7 @@ def new(project_id):
         
         quote = Quote(
             project_id=project_id,
+            company_id=project.company_id,
             status=QuoteStatus.DRAFT,
             valid_until=datetime.utcnow().date() + timedelta(days=valid_days),
             notes=notes
@@ -115,51 +121,9 @@ def edit(quote_id):
         elif action == 'new_version':
             new_version_number = quote.current_version + 1
             
-            new_version = QuoteVersion(
-                quote_id=quote.id,
-                version_number=new_version_number,
-                tier_id=current_version.tier_id,
-                vat_rate=current_version.vat_rate,
-                created_by_id=current_user.id
-            )
-            db.session.add(new_version)
-            db.session.flush()
-            
-            for line in current_version.lines:
-                new_line = QuoteLine(
-                    version_id=new_version.id,
-                    article_id=line.article_id,
-                    custom_article_id=line.custom_article_id,
-                    category=line.category,
-                    designation=line.designation,
-                    unit=line.unit,
-                    quantity=line.quantity,
-                    unit_price=line.unit_price,
-                    total_price=line.total_price,
-                    measurement_id=line.measurement_id,
-                    room_id=line.room_id,
-                    quantity_source=line.quantity_source,
-                    sort_order=line.sort_order
-                )
-                db.session.add(new_line)
-            
-            for assumption in current_version.assumptions:
-                new_assumption = QuoteAssumption(
-                    version_id=new_version.id,
-                    category=assumption.category,
-                    description=assumption.description,
-                    value=assumption.value,
-                    is_confirmed=assumption.is_confirmed,
-                    source=assumption.source
-                )
-                db.session.add(new_assumption)
-            
+            current_version.clone(new_version_number, current_user.id)
             quote.current_version = new_version_number
             
-            new_version.subtotal_ht = sum(line.total_price for line in new_version.lines)
-            new_version.vat_amount = new_version.subtotal_ht * (new_version.vat_rate or 20) / 100
-            new_version.total_ttc = new_version.subtotal_ht + new_version.vat_amount
-            
             db.session.commit()
             
             log_action('new_version', 'quote', quote.id, 
@@ -179,6 +143,17 @@ def edit(quote_id):
 @login_required
 @require_permission('can_export')
 def export_pdf(quote_id):
+    return _request_export(quote_id, 'pdf')
+
+
+@quotes_bp.route('/<int:quote_id>/export/excel')
+@login_required
+@require_permission('can_export')
+def export_excel(quote_id):
+    return _request_export(quote_id, 'excel')
+
+
+def _request_export(quote_id, export_format):
     quote = Quote.query.join(Project).filter(
         Quote.id == quote_id,
         Project.company_id == current_user.company_id
@@ -186,31 +161,40 @@ def export_pdf(quote_id):
     
     current_version = quote.versions.filter_by(version_number=quote.current_version).first()
     
-    export_service = ExportService(current_user.company)
-    pdf_path = export_service.generate_pdf(quote, current_version)
+    job = export_jobs.enqueue(quote, current_version, export_format, current_user)
     
-    log_action('export_pdf', 'quote', quote.id, None, {'version': current_version.version_number})
+    log_action(f'export_{export_format}', 'quote', quote.id, None, {'version': current_version.version_number})
     
-    return send_file(pdf_path, as_attachment=True, download_name=f"{quote.reference}_V{current_version.version_number}.pdf")
+    return redirect(url_for('quotes.export_job', job_id=job.id))
 
 
-@quotes_bp.route('/<int:quote_id>/export/excel')
+@quotes_bp.route('/exports/<int:job_id>')
 @login_required
 @require_permission('can_export')
-def export_excel(quote_id):
-    quote = Quote.query.join(Project).filter(
-        Quote.id == quote_id,
-        Project.company_id == current_user.company_id
-    ).first_or_404()
+def export_job(job_id):
+    job = ExportJob.query.filter_by(id=job_id, company_id=current_user.company_id).first_or_404()
     
-    current_version = quote.versions.filter_by(version_number=quote.current_version).first()
+    if job.status == JobStatus.DONE:
+        return redirect(url_for('quotes.download_export', job_id=job.id))
+    
+    return render_template('quotes/export.html', job=job)
+
+
+@quotes_bp.route('/exports/<int:job_id>/download')
+@login_required
+@require_permission('can_export')
+def download_export(job_id):
+    job = ExportJob.query.filter_by(id=job_id, company_id=current_user.company_id).first_or_404()
     
-    export_service = ExportService(current_user.company)
-    excel_path = export_service.generate_excel(quote, current_version)
+    if job.status != JobStatus.DONE:
+        return redirect(url_for('quotes.export_job', job_id=job.id))
     
-    log_action('export_excel', 'quote', quote.id, None, {'version': current_version.version_number})
+    if not os.path.isfile(job.file_path):
+        # Evicted from the export cache since: render it again
+        job = export_jobs.enqueue(job.quote, job.version, job.export_format, current_user)
+        return redirect(url_for('quotes.export_job', job_id=job.id))
     
-    return send_file(excel_path, as_attachment=True, download_name=f"{quote.reference}_DQE_V{current_version.version_number}.xlsx")
+    return send_file(job.file_path, as_attachment=True, download_name=job.download_name)
 
 
 @quotes_bp.route('/<int:quote_id>/status', methods=['POST'])
@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""
+Contrôle des plans d'exécution des requêtes fréquentes.
+
+Les listes (projets, devis, BPU, journal d'audit) et les éditeurs (pièces,
+métrés, lignes de devis) filtrent par entreprise, projet, plan ou version.
+Ce script demande le plan de chacune de ces requêtes à la base et signale
+celles qui parcourent une table entière, faute d'index (voir
+init_db.update_schema pour créer les index manquants):
+
+    python -m scripts.check_query_plans
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def main():
+    from app import app
+    from models import db
+    from utils.query_plans import sequential_scans
+
+    with app.app_context():
+        flagged = sequential_scans(db.engine)
+
+    if not flagged:
+        print("Toutes les requêtes fréquentes utilisent un index.")
+        return 0
+
+    for name, table in flagged:
+        print(f"  - {name}: parcours complet de la table '{table}'")
+    print(f"{len(flagged)} parcours complet(s). Lancer init_db.py pour créer les index manquants.")
+    return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
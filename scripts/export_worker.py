@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Worker de génération des exports de devis (PDF / Excel) et d'analyse des plans.
+
+À lancer à côté du serveur web quand celui-ci tourne avec EXPORT_WORKER=external
+(et/ou PLAN_WORKER=external):
+
+    EXPORT_WORKER=external python -m scripts.export_worker
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ['EXPORT_WORKER'] = 'external'
+os.environ['PLAN_WORKER'] = 'external'
+
+
+def main(poll_interval=1.0):
+    from app import app
+    from models import db
+    from services.export_jobs import export_jobs
+    from services.plan_analysis import plan_analysis
+
+    print("Worker d'export DevisPro démarré.")
+
+    with app.app_context():
+        last_requeue = 0
+        while True:
+            if time.monotonic() - last_requeue > 60:
+                requeued = export_jobs.requeue_stale()
+                if requeued:
+                    print(f"  - {requeued} export(s) bloqué(s) remis en file.")
+                purged = export_jobs.purge_finished()
+                if purged:
+                    print(f"  - {purged} export(s) terminé(s) supprimé(s).")
+                requeued = plan_analysis.requeue_stale()
+                if requeued:
+                    print(f"  - {requeued} analyse(s) de plan bloquée(s) remise(s) en file.")
+                last_requeue = time.monotonic()
+
+            job = export_jobs.claim()
+            if job:
+                job = export_jobs.run(job)
+                print(f"  - Export #{job.id} ({job.export_format}): {job.status.value}")
+                db.session.remove()
+                continue
+
+            analysis = plan_analysis.claim()
+            if analysis:
+                analysis = plan_analysis.run(analysis)
+                print(f"  - Analyse du plan #{analysis.plan_id}: {analysis.status.value}")
+                db.session.remove()
+                continue
+
+            db.session.remove()
+            time.sleep(poll_interval)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+Contrôle des totaux des versions de devis.
+
+Les totaux HT/TVA/TTC sont maintenus par deltas à chaque modification de
+ligne. Ce script compare les totaux stockés à la somme des lignes et, avec
+--repair, les recalcule en une seule requête:
+
+    python -m scripts.verify_quote_totals [--repair]
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def main(repair=False):
+    from app import app
+    from models import db, QuoteVersion
+
+    with app.app_context():
+        drifted = QuoteVersion.verify_totals()
+
+        if not drifted:
+            print("Tous les totaux de devis sont cohérents.")
+            return 0
+
+        for version_id, stored, expected in drifted:
+            print(f"  - Version #{version_id}: stocké {stored or 0} / lignes {expected}")
+
+        if not repair:
+            print(f"{len(drifted)} version(s) incohérente(s). Relancer avec --repair pour corriger.")
+            return 1
+
+        QuoteVersion.recalculate_totals([version_id for version_id, _, _ in drifted])
+        db.session.commit()
+        print(f"{len(drifted)} version(s) recalculée(s).")
+        return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(repair='--repair' in sys.argv[1:]))
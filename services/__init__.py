@@ -17,3 +17,83 @@ try:
     from services.bpu_service import BPUService
 except ImportError:
     pass
+
+try:
+    from services.price_resolver import PriceResolver, ResolvedPrice, PriceBook
+except ImportError:
+    pass
+
+try:
+    from services.price_cache import PriceBookCache, price_book_cache
+except ImportError:
+    pass
+
+try:
+    from services.export_jobs import ExportJobQueue, export_jobs
+except ImportError:
+    pass
+
+try:
+    from services.export_cache import ExportCache, export_cache
+except ImportError:
+    pass
+
+try:
+    from services.quote_batch import BatchQuoteGenerator
+except ImportError:
+    pass
+
+try:
+    from services.project_snapshot import ProjectSnapshot
+except ImportError:
+    pass
+
+try:
+    from services.plan_measurement import PlanMeasurementService
+except ImportError:
+    pass
+
+try:
+    from services.plan_raster import PlanRasterizer
+except ImportError:
+    pass
+
+try:
+    from services.plan_analysis import PlanAnalysisQueue, plan_analysis
+except ImportError:
+    pass
+
+try:
+    from services.plan_cache import PlanCache, plan_cache
+except ImportError:
+    pass
+
+try:
+    from services.dxf_reader import DXFReader, DXFDrawing
+except ImportError:
+    pass
+
+try:
+    from services.pdf_vectors import PDFVectorExtractor
+except ImportError:
+    pass
+
+try:
+    from services.dashboard import DashboardCache, dashboard_cache
+except ImportError:
+    pass
+
+try:
+    from services.article_search import ArticleSearch, SearchEntry
+except ImportError:
+    pass
+
+try:
+    from services.library_registry import LibraryRegistry, library_registry
+except ImportError:
+    pass
+
+try:
+    from services.bpu_facets import CategoryFacets, CategoryFacet
+except ImportError:
+    pass
@@ -0,0 +1,203 @@
+import re
+import unicodedata
+from collections import namedtuple
+from sqlalchemy import and_, case, func, join, literal, literal_column, or_, outerjoin, select, text, union_all
+from sqlalchemy.orm import aliased
+from algorithms.pricing import apply_tier_coefficient
+from models import db, BPUArticle, CompanyBPUArticle, CompanyBPUOverride
+from services.library_registry import library_registry
+
+
+SearchEntry = namedtuple('SearchEntry', [
+    'source', 'id', 'code', 'category', 'designation', 'unit',
+    'unit_price_eco', 'unit_price_standard', 'unit_price_premium'
+])
+
+LIGATURES = str.maketrans({'œ': 'oe', 'Œ': 'oe', 'æ': 'ae', 'Æ': 'ae', 'ß': 'ss'})
+NON_WORD = re.compile(r'[^a-z0-9]+')
+
+# Ranking tiers, best first
+EXACT_CODE, CODE_PREFIX, TERMS, SIMILAR = 3, 2, 1, 0
+
+# Custom articles first among equal ranks
+SOURCE_ORDER = {'custom': 0, 'library': 1}
+
+PRICE_COLUMNS = ('unit_price_eco', 'unit_price_standard', 'unit_price_premium')
+
+
+def normalize(value):
+    """Lower case, without accents, ligatures or punctuation: 'Béton armé (Œuvre)' -> 'beton arme oeuvre'."""
+    value = unicodedata.normalize('NFKD', (value or '').translate(LIGATURES).lower())
+    value = ''.join(c for c in value if not unicodedata.combining(c))
+    return NON_WORD.sub(' ', value).strip()
+
+
+def code_key(code):
+    """Article code compared by prefix, without separators: 'GO-FOND.01' -> 'gofond01'."""
+    return normalize(code).replace(' ', '')
+
+
+def like_escape(value):
+    """A user string matched literally by LIKE ... ESCAPE '/'."""
+    return re.sub(r'([/%_])', r'/\1', value)
+
+
+_trigram_support = {}
+
+
+def trigram_search_available():
+    """Whether the database has the pg_trgm extension and the functions created by init_db.update_search_indexes()."""
+    engine = db.engine
+    if engine.dialect.name != 'postgresql':
+        return False
+    if engine.url not in _trigram_support:
+        try:
+            _trigram_support[engine.url] = bool(db.session.execute(text(
+                "SELECT count(*) = 2 FROM pg_proc WHERE proname IN ('devispro_search_text', 'devispro_code_key')"
+            )).scalar()) and bool(db.session.execute(text(
+                "SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'"
+            )).scalar())
+        except Exception:
+            db.session.rollback()
+            _trigram_support[engine.url] = False
+    return _trigram_support[engine.url]
+
+
+class ArticleSearch:
+    """
+    Ranked search of the articles a company can quote, as it quotes them:
+    its active library with its overrides applied, without the disabled
+    articles and the codes its active custom articles take over, and those
+    custom articles, in one query.
+
+    Results come in tiers: exact code, code prefix, every query term found,
+    then similar spellings. With pg_trgm the query is accent-insensitive and
+    runs on the trigram and code prefix indexes of init_db.py; elsewhere it
+    falls back to ILIKE on the code and designation, case-insensitive only
+    and without the similar spellings tier.
+    """
+
+    DEFAULT_LIMIT = 20
+    MAX_LIMIT = 1000
+    # Best matches that filter the BPU listing
+    LISTING_LIMIT = 500
+
+    def __init__(self, company, library=None):
+        self.company = company
+        self.library = library or library_registry.active_library(company.country)
+
+    def search(self, query, limit=DEFAULT_LIMIT, category=None, sources=('custom', 'library')):
+        """SearchEntry tuples, best match first."""
+        return self._search(query, limit, category, sources, listing=False)
+
+    def library_ids(self, query, category=None, limit=LISTING_LIMIT):
+        """Ids of the matching library articles, disabled and replaced ones included, to filter the BPU listing."""
+        return [entry.id for entry in self._search(query, limit, category, ('library',), listing=True)]
+
+    @staticmethod
+    def tier_price(entry, tier):
+        """Unit price of a result in a pricing tier, None when the article has no price for it."""
+        base_price = getattr(entry, tier.price_column)
+        if base_price is None:
+            return None
+        return apply_tier_coefficient(base_price, tier.coefficient, tier.rounding if tier.rounding is not None else 2)
+
+    def _search(self, query, limit, category, sources, listing):
+        statement = self.statement(query, limit, category, sources, listing, trigram=trigram_search_available())
+        if statement is None:
+            return []
+        return [SearchEntry(*row[:9]) for row in db.session.execute(statement)]
+
+    def statement(self, query, limit=DEFAULT_LIMIT, category=None, sources=('custom', 'library'),
+                  listing=False, trigram=False):
+        """The search query, None when there is nothing to search."""
+        limit = max(1, min(limit or self.DEFAULT_LIMIT, self.MAX_LIMIT))
+        if not normalize(query):
+            return None
+
+        selects = []
+        if 'library' in sources and self.library:
+            override = aliased(CompanyBPUOverride)
+            visible = [] if listing else [
+                ~func.coalesce(override.is_disabled, False),
+                ~select(CompanyBPUArticle.id).where(
+                    CompanyBPUArticle.company_id == self.company.id,
+                    CompanyBPUArticle.is_active.is_(True),
+                    CompanyBPUArticle.code == BPUArticle.code
+                ).exists()
+            ]
+            prices = [func.coalesce(getattr(override, column), getattr(BPUArticle, column)) for column in PRICE_COLUMNS]
+            overridden = func.coalesce(override.designation_override, '') != ''
+
+            # Library designations on the trigram index, overridden ones from the company overrides
+            selects.append(self._select(
+                'library', BPUArticle, BPUArticle.designation, prices, query, category, trigram
+            ).select_from(outerjoin(BPUArticle, override, and_(
+                override.article_id == BPUArticle.id, override.company_id == self.company.id
+            ))).where(BPUArticle.library_id == self.library.id, ~overridden, *visible))
+            selects.append(self._select(
+                'library', BPUArticle, override.designation_override, prices, query, category, trigram
+            ).select_from(join(override, BPUArticle, BPUArticle.id == override.article_id)).where(
+                override.company_id == self.company.id, BPUArticle.library_id == self.library.id, overridden, *visible
+            ))
+        if 'custom' in sources:
+            selects.append(self._select(
+                'custom', CompanyBPUArticle, CompanyBPUArticle.designation,
+                [getattr(CompanyBPUArticle, column) for column in PRICE_COLUMNS], query, category, trigram
+            ).where(CompanyBPUArticle.company_id == self.company.id, CompanyBPUArticle.is_active.is_(True)))
+        if not selects:
+            return None
+
+        results = union_all(*selects).subquery()
+        return select(results).order_by(
+            results.c.tier.desc(), results.c.similarity.desc(), results.c.source_order,
+            results.c.sort_category, results.c.sort_order, results.c.id
+        ).limit(limit)
+
+    @staticmethod
+    def _select(source, model, designation, prices, query, category, trigram):
+        """One branch of the search: its result columns, rank and match condition."""
+        if trigram:
+            # The expressions of the indexes; terms and code are normalized like them, [a-z0-9] only
+            terms = normalize(query).split()
+            searched = func.devispro_search_text(model.code.concat(literal_column("' '")).concat(designation))
+            key = func.devispro_code_key(model.code)
+            code = code_key(query)
+            prefix = key.like(code + '%')
+            term_matches = [
+                searched.like(f'%{term}%') if len(term) >= 3 else searched.op('~')(f'\\m{term}')
+                for term in terms
+            ]
+            similarity = func.word_similarity(' '.join(terms), searched)
+            similar = [literal(' '.join(terms)).op('<%')(searched)]
+        else:
+            terms = query.split()
+            searched = model.code.concat(' ').concat(designation)
+            key = func.lower(model.code)
+            code = query.strip().lower()
+            prefix = model.code.ilike(like_escape(code) + '%', escape='/')
+            term_matches = [searched.ilike('%' + like_escape(term) + '%', escape='/') for term in terms]
+            similarity = literal(0)
+            similar = []
+
+        matched = and_(*term_matches)
+        # Short terms alone cannot use the trigram index, the other conditions can
+        term_condition = [matched] if not trigram or any(len(term) >= 3 for term in terms) else []
+
+        statement = select(
+            literal(source, db.String).label('source'), model.id, model.code, model.category, designation.label('designation'),
+            model.unit, *(price.label(column) for price, column in zip(prices, PRICE_COLUMNS)),
+            case(
+                (key == code, EXACT_CODE),
+                (prefix, CODE_PREFIX),
+                (matched, TERMS),
+                else_=SIMILAR
+            ).label('tier'),
+            similarity.label('similarity'),
+            literal(SOURCE_ORDER[source]).label('source_order'),
+            model.category.label('sort_category'),
+            func.coalesce(model.sort_order, 0).label('sort_order')
+        ).where(or_(prefix, *term_condition, *similar))
+        if category:
+            statement = statement.where(model.category == category)
+        return statement
@@ -1,41 +1,40 @@
-from models import db, BPUArticle, CompanyBPUOverride, CompanyBPUArticle, BPULibrary
+from models import db, BPUArticle, CompanyBPUOverride, CompanyBPUArticle, BPUCategoryFacet
+from services.price_cache import price_book_cache
+from services.price_resolver import PriceResolver
+from services.library_registry import library_registry
 from openpyxl import Workbook, load_workbook
-from openpyxl.styles import Font, Alignment, Border, Side, PatternFill
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, Alignment, Border, Side, PatternFill, NamedStyle
 from openpyxl.utils import get_column_letter
-import io
-from decimal import Decimal
+import tempfile
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
 
 
 class BPUService:
+    TIER_PRICE_COLUMNS = {
+        'ECO': 'unit_price_eco',
+        'STD': 'unit_price_standard',
+        'PREM': 'unit_price_premium'
+    }
+    IMPORT_CHUNK_SIZE = 500
+    EXPORT_BATCH_SIZE = 1000
+
     def __init__(self, company):
         self.company = company
     
     def get_library(self):
-        return BPULibrary.query.filter_by(
-            country=self.company.country,
-            is_active=True
-        ).order_by(BPULibrary.version.desc()).first()
+        return library_registry.active_library(self.company.country)
     
     def get_article_price(self, article, tier_code='STD'):
-        override = CompanyBPUOverride.query.filter_by(
-            company_id=self.company.id,
-            article_id=article.id
-        ).first()
+        price_column = self.TIER_PRICE_COLUMNS.get(tier_code, 'unit_price_standard')
+        book = PriceResolver(self.company, price_column, library=article.library).price_book()
         
-        if override:
-            if tier_code == 'ECO':
-                return override.price_eco or article.price_eco
-            elif tier_code == 'PREM':
-                return override.price_premium or article.price_premium
-            else:
-                return override.price_standard or article.price_standard
+        resolved = book.articles.get(article.id)
+        if resolved and resolved.base_price is not None:
+            return resolved.base_price
         
-        if tier_code == 'ECO':
-            return article.price_eco
-        elif tier_code == 'PREM':
-            return article.price_premium
-        else:
-            return article.price_standard
+        return getattr(article, price_column)
     
     def get_all_articles(self, include_custom=True):
         library = self.get_library()
@@ -53,135 +52,242 @@ class BPUService:
         return articles
     
     def export_to_excel(self):
+        """
+        Writes the library with the company overrides applied to a temporary file.
+        Uses a write-only worksheet fed from a streamed query so memory stays flat
+        whatever the size of the library; the caller streams the returned file.
+        """
         library = self.get_library()
         if not library:
             return None
         
-        articles = BPUArticle.query.filter_by(library_id=library.id)\
-            .order_by(BPUArticle.category, BPUArticle.sort_order).all()
-        
-        overrides = {o.article_id: o for o in self.company.bpu_overrides.all()}
+        rows = db.session.execute(
+            db.select(
+                BPUArticle.code,
+                BPUArticle.category,
+                BPUArticle.designation,
+                BPUArticle.unit,
+                BPUArticle.unit_price_eco,
+                BPUArticle.unit_price_standard,
+                BPUArticle.unit_price_premium,
+                CompanyBPUOverride.id,
+                CompanyBPUOverride.unit_price_eco,
+                CompanyBPUOverride.unit_price_standard,
+                CompanyBPUOverride.unit_price_premium
+            )
+            .outerjoin(CompanyBPUOverride, db.and_(
+                CompanyBPUOverride.article_id == BPUArticle.id,
+                CompanyBPUOverride.company_id == self.company.id
+            ))
+            .where(BPUArticle.library_id == library.id)
+            .order_by(BPUArticle.category, BPUArticle.sort_order)
+            .execution_options(yield_per=self.EXPORT_BATCH_SIZE)
+        )
         
-        wb = Workbook()
-        ws = wb.active
-        ws.title = 'BPU'
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet('BPU')
         
-        header_fill = PatternFill(start_color='1a56db', end_color='1a56db', fill_type='solid')
-        header_font = Font(bold=True, color='FFFFFF')
         border = Border(
             left=Side(style='thin'),
             right=Side(style='thin'),
             top=Side(style='thin'),
             bottom=Side(style='thin')
         )
-        
-        headers = ['Code', 'Catégorie', 'Désignation', 'Unité', 'Prix Éco', 'Prix Standard', 'Prix Premium', 'Personnalisé']
-        for col, header in enumerate(headers, 1):
-            cell = ws.cell(row=1, column=col, value=header)
-            cell.fill = header_fill
-            cell.font = header_font
-            cell.border = border
-            cell.alignment = Alignment(horizontal='center')
-        
-        category_fill = PatternFill(start_color='E3E8EF', end_color='E3E8EF', fill_type='solid')
-        
-        current_category = ''
-        row = 2
-        
-        for article in articles:
-            override = overrides.get(article.id)
-            has_override = override is not None
-            
-            ws.cell(row=row, column=1, value=article.code).border = border
-            ws.cell(row=row, column=2, value=article.category).border = border
-            ws.cell(row=row, column=3, value=article.designation).border = border
-            ws.cell(row=row, column=4, value=article.unit).border = border
-            
-            price_eco = float(override.price_eco if override and override.price_eco else article.price_eco or 0)
-            price_std = float(override.price_standard if override and override.price_standard else article.price_standard or 0)
-            price_prem = float(override.price_premium if override and override.price_premium else article.price_premium or 0)
-            
-            ws.cell(row=row, column=5, value=price_eco).border = border
-            ws.cell(row=row, column=6, value=price_std).border = border
-            ws.cell(row=row, column=7, value=price_prem).border = border
-            ws.cell(row=row, column=8, value='Oui' if has_override else '').border = border
-            
-            row += 1
+        wb.add_named_style(NamedStyle(
+            name='bpu_header',
+            font=Font(bold=True, color='FFFFFF'),
+            fill=PatternFill(start_color='1a56db', end_color='1a56db', fill_type='solid'),
+            border=border,
+            alignment=Alignment(horizontal='center')
+        ))
+        wb.add_named_style(NamedStyle(name='bpu_cell', border=border))
         
         for col in range(1, 9):
             ws.column_dimensions[get_column_letter(col)].width = 15
         ws.column_dimensions['C'].width = 50
         
-        buffer = io.BytesIO()
-        wb.save(buffer)
-        buffer.seek(0)
+        def styled_row(values, style):
+            cells = []
+            for value in values:
+                cell = WriteOnlyCell(ws, value=value)
+                cell.style = style
+                cells.append(cell)
+            return cells
+        
+        headers = ['Code', 'Catégorie', 'Désignation', 'Unité', 'Prix Éco', 'Prix Standard', 'Prix Premium', 'Personnalisé']
+        ws.append(styled_row(headers, 'bpu_header'))
+        
+        for (code, category, designation, unit, price_eco, price_std, price_prem,
+             override_id, override_eco, override_std, override_prem) in rows:
+            ws.append(styled_row([
+                code,
+                category,
+                designation,
+                unit,
+                float(override_eco or price_eco or 0),
+                float(override_std or price_std or 0),
+                float(override_prem or price_prem or 0),
+                'Oui' if override_id else ''
+            ], 'bpu_cell'))
         
-        return buffer
+        output = tempfile.TemporaryFile()
+        wb.save(output)
+        output.seek(0)
+        
+        return output
     
     def import_from_excel(self, file_stream):
+        """
+        Streams the workbook in read-only mode and upserts custom articles by chunk.
+        Returns created/updated counts in 'stats' and a per-row error report.
+        """
+        try:
+            wb = load_workbook(file_stream, read_only=True, data_only=True)
+        except Exception as e:
+            return {
+                'success': False,
+                'error': str(e)
+            }
+        
         try:
-            wb = load_workbook(file_stream)
             ws = wb.active
             
-            imported = 0
+            existing_codes = {code for (code,) in db.session.query(CompanyBPUArticle.code)
+                              .filter_by(company_id=self.company.id)}
+            
+            stats = {'created': 0, 'updated': 0, 'errors': 0}
             errors = []
+            chunk = {}
+            seen_codes = set()
             
-            for row in range(2, ws.max_row + 1):
-                code = ws.cell(row=row, column=1).value
-                if not code:
+            for row_number, values in enumerate(ws.iter_rows(min_row=2, max_col=7, values_only=True), start=2):
+                try:
+                    article = self._parse_import_row(values)
+                except ValueError as e:
+                    errors.append({'row': row_number, 'code': values[0] if values else None, 'error': str(e)})
                     continue
                 
-                category = ws.cell(row=row, column=2).value or ''
-                designation = ws.cell(row=row, column=3).value or ''
-                unit = ws.cell(row=row, column=4).value or ''
-                price_eco = ws.cell(row=row, column=5).value
-                price_std = ws.cell(row=row, column=6).value
-                price_prem = ws.cell(row=row, column=7).value
+                if article is None:
+                    continue
                 
-                try:
-                    existing = CompanyBPUArticle.query.filter_by(
-                        company_id=self.company.id,
-                        code=code
-                    ).first()
-                    
-                    if existing:
-                        existing.category = category
-                        existing.designation = designation
-                        existing.unit = unit
-                        existing.price_eco = Decimal(str(price_eco or 0))
-                        existing.price_standard = Decimal(str(price_std or 0))
-                        existing.price_premium = Decimal(str(price_prem or 0))
+                # Later rows win when a code appears twice in the file, counted once
+                if article['code'] not in seen_codes:
+                    seen_codes.add(article['code'])
+                    if article['code'] in existing_codes:
+                        stats['updated'] += 1
                     else:
-                        article = CompanyBPUArticle(
-                            company_id=self.company.id,
-                            code=code,
-                            category=category,
-                            designation=designation,
-                            unit=unit,
-                            price_eco=Decimal(str(price_eco or 0)),
-                            price_standard=Decimal(str(price_std or 0)),
-                            price_premium=Decimal(str(price_prem or 0))
-                        )
-                        db.session.add(article)
-                    
-                    imported += 1
-                    
-                except Exception as e:
-                    errors.append(f'Ligne {row}: {str(e)}')
+                        stats['created'] += 1
+                
+                chunk[article['code']] = article
+                if len(chunk) >= self.IMPORT_CHUNK_SIZE:
+                    self._upsert_custom_articles(list(chunk.values()))
+                    chunk = {}
             
+            if chunk:
+                self._upsert_custom_articles(list(chunk.values()))
+            
+            # The upserts bypass the flush listener that maintains the facets
+            BPUCategoryFacet.recount(('company', self.company.id))
             db.session.commit()
+            price_book_cache.invalidate(self.company.id)
+            
+            stats['errors'] = len(errors)
             
             return {
                 'success': True,
-                'imported': imported,
+                'stats': stats,
                 'errors': errors
             }
             
         except Exception as e:
+            db.session.rollback()
             return {
                 'success': False,
                 'error': str(e)
             }
+        finally:
+            wb.close()
+    
+    def _parse_import_row(self, values):
+        values = tuple(values) + (None,) * (7 - len(values))
+        code, category, designation, unit, price_eco, price_std, price_prem = values[:7]
+        
+        if code is None or str(code).strip() == '':
+            return None
+        
+        code = str(code).strip()
+        category = str(category or '').strip()
+        unit = str(unit or '').strip()
+        
+        if len(code) > 50:
+            raise ValueError('Code trop long (50 caractères max)')
+        if len(category) > 100:
+            raise ValueError('Catégorie trop longue (100 caractères max)')
+        if len(unit) > 20:
+            raise ValueError('Unité trop longue (20 caractères max)')
+        
+        prices = {}
+        for column, value in (('unit_price_eco', price_eco), ('unit_price_standard', price_std), ('unit_price_premium', price_prem)):
+            try:
+                price = Decimal(str(value or 0).strip().replace(',', '.'))
+            except InvalidOperation:
+                raise ValueError(f'Prix invalide: {value}')
+            if not price.is_finite() or price < 0:
+                raise ValueError(f'Prix invalide: {value}')
+            prices[column] = price
+        
+        return {
+            'company_id': self.company.id,
+            'code': code,
+            'category': category,
+            'designation': str(designation or '').strip(),
+            'unit': unit,
+            **prices
+        }
+    
+    def _upsert_custom_articles(self, articles):
+        now = datetime.utcnow()
+        for article in articles:
+            article.update(created_at=now, updated_at=now, is_active=True, sort_order=0)
+        
+        table = CompanyBPUArticle.__table__
+        dialect = db.engine.dialect.name
+        
+        if dialect in ('postgresql', 'sqlite'):
+            if dialect == 'postgresql':
+                from sqlalchemy.dialects.postgresql import insert
+            else:
+                from sqlalchemy.dialects.sqlite import insert
+            
+            stmt = insert(table)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[table.c.company_id, table.c.code],
+                set_={
+                    column: stmt.excluded[column]
+                    for column in ('category', 'designation', 'unit', 'unit_price_eco',
+                                   'unit_price_standard', 'unit_price_premium', 'is_active', 'updated_at')
+                }
+            )
+            db.session.execute(stmt, articles)
+            return
+        
+        # Other backends: split against the codes already stored
+        codes = [a['code'] for a in articles]
+        ids = dict(db.session.query(CompanyBPUArticle.code, CompanyBPUArticle.id).filter(
+            CompanyBPUArticle.company_id == self.company.id,
+            CompanyBPUArticle.code.in_(codes)
+        ).all())
+        
+        to_insert = [a for a in articles if a['code'] not in ids]
+        to_update = [
+            {k: v for k, v in dict(a, id=ids[a['code']]).items() if k not in ('created_at', 'sort_order')}
+            for a in articles if a['code'] in ids
+        ]
+        
+        if to_insert:
+            db.session.execute(table.insert(), to_insert)
+        if to_update:
+            db.session.execute(db.update(CompanyBPUArticle), to_update)
     
     def create_override(self, article_id, price_eco=None, price_standard=None, price_premium=None):
         existing = CompanyBPUOverride.query.filter_by(
@@ -191,22 +297,23 @@ class BPUService:
         
         if existing:
             if price_eco is not None:
-                existing.price_eco = price_eco
+                existing.unit_price_eco = price_eco
             if price_standard is not None:
-                existing.price_standard = price_standard
+                existing.unit_price_standard = price_standard
             if price_premium is not None:
-                existing.price_premium = price_premium
+                existing.unit_price_premium = price_premium
         else:
             override = CompanyBPUOverride(
                 company_id=self.company.id,
                 article_id=article_id,
-                price_eco=price_eco,
-                price_standard=price_standard,
-                price_premium=price_premium
+                unit_price_eco=price_eco,
+                unit_price_standard=price_standard,
+                unit_price_premium=price_premium
             )
             db.session.add(override)
         
         db.session.commit()
+        price_book_cache.invalidate(self.company.id)
         return True
     
     def remove_override(self, article_id):
@@ -215,4 +322,5 @@ class BPUService:
             article_id=article_id
         ).delete()
         db.session.commit()
+        price_book_cache.invalidate(self.company.id)
         return True
@@ -0,0 +1,81 @@
+from collections import OrderedDict, namedtuple
+import threading
+import time
+from sqlalchemy.orm import contains_eager
+from models import db, Project, Quote, CompanyStats
+
+
+RecentProject = namedtuple('RecentProject', ['id', 'name', 'reference', 'project_type', 'status'])
+RecentQuoteProject = namedtuple('RecentQuoteProject', ['id', 'name'])
+RecentQuote = namedtuple('RecentQuote', ['id', 'reference', 'current_version', 'status', 'project'])
+
+DashboardSnapshot = namedtuple('DashboardSnapshot', [
+    'total_projects', 'active_projects', 'total_quotes', 'recent_projects', 'recent_quotes'
+])
+
+
+class DashboardCache:
+    """
+    Process-local TTL cache of dashboard snapshots.
+
+    The counters come from company_stats; the snapshot, with the recent
+    projects and quotes, is stamped with CompanyStats.version, so a page load
+    costs one primary key lookup until a project or quote of the company is
+    written, from this worker or any other.
+    """
+
+    RECENT_LIMIT = 5
+
+    def __init__(self, max_entries=1024, ttl=30):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def snapshot(self, company_id):
+        stats = CompanyStats.for_company(company_id)
+
+        with self._lock:
+            entry = self._entries.get(company_id)
+            if entry and entry[1] == stats.version and entry[2] >= time.monotonic():
+                self._entries.move_to_end(company_id)
+                return entry[0]
+
+        snapshot = self._build(company_id, stats)
+        with self._lock:
+            self._entries[company_id] = (snapshot, stats.version, time.monotonic() + self.ttl)
+            self._entries.move_to_end(company_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return snapshot
+
+    def _build(self, company_id, stats):
+        projects = db.session.query(
+            Project.id, Project.name, Project.reference, Project.project_type, Project.status
+        ).filter(Project.company_id == company_id).order_by(Project.updated_at.desc()).limit(self.RECENT_LIMIT).all()
+
+        quotes = Quote.query.join(Project).options(contains_eager(Quote.project)).filter(
+            Quote.company_id == company_id
+        ).order_by(Quote.updated_at.desc()).limit(self.RECENT_LIMIT).all()
+
+        return DashboardSnapshot(
+            total_projects=stats.project_count,
+            active_projects=stats.active_project_count,
+            total_quotes=stats.quote_count,
+            recent_projects=[RecentProject(*row) for row in projects],
+            recent_quotes=[
+                RecentQuote(q.id, q.reference, q.current_version, q.status, RecentQuoteProject(q.project.id, q.project.name))
+                for q in quotes
+            ]
+        )
+
+    def invalidate(self, company_id):
+        with self._lock:
+            self._entries.pop(company_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+dashboard_cache = DashboardCache()
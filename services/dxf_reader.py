@@ -0,0 +1,403 @@
+import math
+import re
+from collections import Counter, namedtuple
+from functools import lru_cache
+from PIL import Image, ImageDraw, ImageFont
+from algorithms.geometry import batch_polygon_metrics
+from algorithms.spatial import GridIndex, bbox_of, point_in_polygon
+
+
+DXFEntity = namedtuple('DXFEntity', ['type', 'layer', 'points', 'closed', 'text', 'height', 'area', 'length'])
+
+# $INSUNITS code -> meters per drawing unit
+INSUNITS = {
+    1: 0.0254,      # pouces
+    2: 0.3048,      # pieds
+    4: 0.001,       # millimètres
+    5: 0.01,        # centimètres
+    6: 1.0,         # mètres
+    14: 0.1,        # décimètres
+}
+UNIT_LABELS = {0.0254: 'in', 0.3048: 'ft', 0.001: 'mm', 0.01: 'cm', 1.0: 'm', 0.1: 'dm'}
+
+# Unitless drawings from architects are nearly always in millimeters
+DEFAULT_METERS_PER_UNIT = 0.001
+
+ARC_STEP = math.radians(5)
+
+MTEXT_CODES = re.compile(r'\\[A-Za-z][^;\\]*;|\\[Nn~]|[{}]')
+
+
+class DXFReader:
+    """
+    Streaming reader for ASCII DXF files. Group code / value pairs are read
+    line by line and only the LWPOLYLINE, LINE, ARC, TEXT, MTEXT and
+    DIMENSION entities of the ENTITIES section are kept; block definitions
+    and inserts are skipped.
+    """
+
+    ENTITY_TYPES = ('LWPOLYLINE', 'LINE', 'ARC', 'TEXT', 'MTEXT', 'DIMENSION')
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+
+    def read(self):
+        header = {}
+        entities = []
+        section = None
+        variable = None
+        current = None
+
+        for code, value in self._pairs():
+            if code == 0:
+                if current:
+                    entity = self._build(*current)
+                    if entity:
+                        entities.append(entity)
+                    current = None
+
+                if value == 'SECTION':
+                    section = 'pending'
+                elif value == 'ENDSEC':
+                    section = None
+                elif value == 'EOF':
+                    break
+                elif section == 'ENTITIES' and value in self.ENTITY_TYPES:
+                    current = (value, [])
+                continue
+
+            if section == 'pending' and code == 2:
+                section = value
+            elif section == 'HEADER':
+                if code == 9:
+                    variable = value
+                elif variable in ('$INSUNITS', '$MEASUREMENT') and code == 70:
+                    header[variable] = int(value)
+            elif current:
+                current[1].append((code, value))
+
+        return DXFDrawing(entities, header)
+
+    def _pairs(self):
+        with open(self.file_path, 'rb') as f:
+            if f.read(18) == b'AutoCAD Binary DXF':
+                raise ValueError('Les fichiers DXF binaires ne sont pas supportés, exportez en DXF ASCII')
+            f.seek(0)
+
+            while True:
+                code_line = f.readline()
+                value_line = f.readline()
+                if not code_line or not value_line:
+                    return
+                try:
+                    code = int(code_line)
+                except ValueError:
+                    raise ValueError('Fichier DXF invalide')
+                yield code, self._decode(value_line).strip()
+
+    @staticmethod
+    def _decode(line):
+        # DXF 2007+ is UTF-8, older files use the Windows code page
+        try:
+            return line.decode('utf-8')
+        except UnicodeDecodeError:
+            return line.decode('cp1252', errors='replace')
+
+    def _build(self, entity_type, groups):
+        values = {}
+        for code, value in groups:
+            values.setdefault(code, value)
+        layer = values.get(8, '0')
+
+        try:
+            if entity_type == 'LWPOLYLINE':
+                return self._lwpolyline(groups, layer)
+            if entity_type == 'LINE':
+                points = [(float(values[10]), float(values[20])), (float(values[11]), float(values[21]))]
+                return DXFEntity('LINE', layer, points, False, None, None, None, math.dist(*points))
+            if entity_type == 'ARC':
+                center = (float(values[10]), float(values[20]))
+                radius = float(values[40])
+                start, end = math.radians(float(values.get(50, 0))), math.radians(float(values.get(51, 360)))
+                sweep = (end - start) % (2 * math.pi) or 2 * math.pi
+                return DXFEntity('ARC', layer, arc_points(center, radius, start, sweep), False, None, None, None, radius * sweep)
+            if entity_type in ('TEXT', 'MTEXT'):
+                text = ''.join(value for code, value in groups if code in (3, 1))
+                if entity_type == 'MTEXT':
+                    # Paragraph breaks become spaces before the formatting codes are stripped
+                    text = MTEXT_CODES.sub('', text.replace('\\P', ' '))
+                point = (float(values[10]), float(values[20]))
+                return DXFEntity('TEXT', layer, [point], False, text.strip(), float(values.get(40, 1)), None, None)
+            if entity_type == 'DIMENSION':
+                return self._dimension(values, layer)
+        except (KeyError, ValueError):
+            return None
+        return None
+
+    def _lwpolyline(self, groups, layer):
+        closed = False
+        vertices = []
+        bulges = []
+        for code, value in groups:
+            if code == 70:
+                closed = bool(int(value) & 1)
+            elif code == 10:
+                vertices.append([float(value), 0.0])
+                bulges.append(0.0)
+            elif code == 20 and vertices:
+                vertices[-1][1] = float(value)
+            elif code == 42 and bulges:
+                bulges[-1] = float(value)
+
+        if len(vertices) < 2:
+            return None
+
+        vertices = [tuple(v) for v in vertices]
+        if len(vertices) > 2 and math.dist(vertices[0], vertices[-1]) < 1e-9:
+            vertices.pop()
+            bulges.pop()
+            closed = True
+
+        area, length = polyline_measures(vertices, bulges, closed)
+        return DXFEntity('LWPOLYLINE', layer, tessellate(vertices, bulges, closed), closed, None, None, area, length)
+
+    @staticmethod
+    def _dimension(values, layer):
+        # Linear dimensions measure between their two definition points
+        if 13 in values and 14 in values:
+            points = [(float(values[13]), float(values[23])), (float(values[14]), float(values[24]))]
+        else:
+            points = [(float(values[10]), float(values[20]))]
+        measurement = float(values[42]) if 42 in values else (math.dist(*points) if len(points) == 2 else None)
+
+        text = values.get(1, '<>')
+        if '<>' in text or not text:
+            text = text.replace('<>', f'{measurement:g}' if measurement is not None else '') or None
+        return DXFEntity('DIMENSION', layer, points, False, text, None, None, measurement)
+
+
+def arc_points(center, radius, start, sweep):
+    """Tessellates a counterclockwise arc into segments of at most ARC_STEP."""
+    steps = max(2, math.ceil(abs(sweep) / ARC_STEP))
+    return [
+        (center[0] + radius * math.cos(start + sweep * k / steps),
+         center[1] + radius * math.sin(start + sweep * k / steps))
+        for k in range(steps + 1)
+    ]
+
+
+def bulge_arc(p1, p2, bulge):
+    """(center, radius, start angle, signed sweep) of the arc a bulge puts between two vertices."""
+    sweep = 4 * math.atan(bulge)
+    chord = math.dist(p1, p2)
+    radius = chord / (2 * math.sin(abs(sweep) / 2))
+    # The center lies on the chord bisector, at the apothem distance
+    mid = ((p1[0] + p2[0]) / 2, (p1[1] + p2[1]) / 2)
+    apothem = math.copysign(radius * math.cos(sweep / 2), bulge)
+    normal = (-(p2[1] - p1[1]) / chord, (p2[0] - p1[0]) / chord)
+    center = (mid[0] + normal[0] * apothem, mid[1] + normal[1] * apothem)
+    start = math.atan2(p1[1] - center[1], p1[0] - center[0])
+    return center, radius, start, sweep
+
+
+def polyline_measures(vertices, bulges, closed):
+    """
+    Exact area (closed polylines only) and length of a polyline with bulges:
+    the shoelace area of the vertices plus the circular segment of each arc.
+    """
+    count = len(vertices)
+    segments = count if closed else count - 1
+    doubled_area = 0.0
+    segment_area = 0.0
+    length = 0.0
+
+    for i in range(segments):
+        p1, p2 = vertices[i], vertices[(i + 1) % count]
+        doubled_area += p1[0] * p2[1] - p2[0] * p1[1]
+        bulge = bulges[i]
+        chord = math.dist(p1, p2)
+        if bulge and chord:
+            sweep = 4 * math.atan(bulge)
+            radius = chord / (2 * math.sin(abs(sweep) / 2))
+            length += radius * abs(sweep)
+            # A positive bulge swells to the right of the chord direction,
+            # outward for a counterclockwise outline
+            segment_area += math.copysign(radius ** 2 * (abs(sweep) - math.sin(abs(sweep))) / 2, bulge)
+        else:
+            length += chord
+
+    area = abs(doubled_area / 2 + segment_area) if closed else None
+    return area, length
+
+
+def tessellate(vertices, bulges, closed):
+    points = []
+    count = len(vertices)
+    segments = count if closed else count - 1
+    for i in range(segments):
+        p1, p2 = vertices[i], vertices[(i + 1) % count]
+        points.append(p1)
+        if bulges[i] and p1 != p2:
+            center, radius, start, sweep = bulge_arc(p1, p2, bulges[i])
+            points.extend(arc_points(center, radius, start, sweep)[1:-1])
+    if not closed:
+        points.append(vertices[-1])
+    return points
+
+
+class DXFDrawing:
+    """
+    Entities of a DXF file with their spatial index and the mapping to plan
+    pixels: the drawing rendered at PIXELS_PER_METER, y axis pointing down,
+    capped at MAX_PIXELS on its longest side. The plan scale is therefore
+    known from $INSUNITS and needs no calibration.
+    """
+
+    PIXELS_PER_METER = 100
+    MAX_PIXELS = 16384
+    MIN_ROOM_AREA = 1.0         # m²
+    MIN_ROOM_WIDTH = 0.4        # m, 2 × area / perimeter; rejects wall outlines
+
+    def __init__(self, entities, header=None):
+        self.entities = entities
+        self.header = header or {}
+
+        units = self.header.get('$INSUNITS', 0)
+        self.units_assumed = units not in INSUNITS
+        self.meters_per_unit = INSUNITS.get(units, DEFAULT_METERS_PER_UNIT)
+
+        drawn = [e for e in entities if e.points]
+        self.bbox = bbox_of([p for e in drawn for p in e.points]) if drawn else (0.0, 0.0, 1.0, 1.0)
+        self.index = GridIndex.for_extent(self.bbox, len(drawn))
+        for position, entity in enumerate(entities):
+            if entity.points:
+                self.index.insert(position, bbox_of(entity.points))
+
+        extent = max(self.bbox[2] - self.bbox[0], self.bbox[3] - self.bbox[1], 1e-9)
+        self.pixels_per_unit = min(self.PIXELS_PER_METER * self.meters_per_unit, self.MAX_PIXELS / extent)
+
+    @property
+    def units(self):
+        return UNIT_LABELS[self.meters_per_unit]
+
+    @property
+    def scale_factor(self):
+        """Meters per plan pixel."""
+        return self.meters_per_unit / self.pixels_per_unit
+
+    @property
+    def size(self):
+        """(width, height) in plan pixels."""
+        return (
+            math.ceil((self.bbox[2] - self.bbox[0]) * self.pixels_per_unit) + 1,
+            math.ceil((self.bbox[3] - self.bbox[1]) * self.pixels_per_unit) + 1
+        )
+
+    @property
+    def dimensions(self):
+        return {
+            'width': round((self.bbox[2] - self.bbox[0]) * self.meters_per_unit, 3),
+            'height': round((self.bbox[3] - self.bbox[1]) * self.meters_per_unit, 3),
+            'unit': 'm'
+        }
+
+    def entity_counts(self):
+        return dict(Counter(e.type for e in self.entities))
+
+    def layers(self):
+        return sorted({e.layer for e in self.entities})
+
+    def to_plan(self, points, scale=1.0):
+        """Drawing coordinates to plan pixels (times scale)."""
+        ratio = self.pixels_per_unit * scale
+        return [((x - self.bbox[0]) * ratio, (self.bbox[3] - y) * ratio) for x, y in points]
+
+    def candidate_rooms(self):
+        """
+        Closed polylines large and wide enough to be rooms, named after the
+        largest text they contain. Outlines that enclose two or more other
+        candidates (building envelope, apartments) are dropped.
+        """
+        unit_area = self.meters_per_unit ** 2
+        closed = [
+            (position, entity) for position, entity in enumerate(self.entities)
+            if entity.type == 'LWPOLYLINE' and entity.closed
+            and entity.area * unit_area >= self.MIN_ROOM_AREA
+            and 2 * entity.area / entity.length * self.meters_per_unit >= self.MIN_ROOM_WIDTH
+        ]
+
+        centers = [metrics.centroid for metrics in batch_polygon_metrics([entity.points for _, entity in closed])]
+        center_index = GridIndex.for_extent(self.bbox, len(closed))
+        for i, (x, y) in enumerate(centers):
+            center_index.insert(i, (x, y, x, y))
+
+        rooms = []
+        for i, (position, entity) in enumerate(closed):
+            box = self.index.boxes[position]
+            enclosed = sum(
+                1 for other in center_index.query(box)
+                if other != i and point_in_polygon(centers[other][0], centers[other][1], entity.points)
+            )
+            if enclosed >= 2:
+                continue
+
+            rooms.append({
+                'name': self._label(box, entity.points) or f'Pièce {len(rooms) + 1}',
+                'layer': entity.layer,
+                'area': round(entity.area * unit_area, 2),
+                'perimeter': round(entity.length * self.meters_per_unit, 2),
+                'polygon': [{'x': round(x, 2), 'y': round(y, 2)} for x, y in self.to_plan(entity.points)]
+            })
+        return rooms
+
+    def _label(self, box, polygon):
+        texts = [
+            self.entities[position] for position in self.index.query(box)
+            if self.entities[position].type == 'TEXT' and self.entities[position].text
+        ]
+        texts = [t for t in texts if point_in_polygon(t.points[0][0], t.points[0][1], polygon)]
+        if not texts:
+            return None
+        return max(texts, key=lambda t: t.height or 0).text[:100]
+
+    def render(self, scale=1.0, box=None, background=255, ink=0):
+        """
+        Grayscale image of the drawing at `scale` times the plan resolution.
+        `box` (left, top, right, bottom) crops to a window in pixels at that
+        scale; only the entities the index finds in the window are drawn.
+        """
+        width, height = self.size
+        if box is None:
+            box = (0, 0, max(1, math.ceil(width * scale)), max(1, math.ceil(height * scale)))
+        left, top, right, bottom = box
+
+        image = Image.new('L', (right - left, bottom - top), background)
+        draw = ImageDraw.Draw(image)
+
+        ratio = self.pixels_per_unit * scale
+        window = (
+            self.bbox[0] + left / ratio, self.bbox[3] - bottom / ratio,
+            self.bbox[0] + right / ratio, self.bbox[3] - top / ratio
+        )
+
+        for position in self.index.query(window):
+            entity = self.entities[position]
+            points = [(x - left, y - top) for x, y in self.to_plan(entity.points, scale)]
+            if entity.type == 'TEXT':
+                size = (entity.height or 0) * ratio
+                if size >= 6 and entity.text:
+                    draw.text(points[0], entity.text, fill=ink, font=_font(round(size)), anchor='ls')
+            elif entity.type == 'DIMENSION':
+                if len(points) == 2:
+                    draw.line(points, fill=160)
+            else:
+                if entity.closed:
+                    points = points + points[:1]
+                draw.line(points, fill=ink, width=max(1, round(scale)))
+
+        return image
+
+
+@lru_cache(maxsize=64)
+def _font(size):
+    return ImageFont.load_default(size=size)
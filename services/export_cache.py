@@ -0,0 +1,110 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+
+
+class ExportCache:
+    """
+    Content-addressed store for rendered quote exports.
+
+    File names embed a fingerprint of everything the renderer reads, so an
+    unchanged quote version is served from disk and any change to its lines,
+    totals, branding or tax profile yields a new file. Old files are evicted
+    by age and by a global size budget.
+    """
+
+    def __init__(self, root=os.path.join('static', 'exports'), max_bytes=500 * 1024 * 1024, max_age_days=30):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.max_age_days = max_age_days
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def fingerprint(payload):
+        data = json.dumps(payload, sort_keys=True, default=str, ensure_ascii=False)
+        return hashlib.sha256(data.encode('utf-8')).hexdigest()
+
+    def company_dir(self, company_id):
+        return os.path.join(self.root, str(company_id))
+
+    def path_for(self, company_id, stem, digest, extension):
+        return os.path.join(self.company_dir(company_id), f"{stem}_{digest[:16]}.{extension}")
+
+    def get(self, path):
+        """Returns the path if cached, refreshing its mtime for the LRU eviction."""
+        if not os.path.isfile(path):
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return path
+
+    def store(self, path, content):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+        self.evict()
+        return path
+
+    def invalidate(self, company_id, stem_prefixes):
+        """Removes the cached files of a company whose name starts with one of the prefixes."""
+        directory = self.company_dir(company_id)
+        if not os.path.isdir(directory):
+            return 0
+
+        removed = 0
+        for name in os.listdir(directory):
+            if name.startswith(tuple(f"{prefix}_" for prefix in stem_prefixes)):
+                try:
+                    os.remove(os.path.join(directory, name))
+                    removed += 1
+                except OSError:
+                    pass
+        return removed
+
+    def invalidate_company(self, company_id):
+        shutil.rmtree(self.company_dir(company_id), ignore_errors=True)
+
+    def evict(self):
+        with self._lock:
+            if not os.path.isdir(self.root):
+                return
+
+            expires_before = time.time() - self.max_age_days * 86400
+            files = []
+            for directory, _, names in os.walk(self.root):
+                for name in names:
+                    if name.endswith('.tmp'):
+                        continue
+                    path = os.path.join(directory, name)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    if stat.st_mtime < expires_before:
+                        self._remove(path)
+                    else:
+                        files.append((stat.st_mtime, stat.st_size, path))
+
+            total = sum(size for _, size, _ in files)
+            for _, size, path in sorted(files):
+                if total <= self.max_bytes:
+                    break
+                self._remove(path)
+                total -= size
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+export_cache = ExportCache()
@@ -0,0 +1,186 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from sqlalchemy.exc import IntegrityError
+from models import db, ExportJob, JobStatus
+
+
+class ExportJobQueue:
+    """
+    Database-backed queue for quote PDF/Excel exports.
+
+    Jobs are rows of `export_jobs`. By default they are rendered by a small
+    in-process thread pool so the request returns immediately; with
+    EXPORT_WORKER=external the web process only enqueues and
+    `python -m scripts.export_worker` renders them.
+    """
+
+    FORMATS = ('pdf', 'excel')
+    ACTIVE_STATUSES = (JobStatus.PENDING, JobStatus.RUNNING)
+
+    def __init__(self, app=None):
+        self.app = None
+        self.executor = None
+
+        if app:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        app.config.setdefault('EXPORT_WORKER', os.environ.get('EXPORT_WORKER', 'inline'))
+        app.config.setdefault('EXPORT_WORKER_THREADS', 2)
+        app.config.setdefault('EXPORT_JOB_TIMEOUT', 600)
+        app.config.setdefault('EXPORT_JOB_RETENTION_DAYS', 30)
+
+        if app.config['EXPORT_WORKER'] == 'inline':
+            self.executor = ThreadPoolExecutor(
+                max_workers=app.config['EXPORT_WORKER_THREADS'],
+                thread_name_prefix='export'
+            )
+
+    def enqueue(self, quote, version, export_format, user):
+        """
+        Returns the pending/running job of this version and format, or queues a new one.
+        A version whose export is already cached gets a job that is done immediately.
+        """
+        if export_format not in self.FORMATS:
+            raise ValueError(f'Format inconnu: {export_format}')
+
+        job = self._active_job(version, export_format)
+        if job:
+            return job
+
+        from services.export_service import ExportService
+        cached_path = ExportService(quote.project.company).get_cached(quote, version, export_format)
+
+        job = ExportJob(
+            company_id=quote.project.company_id,
+            quote_id=quote.id,
+            version_id=version.id,
+            export_format=export_format,
+            status=JobStatus.DONE if cached_path else JobStatus.PENDING,
+            file_path=cached_path,
+            requested_by_id=user.id
+        )
+        if cached_path:
+            job.finished_at = datetime.utcnow()
+        db.session.add(job)
+        try:
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            # Queued concurrently by another request (uq_export_jobs_active)
+            job = self._active_job(version, export_format)
+            if job is None:
+                raise
+            return job
+
+        if self.executor and not cached_path:
+            self.executor.submit(self._run_inline, job.id)
+
+        return job
+
+    def claim(self, job_id=None):
+        """Atomically moves one pending job (or the given one) to running."""
+        query = ExportJob.query.filter_by(status=JobStatus.PENDING)
+        if job_id:
+            query = query.filter_by(id=job_id)
+        query = query.order_by(ExportJob.id)
+
+        if db.engine.dialect.name == 'postgresql':
+            query = query.with_for_update(skip_locked=True)
+
+        job = query.first()
+        if not job:
+            db.session.rollback()
+            return None
+
+        claimed = ExportJob.query.filter_by(id=job.id, status=JobStatus.PENDING).update({
+            ExportJob.status: JobStatus.RUNNING,
+            ExportJob.started_at: datetime.utcnow()
+        })
+        db.session.commit()
+
+        return job if claimed else None
+
+    def run(self, job):
+        from services.export_service import ExportService
+
+        try:
+            quote = job.quote
+            export_service = ExportService(quote.project.company)
+
+            if job.export_format == 'pdf':
+                file_path = export_service.generate_pdf(quote, job.version)
+            else:
+                file_path = export_service.generate_excel(quote, job.version)
+
+            job.file_path = file_path
+            job.status = JobStatus.DONE
+            job.error = None
+        except Exception as e:
+            db.session.rollback()
+            job.status = JobStatus.FAILED
+            job.error = str(e)
+
+        job.finished_at = datetime.utcnow()
+        db.session.commit()
+        return job
+
+    def requeue_stale(self):
+        """Puts back jobs left running by a crashed worker."""
+        limit = datetime.utcnow() - timedelta(seconds=self.app.config['EXPORT_JOB_TIMEOUT'])
+        count = ExportJob.query.filter(
+            ExportJob.status == JobStatus.RUNNING,
+            ExportJob.started_at < limit
+        ).update({ExportJob.status: JobStatus.PENDING, ExportJob.started_at: None})
+        db.session.commit()
+        return count
+
+    def purge_finished(self):
+        """Deletes the done and failed jobs older than EXPORT_JOB_RETENTION_DAYS."""
+        limit = datetime.utcnow() - timedelta(days=self.app.config['EXPORT_JOB_RETENTION_DAYS'])
+        count = ExportJob.query.filter(
+            ExportJob.status.in_((JobStatus.DONE, JobStatus.FAILED)),
+            ExportJob.finished_at < limit
+        ).delete(synchronize_session=False)
+        db.session.commit()
+        return count
+
+    def resume(self):
+        """
+        Inline mode, at startup: puts back the jobs left running past the
+        timeout by a web process that died, then schedules every pending job
+        again. Jobs a sibling process is still rendering are left alone, and
+        a job already claimed elsewhere is skipped by claim().
+        """
+        if not self.executor:
+            return 0
+
+        self.requeue_stale()
+        self.purge_finished()
+
+        job_ids = [job_id for job_id, in db.session.query(ExportJob.id)
+                   .filter_by(status=JobStatus.PENDING).order_by(ExportJob.id)]
+        for job_id in job_ids:
+            self.executor.submit(self._run_inline, job_id)
+        return len(job_ids)
+
+    def _active_job(self, version, export_format):
+        return ExportJob.query.filter(
+            ExportJob.version_id == version.id,
+            ExportJob.export_format == export_format,
+            ExportJob.status.in_(self.ACTIVE_STATUSES)
+        ).order_by(ExportJob.id.desc()).first()
+
+    def _run_inline(self, job_id):
+        with self.app.app_context():
+            try:
+                job = self.claim(job_id)
+                if job:
+                    self.run(job)
+            finally:
+                db.session.remove()
+
+
+export_jobs = ExportJobQueue()
@@ -7,18 +7,101 @@ from reportlab.lib.enums import TA_CENTER, TA_RIGHT, TA_LEFT
 from openpyxl import Workbook
 from openpyxl.styles import Font, Alignment, Border, Side, PatternFill
 from openpyxl.utils import get_column_letter
-import os
+from services.export_cache import export_cache
 import io
 from datetime import datetime
 
 
 class ExportService:
+    # Bump when the PDF/Excel layout changes so cached exports are re-rendered
+    RENDER_VERSION = 1
+    
     def __init__(self, company):
         self.company = company
         self.branding = company.branding
         self.tax_profile = company.tax_profile
     
     def generate_pdf(self, quote, version):
+        output_path = self.cached_path(quote, version, 'pdf')
+        
+        if not export_cache.get(output_path):
+            export_cache.store(output_path, self._render_pdf(quote, version))
+        
+        version.pdf_path = output_path
+        from models import db
+        db.session.commit()
+        
+        return output_path
+    
+    def generate_excel(self, quote, version):
+        output_path = self.cached_path(quote, version, 'excel')
+        
+        if not export_cache.get(output_path):
+            export_cache.store(output_path, self._render_excel(quote, version))
+        
+        return output_path
+    
+    def get_cached(self, quote, version, export_format):
+        """Returns the already rendered file for the current state of the version, if any."""
+        return export_cache.get(self.cached_path(quote, version, export_format))
+    
+    def cached_path(self, quote, version, export_format):
+        if export_format == 'pdf':
+            stem, extension = f"{quote.reference}_V{version.version_number}", 'pdf'
+        else:
+            stem, extension = f"{quote.reference}_DQE_V{version.version_number}", 'xlsx'
+        
+        digest = export_cache.fingerprint(self._render_inputs(quote, version, export_format))
+        return export_cache.path_for(self.company.id, stem, digest, extension)
+    
+    def _render_inputs(self, quote, version, export_format):
+        from models import db, QuoteLine, QuoteAssumption
+        
+        def columns(obj):
+            if obj is None:
+                return None
+            return {
+                c.name: getattr(obj, c.name)
+                for c in obj.__table__.columns
+                if c.name not in ('id', 'created_at', 'updated_at')
+            }
+        
+        project = quote.project
+        
+        lines = db.session.query(
+            QuoteLine.category, QuoteLine.designation, QuoteLine.unit,
+            QuoteLine.quantity, QuoteLine.unit_price, QuoteLine.total_price
+        ).filter_by(version_id=version.id).order_by(QuoteLine.sort_order, QuoteLine.id).all()
+        
+        assumptions = db.session.query(
+            QuoteAssumption.category, QuoteAssumption.description, QuoteAssumption.value
+        ).filter_by(version_id=version.id).order_by(QuoteAssumption.id).all()
+        
+        return {
+            'render_version': self.RENDER_VERSION,
+            'format': export_format,
+            # The export prints the generation date
+            'date': datetime.now().strftime('%d/%m/%Y'),
+            'company': [self.company.name, self.company.currency],
+            'branding': columns(self.branding),
+            'tax_profile': columns(self.tax_profile),
+            'quote': [quote.reference, quote.valid_until],
+            'project': [project.name, project.project_type.value, project.client_name,
+                        project.client_address, project.client_phone, project.client_email],
+            'totals': [version.version_number, version.subtotal_ht, version.vat_rate,
+                       version.vat_amount, version.total_ttc],
+            'lines': [list(line) for line in lines],
+            'assumptions': [list(assumption) for assumption in assumptions]
+        }
+    
+    def invalidate_version(self, quote, version):
+        export_cache.invalidate(self.company.id, [
+            f"{quote.reference}_V{version.version_number}",
+            f"{quote.reference}_DQE_V{version.version_number}"
+        ])
+        version.pdf_path = None
+    
+    def _render_pdf(self, quote, version):
         buffer = io.BytesIO()
         
         doc = SimpleDocTemplate(
@@ -168,22 +251,10 @@ class ExportService:
             elements.append(Paragraph(self.branding.quote_footer, normal_style))
         
         doc.build(elements)
-        buffer.seek(0)
-        
-        output_dir = os.path.join('static', 'exports', str(self.company.id))
-        os.makedirs(output_dir, exist_ok=True)
-        output_path = os.path.join(output_dir, f"{quote.reference}_V{version.version_number}.pdf")
-        
-        with open(output_path, 'wb') as f:
-            f.write(buffer.read())
-        
-        version.pdf_path = output_path
-        from models import db
-        db.session.commit()
         
-        return output_path
+        return buffer.getvalue()
     
-    def generate_excel(self, quote, version):
+    def _render_excel(self, quote, version):
         wb = Workbook()
         ws = wb.active
         ws.title = "DQE"
@@ -275,10 +346,7 @@ class ExportService:
             ws_hyp.column_dimensions['B'].width = 50
             ws_hyp.column_dimensions['C'].width = 30
         
-        output_dir = os.path.join('static', 'exports', str(self.company.id))
-        os.makedirs(output_dir, exist_ok=True)
-        output_path = os.path.join(output_dir, f"{quote.reference}_DQE_V{version.version_number}.xlsx")
-        
-        wb.save(output_path)
+        buffer = io.BytesIO()
+        wb.save(buffer)
         
-        return output_path
+        return buffer.getvalue()
@@ -0,0 +1,96 @@
+import re
+import threading
+import time
+from itertools import chain
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+from models import db, BPULibrary
+
+
+VERSION_TOKEN = re.compile(r'\d+|[a-z]+')
+
+
+def version_key(version):
+    """
+    Sort key of a library version: numbers compare as numbers and a suffix
+    marks a pre-release, '2025.1-beta' < '2025.1' < '2025.2' < '2025.10'.
+    """
+    version = re.sub(r'^v(?=\d)', '', (version or '').strip().lower())
+    tokens = VERSION_TOKEN.findall(version)
+    return tuple((2, int(token)) if token.isdigit() else (0, token) for token in tokens) + ((1,),)
+
+
+class LibraryRegistry:
+    """
+    Process-local cache of the active BPU libraries of each country, newest
+    version first.
+
+    The libraries are loaded detached, in a session of their own, and merged
+    into the caller's session without a query. A commit of this process that
+    adds or changes a library invalidates its country; the TTL bounds how
+    long another process keeps the previous list.
+    """
+
+    def __init__(self, ttl=300):
+        self.ttl = ttl
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def active_library(self, country):
+        """The active library of a country with the highest version, None if there is none."""
+        libraries = self._libraries(country)
+        return db.session.merge(libraries[0], load=False) if libraries else None
+
+    def active_libraries(self, country):
+        """Every active library of a country, highest version first."""
+        return [db.session.merge(library, load=False) for library in self._libraries(country)]
+
+    def invalidate(self, country=None):
+        with self._lock:
+            if country is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(country, None)
+
+    def _libraries(self, country):
+        with self._lock:
+            entry = self._entries.get(country)
+            if entry and entry[1] >= time.monotonic():
+                return entry[0]
+
+        libraries = self._load(country)
+        with self._lock:
+            self._entries[country] = (libraries, time.monotonic() + self.ttl)
+        return libraries
+
+    @staticmethod
+    def _load(country):
+        with Session(db.engine) as session:
+            libraries = session.query(BPULibrary).filter_by(country=country, is_active=True).all()
+        return sorted(libraries, key=lambda library: version_key(library.version), reverse=True)
+
+
+library_registry = LibraryRegistry()
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_library_changes(session, flush_context):
+    countries = set()
+    for obj in chain(session.new, session.dirty, session.deleted):
+        if isinstance(obj, BPULibrary):
+            # The previous country too, when it changed
+            countries.add(obj.country)
+            countries.update(inspect(obj).attrs.country.history.deleted)
+    if countries:
+        session.info.setdefault('library_registry', set()).update(countries)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_libraries(session):
+    for country in session.info.pop('library_registry', ()):
+        library_registry.invalidate(country)
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _discard_library_changes(session, previous_transaction):
+    session.info.pop('library_registry', None)
@@ -0,0 +1,219 @@
+from PyPDF2.generic import ContentStream
+from algorithms.geometry import batch_polygon_metrics
+from algorithms.planar import planar_faces
+from algorithms.spatial import GridIndex, point_in_polygon
+
+
+IDENTITY = (1.0, 0.0, 0.0, 1.0, 0.0, 0.0)
+
+
+def multiply(m, n):
+    """Matrix product m × n of PDF transformation matrices (a b c d e f)."""
+    return (
+        m[0] * n[0] + m[1] * n[2], m[0] * n[1] + m[1] * n[3],
+        m[2] * n[0] + m[3] * n[2], m[2] * n[1] + m[3] * n[3],
+        m[4] * n[0] + m[5] * n[2] + n[4], m[4] * n[1] + m[5] * n[3] + n[5]
+    )
+
+
+def apply(m, x, y):
+    return (m[0] * x + m[2] * y + m[4], m[1] * x + m[3] * y + m[5])
+
+
+def bezier(p0, p1, p2, p3, steps):
+    points = []
+    for k in range(1, steps + 1):
+        t = k / steps
+        s = 1 - t
+        points.append((
+            s ** 3 * p0[0] + 3 * s * s * t * p1[0] + 3 * s * t * t * p2[0] + t ** 3 * p3[0],
+            s ** 3 * p0[1] + 3 * s * s * t * p1[1] + 3 * s * t * t * p2[1] + t ** 3 * p3[1]
+        ))
+    return points
+
+
+class PDFVectorExtractor:
+    """
+    Reads the stroked and filled paths of a PDF page from its content
+    stream (and the form XObjects it draws) as line segments in plan pixels,
+    i.e. the page rendered at `dpi` with the y axis pointing down, and finds
+    the closed regions they enclose.
+    """
+
+    CURVE_STEPS = 8
+    MAX_SEGMENTS = 100000
+    MAX_FORM_DEPTH = 8
+    SNAP_TOLERANCE = 1.5        # pt
+    MIN_ROOM_AREA = 400         # pt², 20 pt × 20 pt on paper
+    MIN_ROOM_WIDTH = 10         # pt, 2 × area / perimeter; rejects wall thicknesses
+    MAX_ROOM_SHARE = 0.5        # of the page area; rejects frames and title blocks
+    MAX_ROOMS = 200
+
+    PAINT_OPERATORS = {b'S', b's', b'f', b'F', b'f*', b'B', b'B*', b'b', b'b*'}
+    CLOSE_AND_PAINT = {b's', b'b', b'b*'}
+
+    def __init__(self, page, dpi=150):
+        self.page = page
+        self.pdf = page.pdf
+        self.dpi = dpi
+        self.ratio = dpi / 72
+        self.truncated = False
+
+        box = page.mediabox
+        self.left, self.bottom = float(box.left), float(box.bottom)
+        self.width, self.height = float(box.width), float(box.height)
+        self.rotation = (page.get('/Rotate') or 0) % 360
+
+    def to_plan(self, x, y):
+        """PDF user space (points, y up) to plan pixels, following the page rotation."""
+        x, y = (x - self.left) * self.ratio, (self.bottom + self.height - y) * self.ratio
+        width, height = self.width * self.ratio, self.height * self.ratio
+        if self.rotation == 90:
+            return (height - y, x)
+        if self.rotation == 180:
+            return (width - x, height - y)
+        if self.rotation == 270:
+            return (y, width - x)
+        return (x, y)
+
+    def segments(self):
+        segments = []
+        contents = self.page.get_contents()
+        if contents is not None:
+            if not isinstance(contents, ContentStream):
+                contents = ContentStream(contents, self.pdf)
+            self._walk(contents.operations, IDENTITY, self.page.get('/Resources'), segments, 0)
+        return segments
+
+    def _walk(self, operations, ctm, resources, segments, depth):
+        stack = []
+        subpaths = []
+        current = None
+
+        for operands, operator in operations:
+            if len(segments) >= self.MAX_SEGMENTS:
+                self.truncated = True
+                return
+
+            if operator == b'q':
+                stack.append(ctm)
+            elif operator == b'Q':
+                if stack:
+                    ctm = stack.pop()
+            elif operator == b'cm':
+                ctm = multiply(tuple(float(v) for v in operands), ctm)
+            elif operator == b'm':
+                current = [apply(ctm, float(operands[0]), float(operands[1]))]
+                subpaths.append(current)
+            elif operator == b'l' and current:
+                current.append(apply(ctm, float(operands[0]), float(operands[1])))
+            elif operator in (b'c', b'v', b'y') and current:
+                values = [float(v) for v in operands]
+                points = [apply(ctm, values[i], values[i + 1]) for i in range(0, len(values), 2)]
+                if operator == b'v':
+                    points.insert(0, current[-1])
+                elif operator == b'y':
+                    points.append(points[-1])
+                current.extend(bezier(current[-1], *points, self.CURVE_STEPS))
+            elif operator == b'h' and current:
+                current.append(current[0])
+            elif operator == b're':
+                x, y, w, h = (float(v) for v in operands)
+                current = [apply(ctm, px, py) for px, py in ((x, y), (x + w, y), (x + w, y + h), (x, y + h), (x, y))]
+                subpaths.append(current)
+            elif operator in self.PAINT_OPERATORS:
+                for path in subpaths:
+                    if operator in self.CLOSE_AND_PAINT:
+                        path.append(path[0])
+                    plan = [self.to_plan(x, y) for x, y in path]
+                    segments.extend((a, b) for a, b in zip(plan, plan[1:]) if a != b)
+                subpaths, current = [], None
+            elif operator == b'n':
+                subpaths, current = [], None
+            elif operator == b'Do' and depth < self.MAX_FORM_DEPTH:
+                self._form(operands[0], ctm, resources, segments, depth)
+
+    def _form(self, name, ctm, resources, segments, depth):
+        try:
+            xobject = resources['/XObject'][name].get_object()
+        except (KeyError, TypeError):
+            return
+        if xobject.get('/Subtype') != '/Form':
+            return
+
+        matrix = tuple(float(v) for v in xobject.get('/Matrix', IDENTITY))
+        operations = ContentStream(xobject, self.pdf).operations
+        self._walk(operations, multiply(matrix, ctm), xobject.get('/Resources', resources), segments, depth + 1)
+
+    def texts(self):
+        """(x, y, text, size) of the text runs of the page, in plan pixels."""
+        texts = []
+
+        def visit(text, cm, tm, font, size):
+            text = text.strip()
+            if text:
+                x, y = apply(multiply(tm, cm), 0, 0)
+                texts.append((*self.to_plan(x, y), text, size * abs(tm[3] or 1)))
+
+        self.page.extract_text(visitor_text=visit)
+        return texts
+
+    def candidate_rooms(self, segments=None):
+        """
+        Closed regions of the drawing that look like rooms on paper, named
+        after the largest text inside them. Polygons are in plan pixels;
+        area and perimeter wait for the calibration.
+        """
+        if segments is None:
+            segments = self.segments()
+        if self.truncated:
+            return []
+
+        pixel_area = self.ratio ** 2
+        page_area = self.width * self.height * pixel_area
+        faces = planar_faces(segments, tolerance=self.SNAP_TOLERANCE * self.ratio)
+        outlines = batch_polygon_metrics([points for face in faces for points in [face.points] + face.holes])
+
+        rooms = []
+        position = 0
+        for face in faces:
+            perimeter = sum(metrics.perimeter for metrics in outlines[position:position + 1 + len(face.holes)])
+            position += 1 + len(face.holes)
+            # Net of holes: the band between two outlines of a wall is thin
+            if (self.MIN_ROOM_AREA * pixel_area <= face.area <= self.MAX_ROOM_SHARE * page_area
+                    and 2 * face.area / perimeter >= self.MIN_ROOM_WIDTH * self.ratio):
+                rooms.append(face.points)
+        rooms = sorted(rooms, key=lambda points: min((y, x) for x, y in points))[:self.MAX_ROOMS]
+
+        labels = self._labels(rooms)
+        return [
+            {
+                'name': labels[i] or f'Pièce {i + 1}',
+                'area': None,
+                'perimeter': None,
+                'polygon': [{'x': round(x, 2), 'y': round(y, 2)} for x, y in points]
+            }
+            for i, points in enumerate(rooms)
+        ]
+
+    def _labels(self, rooms):
+        try:
+            texts = [t for t in self.texts() if any(c.isalpha() for c in t[2])]
+        except Exception:
+            texts = []
+        if not texts:
+            return [None] * len(rooms)
+
+        index = GridIndex(self.width * self.ratio / 32)
+        for position, (x, y, _, _) in enumerate(texts):
+            index.insert(position, (x, y, x, y))
+
+        labels = []
+        for points in rooms:
+            xs, ys = [p[0] for p in points], [p[1] for p in points]
+            inside = [
+                texts[position] for position in index.query((min(xs), min(ys), max(xs), max(ys)))
+                if point_in_polygon(texts[position][0], texts[position][1], points)
+            ]
+            labels.append(max(inside, key=lambda t: t[3])[2][:100] if inside else None)
+        return labels
@@ -0,0 +1,204 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from decimal import Decimal
+from models import db, PlanMetadata, JobStatus, Room
+from services.plan_cache import plan_cache
+from services.plan_raster import PlanRasterizer
+from services.plan_measurement import PlanMeasurementService
+
+
+def plan_tiles(plan, digest=None, page_count=None):
+    """
+    Tile manifest of a plan. Pyramids are shared through the plan cache by
+    file content; the manifest carries the hash that locates them.
+    """
+    digest = digest or plan_cache.file_hash(plan.file_path)
+    return plan_cache.tiles(digest, plan.file_path, page_count)
+
+
+def plan_tiles_dir(plan):
+    """Directory holding the tile pyramids described by plan.raster_data."""
+    digest = (plan.raster_data or {}).get('hash')
+    if digest:
+        return plan_cache.tiles_dir(digest, plan.raster_data.get('dpi') or PlanRasterizer.DPI, plan.raster_data['tile_size'])
+    return PlanRasterizer.default_output_dir(plan.file_path)
+
+
+class PlanAnalysisQueue:
+    """
+    Runs the analysis and tile rendering of uploaded plans after the upload
+    request has returned. The state lives in `plan_metadata`, which the
+    calibration page polls.
+
+    Like the export queue, work runs on a small in-process thread pool by
+    default; with PLAN_WORKER=external it is left to
+    `python -m scripts.export_worker`.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self.executor = None
+
+        if app:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        app.config.setdefault('PLAN_WORKER', os.environ.get('PLAN_WORKER', app.config.get('EXPORT_WORKER', 'inline')))
+        app.config.setdefault('PLAN_WORKER_THREADS', 1)
+        app.config.setdefault('PLAN_JOB_TIMEOUT', 1800)
+
+        if app.config['PLAN_WORKER'] == 'inline':
+            self.executor = ThreadPoolExecutor(
+                max_workers=app.config['PLAN_WORKER_THREADS'],
+                thread_name_prefix='plan'
+            )
+
+    def enqueue(self, plan):
+        """
+        (Re)schedules the analysis of a plan and returns its metadata record.
+        A plan analysed already only gets its tiles rendered again.
+        """
+        record = plan.analysis or PlanMetadata(plan_id=plan.id)
+        record.status = JobStatus.PENDING
+        record.error = None
+        record.started_at = None
+        record.finished_at = None
+        db.session.add(record)
+        db.session.commit()
+
+        if self.executor:
+            self.executor.submit(self._run_inline, record.id)
+
+        return record
+
+    def claim(self, record_id=None):
+        """Atomically moves one pending analysis (or the given one) to running."""
+        query = PlanMetadata.query.filter_by(status=JobStatus.PENDING)
+        if record_id:
+            query = query.filter_by(id=record_id)
+        query = query.order_by(PlanMetadata.id)
+
+        if db.engine.dialect.name == 'postgresql':
+            query = query.with_for_update(skip_locked=True)
+
+        record = query.first()
+        if not record:
+            db.session.rollback()
+            return None
+
+        claimed = PlanMetadata.query.filter_by(id=record.id, status=JobStatus.PENDING).update({
+            PlanMetadata.status: JobStatus.RUNNING,
+            PlanMetadata.started_at: datetime.utcnow()
+        })
+        db.session.commit()
+
+        return record if claimed else None
+
+    def run(self, record):
+        try:
+            if record.details is not None:
+                # Tiles evicted from the plan cache, or missing for an older plan
+                record.plan.raster_data = plan_tiles(record.plan, page_count=record.page_count)
+            else:
+                self._analyze(record)
+
+            record.status = JobStatus.DONE
+            record.error = None
+        except Exception as e:
+            db.session.rollback()
+            record.status = JobStatus.FAILED
+            record.error = str(e)
+
+        record.finished_at = datetime.utcnow()
+        db.session.commit()
+        return record
+
+    def _analyze(self, record):
+        from services.plan_reader import PlanReader
+
+        plan = record.plan
+        reader = PlanReader(plan.file_path)
+        result = reader.analyze()
+        if not result.get('success'):
+            raise ValueError(result.get('error') or 'Analyse impossible')
+
+        metadata = result['metadata']
+        record.page_count = metadata.get('page_count')
+        record.is_vector = metadata.get('is_vector')
+        record.is_scanned = metadata.get('is_scanned')
+        record.dimensions = metadata.get('dimensions')
+        record.recommendations = result.get('recommendations')
+        record.details = metadata
+
+        plan.raster_data = plan_tiles(plan, reader.digest, record.page_count)
+
+        # DXF files carry their units: the scale of the plan pixels is known
+        if metadata.get('scale_factor') and not plan.is_calibrated:
+            plan.scale_factor = metadata['scale_factor']
+            plan.is_calibrated = True
+            plan.calibration_data = {
+                'source': 'dxf',
+                'units': metadata['units'],
+                'units_assumed': metadata['units_assumed'],
+                'pixel_space': 'plan'
+            }
+
+        self.create_rooms(plan, metadata.get('candidate_rooms'))
+
+    def create_rooms(self, plan, candidates):
+        """
+        Pre-populates the rooms of a plan with the candidates found in its
+        vectors, unless rooms were already drawn on it. DXF candidates carry
+        exact areas; PDF ones are measured once the plan is calibrated.
+        """
+        if not candidates or db.session.query(Room.id).filter_by(plan_id=plan.id).first():
+            return 0
+
+        if plan.is_calibrated and (plan.calibration_data or {}).get('pixel_space') == 'plan':
+            measures = PlanMeasurementService(plan).room_measures([c['polygon'] for c in candidates])
+        else:
+            measures = [(None, None)] * len(candidates)
+
+        rows = []
+        for candidate, (area, perimeter) in zip(candidates, measures):
+            if candidate.get('area') is not None:
+                area, perimeter = Decimal(str(candidate['area'])), Decimal(str(candidate['perimeter']))
+            rows.append({
+                'project_id': plan.project_id,
+                'plan_id': plan.id,
+                'name': candidate['name'][:100],
+                'room_type': None,
+                'level': 0,
+                'area': area,
+                'perimeter': perimeter,
+                'ceiling_height': Decimal('2.80'),
+                'polygon_data': candidate['polygon'],
+                'pixel_space': 'plan'
+            })
+
+        db.session.execute(db.insert(Room).execution_options(render_nulls=True), rows)
+        return len(rows)
+
+    def requeue_stale(self):
+        """Puts back analyses left running by a crashed worker."""
+        limit = datetime.utcnow() - timedelta(seconds=self.app.config['PLAN_JOB_TIMEOUT'])
+        count = PlanMetadata.query.filter(
+            PlanMetadata.status == JobStatus.RUNNING,
+            PlanMetadata.started_at < limit
+        ).update({PlanMetadata.status: JobStatus.PENDING, PlanMetadata.started_at: None})
+        db.session.commit()
+        return count
+
+    def _run_inline(self, record_id):
+        with self.app.app_context():
+            try:
+                record = self.claim(record_id)
+                if record:
+                    self.run(record)
+            finally:
+                db.session.remove()
+
+
+plan_analysis = PlanAnalysisQueue()
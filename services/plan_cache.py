@@ -0,0 +1,208 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from services.plan_raster import PlanRasterizer
+
+
+class PlanCache:
+    """
+    Content-addressed store for everything derived from a plan file: the
+    PlanReader analysis, page images and tile pyramids.
+
+    Entries are keyed by the SHA-256 of the file, so the same drawing uploaded
+    to several projects, or re-uploaded as a new PlanVersion, is analysed and
+    rasterized once. Whole entries are evicted by last use and by a global
+    size budget.
+
+    The cache lives outside of `static/`: tiles are only served by the API,
+    which checks that the plan belongs to the user's company. The tree is
+    walked on the first write, then when the bytes written since the last
+    walk exceed the budget or every EVICT_INTERVAL seconds.
+    """
+
+    CHUNK_SIZE = 1024 * 1024
+    EVICT_INTERVAL = 3600
+
+    def __init__(self, root=None, max_bytes=2 * 1024 * 1024 * 1024, max_age_days=90):
+        self.root = root or os.environ.get('PLAN_CACHE_DIR') or os.path.join('instance', 'plan_cache')
+        self.max_bytes = max_bytes
+        self.max_age_days = max_age_days
+        self._lock = threading.Lock()
+        # Size of the tree at the last walk plus the bytes written since, None before the first walk
+        self._bytes = None
+        self._next_eviction = 0
+
+    @classmethod
+    def file_hash(cls, file_path):
+        digest = hashlib.sha256()
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(cls.CHUNK_SIZE), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def entry_dir(self, digest):
+        return os.path.join(self.root, digest[:2], digest)
+
+    def path_for(self, digest, name):
+        return os.path.join(self.entry_dir(digest), name)
+
+    def get(self, digest, name):
+        """Returns the path of a cached file or directory, marking the entry as used."""
+        path = self.path_for(digest, name)
+        if not os.path.exists(path):
+            return None
+        self._touch(digest)
+        return path
+
+    def get_json(self, digest, name):
+        path = self.get(digest, f'{name}.json')
+        if not path:
+            return None
+        try:
+            with open(path, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def store_json(self, digest, name, payload):
+        data = json.dumps(payload, default=str, ensure_ascii=False).encode('utf-8')
+        return self.store(digest, f'{name}.json', lambda path: self._write(path, data))
+
+    def store_image(self, digest, name, image):
+        return self.store(digest, name, lambda path: image.save(path, 'PNG'))
+
+    def store(self, digest, name, writer):
+        """Writes a cache file through writer(tmp_path) and moves it in place atomically."""
+        path = self.path_for(digest, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = self._tmp_path(path)
+        try:
+            writer(tmp_path)
+            os.replace(tmp_path, path)
+        finally:
+            self._remove(tmp_path)
+        self._touch(digest)
+        self._written(os.path.getsize(path), keep=digest)
+        return path
+
+    def tiles_name(self, dpi=PlanRasterizer.DPI, tile_size=PlanRasterizer.TILE_SIZE):
+        return f'tiles_{dpi}_{tile_size}'
+
+    def tiles_dir(self, digest, dpi=PlanRasterizer.DPI, tile_size=PlanRasterizer.TILE_SIZE):
+        return self.path_for(digest, self.tiles_name(dpi, tile_size))
+
+    def tiles(self, digest, file_path, page_count=None, dpi=PlanRasterizer.DPI, tile_size=PlanRasterizer.TILE_SIZE):
+        """
+        Returns the tile manifest of a drawing, rendering its pyramids into the
+        cache on first use. None when the format cannot be rasterized here.
+        """
+        name = self.tiles_name(dpi, tile_size)
+        manifest = self.get_json(digest, name)
+        if manifest and os.path.isdir(self.tiles_dir(digest, dpi, tile_size)):
+            return manifest
+
+        directory = self.tiles_dir(digest, dpi, tile_size)
+        tmp_dir = self._tmp_path(directory)
+        try:
+            manifest = PlanRasterizer(file_path, output_dir=tmp_dir, dpi=dpi, tile_size=tile_size).render(page_count)
+            if not manifest:
+                return None
+            shutil.rmtree(directory, ignore_errors=True)
+            try:
+                os.rename(tmp_dir, directory)
+                self._written(self._size(directory), keep=digest)
+            except OSError:
+                # Another worker rendered the same drawing first
+                if not os.path.isdir(directory):
+                    raise
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+        manifest['hash'] = digest
+        self.store_json(digest, name, manifest)
+        return manifest
+
+    def invalidate(self, digest):
+        shutil.rmtree(self.entry_dir(digest), ignore_errors=True)
+
+    def evict(self, keep=None):
+        with self._lock:
+            self._next_eviction = time.monotonic() + self.EVICT_INTERVAL
+            if not os.path.isdir(self.root):
+                self._bytes = 0
+                return
+
+            expires_before = time.time() - self.max_age_days * 86400
+            entries = []
+            for prefix in os.listdir(self.root):
+                prefix_dir = os.path.join(self.root, prefix)
+                if not os.path.isdir(prefix_dir):
+                    continue
+                for digest in os.listdir(prefix_dir):
+                    directory = os.path.join(prefix_dir, digest)
+                    try:
+                        last_used = os.stat(directory).st_mtime
+                    except OSError:
+                        continue
+                    if digest != keep and last_used < expires_before:
+                        shutil.rmtree(directory, ignore_errors=True)
+                    else:
+                        entries.append((last_used, self._size(directory), digest, directory))
+
+            total = sum(size for _, size, _, _ in entries)
+            for _, size, digest, directory in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                if digest == keep:
+                    continue
+                shutil.rmtree(directory, ignore_errors=True)
+                total -= size
+            self._bytes = total
+
+    def _written(self, size, keep=None):
+        """Counts bytes added to the cache and evicts once the budget or the interval is exceeded."""
+        with self._lock:
+            if self._bytes is not None:
+                self._bytes += size
+            due = self._bytes is None or self._bytes > self.max_bytes or time.monotonic() >= self._next_eviction
+        if due:
+            self.evict(keep=keep)
+
+    def _touch(self, digest):
+        try:
+            os.utime(self.entry_dir(digest))
+        except OSError:
+            pass
+
+    @staticmethod
+    def _size(directory):
+        total = 0
+        for path, _, names in os.walk(directory):
+            for name in names:
+                try:
+                    total += os.path.getsize(os.path.join(path, name))
+                except OSError:
+                    pass
+        return total
+
+    @staticmethod
+    def _tmp_path(path):
+        return f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+    @staticmethod
+    def _write(path, data):
+        with open(path, 'wb') as f:
+            f.write(data)
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+plan_cache = PlanCache()
@@ -0,0 +1,143 @@
+from decimal import Decimal
+from models import db, Room, Measurement
+from algorithms.geometry import batch_polygon_metrics, batch_polyline_lengths
+
+
+class PlanMeasurementService:
+    """
+    Derives room and measurement quantities of a plan from their stored
+    polygon_data and the plan scale (meters per pixel).
+
+    The scale holds for the pixel space it was calibrated in: 'plan', the
+    pixels of the plan image, or 'canvas', the screen pixels of the viewer
+    used before the tiles. Polygons traced in the other space are left as
+    they are, their pixels cannot be converted.
+    """
+
+    PIXEL_SPACES = ('canvas', 'plan')
+    AREA_TYPES = ('area', 'surface')
+    PERIMETER_TYPES = ('perimeter',)
+    LENGTH_TYPES = ('length', 'linear', 'distance')
+
+    def __init__(self, plan):
+        self.plan = plan
+
+    @property
+    def scale_factor(self):
+        return float(self.plan.scale_factor or 1)
+
+    @property
+    def pixel_space(self):
+        """Pixel space of the plan calibration, 'canvas' for plans calibrated before the tiles."""
+        return (self.plan.calibration_data or {}).get('pixel_space') or 'canvas'
+
+    def measurable(self, pixel_space):
+        """Whether polygons stored in `pixel_space` (None for older rows) can be measured at the plan scale."""
+        return (pixel_space or 'canvas') == self.pixel_space
+
+    def remeasure(self):
+        """
+        Recomputes every room and measurement of the plan that has a polygon
+        in the pixel space of the calibration, with one bulk UPDATE per
+        table. Returns the per-room deltas, the number of measurements
+        updated and of rooms and measurements skipped because traced in the
+        other pixel space. The caller commits.
+        """
+        same_space = db.func.coalesce(Room.pixel_space, 'canvas') == self.pixel_space
+        rooms = db.session.query(
+            Room.id, Room.name, Room.area, Room.perimeter, Room.polygon_data
+        ).filter(Room.plan_id == self.plan.id, Room.polygon_data.isnot(None), same_space).order_by(Room.id).all()
+
+        room_rows = []
+        deltas = []
+        for room, (area, perimeter) in zip(rooms, self.room_measures([room.polygon_data for room in rooms])):
+            room_rows.append({'id': room.id, 'area': area, 'perimeter': perimeter})
+            deltas.append({
+                'id': room.id,
+                'name': room.name,
+                'old_area': float(room.area or 0),
+                'area': float(area),
+                'delta_area': float(area - (room.area or 0)),
+                'old_perimeter': float(room.perimeter or 0),
+                'perimeter': float(perimeter),
+                'delta_perimeter': float(perimeter - (room.perimeter or 0))
+            })
+
+        measurement_space = db.func.coalesce(Measurement.pixel_space, 'canvas') == self.pixel_space
+        measurements = db.session.query(
+            Measurement.id, Measurement.measurement_type, Measurement.polygon_data
+        ).filter(Measurement.plan_id == self.plan.id, Measurement.polygon_data.isnot(None), measurement_space).all()
+
+        quantities = self.quantities(
+            [(m.measurement_type, m.polygon_data) for m in measurements]
+        )
+        measurement_rows = [
+            {'id': m.id, 'quantity': quantity}
+            for m, quantity in zip(measurements, quantities)
+            if quantity is not None
+        ]
+
+        if room_rows:
+            db.session.execute(db.update(Room), room_rows)
+        if measurement_rows:
+            db.session.execute(db.update(Measurement), measurement_rows)
+
+        skipped = db.session.query(db.func.count(Room.id)).filter(
+            Room.plan_id == self.plan.id, Room.polygon_data.isnot(None), db.not_(same_space)
+        ).scalar() + db.session.query(db.func.count(Measurement.id)).filter(
+            Measurement.plan_id == self.plan.id, Measurement.polygon_data.isnot(None), db.not_(measurement_space)
+        ).scalar()
+
+        return {'rooms': deltas, 'measurements_updated': len(measurement_rows), 'skipped': skipped}
+
+    def room_measures(self, polygons):
+        """(area, perimeter) of each room polygon at the plan scale, rounded like Room columns."""
+        return [
+            (self._round(metrics.area, 2), self._round(metrics.perimeter, 2))
+            for metrics in batch_polygon_metrics(polygons, self.scale_factor)
+        ]
+
+    def quantities(self, items):
+        """
+        Quantity of each (measurement_type, polygon) pair at the plan scale,
+        or None for types that are not derived from geometry (counts, ...).
+        """
+        polygons = [polygon for _, polygon in items]
+        metrics = batch_polygon_metrics(polygons, self.scale_factor)
+        lengths = batch_polyline_lengths(polygons, self.scale_factor)
+
+        quantities = []
+        for (measurement_type, _), polygon_metrics, length in zip(items, metrics, lengths):
+            if measurement_type in self.AREA_TYPES:
+                quantities.append(self._round(polygon_metrics.area, 4))
+            elif measurement_type in self.PERIMETER_TYPES:
+                quantities.append(self._round(polygon_metrics.perimeter, 4))
+            elif measurement_type in self.LENGTH_TYPES:
+                quantities.append(self._round(length, 4))
+            else:
+                quantities.append(None)
+        return quantities
+
+    @staticmethod
+    def validate_polygon(points):
+        """Returns an error message when points is not a list of {'x', 'y'} numbers."""
+        if not isinstance(points, list):
+            return 'polygon_data doit être une liste de points'
+        for point in points:
+            if not isinstance(point, dict) or not all(
+                isinstance(point.get(axis), (int, float)) and not isinstance(point.get(axis), bool)
+                for axis in ('x', 'y')
+            ):
+                return 'Point invalide dans polygon_data'
+        return None
+
+    @classmethod
+    def validate_pixel_space(cls, value):
+        """Returns an error message when value is not a known pixel space."""
+        if value not in cls.PIXEL_SPACES:
+            return "pixel_space doit valoir 'canvas' ou 'plan'"
+        return None
+
+    @staticmethod
+    def _round(value, places):
+        return Decimal(str(round(value, places)))
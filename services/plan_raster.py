@@ -0,0 +1,175 @@
+import math
+import multiprocessing
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+from PIL import Image
+from services.dxf_reader import DXFReader
+
+
+def build_pyramid(image, directory, tile_size, size=None):
+    """
+    Cuts an image into a tile pyramid: directory/<z>/<x>_<y>.png.
+    Level max_zoom is the full resolution, each level below halves it, and
+    level 0 fits in a single tile. An image rendered below the full
+    resolution `size` starts at its own level, top_zoom.
+    """
+    width, height = size or image.size
+    max_zoom = max(0, math.ceil(math.log2(max(width, height) / tile_size)))
+    top_zoom = max_zoom - max(0, round(math.log2(width / image.width)))
+
+    if image.mode not in ('RGB', 'RGBA', 'L'):
+        image = image.convert('RGB')
+
+    level = image
+    for z in range(top_zoom, -1, -1):
+        level_dir = os.path.join(directory, str(z))
+        os.makedirs(level_dir, exist_ok=True)
+
+        for y in range(math.ceil(level.height / tile_size)):
+            for x in range(math.ceil(level.width / tile_size)):
+                box = (x * tile_size, y * tile_size,
+                       min((x + 1) * tile_size, level.width), min((y + 1) * tile_size, level.height))
+                level.crop(box).save(os.path.join(level_dir, f'{x}_{y}.png'), 'PNG', optimize=True)
+
+        if z:
+            level = level.resize((max(1, math.ceil(level.width / 2)), max(1, math.ceil(level.height / 2))), Image.LANCZOS)
+
+    pyramid = {'width': width, 'height': height, 'max_zoom': max_zoom}
+    if top_zoom < max_zoom:
+        pyramid['top_zoom'] = top_zoom
+    return pyramid
+
+
+def build_vector_pyramid(drawing, directory, tile_size):
+    """
+    Same layout as build_pyramid for a DXF drawing, but every tile is drawn
+    straight from the vectors at its zoom level, so no full-size image is
+    ever held in memory.
+    """
+    width, height = drawing.size
+    max_zoom = max(0, math.ceil(math.log2(max(width, height) / tile_size)))
+
+    for z in range(max_zoom, -1, -1):
+        scale = 1 / 2 ** (max_zoom - z)
+        level_width, level_height = math.ceil(width * scale), math.ceil(height * scale)
+        level_dir = os.path.join(directory, str(z))
+        os.makedirs(level_dir, exist_ok=True)
+
+        for y in range(math.ceil(level_height / tile_size)):
+            for x in range(math.ceil(level_width / tile_size)):
+                box = (x * tile_size, y * tile_size,
+                       min((x + 1) * tile_size, level_width), min((y + 1) * tile_size, level_height))
+                drawing.render(scale, box).save(os.path.join(level_dir, f'{x}_{y}.png'), 'PNG', optimize=True)
+
+    return {'width': width, 'height': height, 'max_zoom': max_zoom}
+
+
+def _render_pdf_page(args):
+    """
+    Process pool entry point: rasterizes one PDF page and tiles it. A page
+    larger than `max_pixels` at `dpi` is rendered at half the resolution, or
+    less, and its pyramid lacks the top levels; the plan pixels stay those
+    of `dpi`.
+    """
+    file_path, page_number, dpi, directory, tile_size, max_pixels = args
+    from pdf2image import convert_from_path
+    from PyPDF2 import PdfReader
+
+    page = PdfReader(file_path).pages[page_number]
+    width, height = (math.ceil(float(side) * dpi / 72) for side in (page.mediabox.width, page.mediabox.height))
+    if page.rotation % 180:
+        width, height = height, width
+    skipped = max(0, math.ceil(math.log2(width * height / max_pixels) / 2))
+
+    images = convert_from_path(file_path, dpi=dpi / 2 ** skipped, first_page=page_number + 1, last_page=page_number + 1)
+    if not images:
+        return None
+    with images[0] as image:
+        return build_pyramid(image, directory, tile_size, size=(width, height) if skipped else None)
+
+
+class PlanRasterizer:
+    """
+    Renders every page of a plan once into tile pyramids stored next to the
+    upload, so the calibration and measuring pages load only the tiles they
+    display. PDF pages are rendered in parallel across a process pool; DXF
+    drawings are drawn tile by tile from their vectors.
+
+    Rendering errors are raised, for the plan analysis to record them.
+    """
+
+    TILE_SIZE = 256
+    DPI = 150
+    # Largest PDF page bitmap, well below PIL's decompression bomb limit
+    MAX_PIXELS = 40_000_000
+    IMAGE_FORMATS = ('png', 'jpg', 'jpeg')
+
+    def __init__(self, file_path, output_dir=None, dpi=DPI, tile_size=TILE_SIZE, max_workers=None):
+        self.file_path = file_path
+        self.extension = os.path.splitext(file_path)[1].lower().replace('.', '')
+        self.output_dir = output_dir or self.default_output_dir(file_path)
+        self.dpi = dpi
+        self.tile_size = tile_size
+        self.max_workers = max_workers
+
+    @staticmethod
+    def default_output_dir(file_path):
+        return os.path.splitext(file_path)[0] + '_tiles'
+
+    def page_dir(self, page_number):
+        return os.path.join(self.output_dir, str(page_number))
+
+    def tile_path(self, page_number, z, x, y):
+        return os.path.join(self.page_dir(page_number), str(z), f'{x}_{y}.png')
+
+    def render(self, page_count=None):
+        """
+        Builds the pyramids and returns the manifest stored on ProjectPlan.raster_data,
+        or None when the format cannot be rasterized here (PDF without pdf2image).
+        """
+        shutil.rmtree(self.output_dir, ignore_errors=True)
+
+        if self.extension == 'pdf':
+            pages = self._render_pdf(page_count)
+        elif self.extension == 'dxf':
+            try:
+                pages = [build_vector_pyramid(DXFReader(self.file_path).read(), self.page_dir(0), self.tile_size)]
+            except (OSError, ValueError):
+                pages = None
+        elif self.extension in self.IMAGE_FORMATS:
+            with Image.open(self.file_path) as image:
+                pages = [build_pyramid(image, self.page_dir(0), self.tile_size)]
+        else:
+            return None
+
+        if not pages or None in pages:
+            shutil.rmtree(self.output_dir, ignore_errors=True)
+            return None
+
+        return {
+            'tile_size': self.tile_size,
+            'dpi': self.dpi if self.extension == 'pdf' else None,
+            'pages': pages
+        }
+
+    def _render_pdf(self, page_count=None):
+        try:
+            import pdf2image  # noqa: F401
+        except ImportError:
+            return None
+
+        if page_count is None:
+            from PyPDF2 import PdfReader
+            page_count = len(PdfReader(self.file_path).pages)
+
+        jobs = [
+            (self.file_path, page, self.dpi, self.page_dir(page), self.tile_size, self.MAX_PIXELS)
+            for page in range(page_count)
+        ]
+
+        if len(jobs) == 1:
+            return [_render_pdf_page(jobs[0])]
+        # Spawned, not forked: the web process has threads and open database connections
+        with ProcessPoolExecutor(max_workers=self.max_workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+            return list(pool.map(_render_pdf_page, jobs))
@@ -3,21 +3,63 @@ from PyPDF2 import PdfReader
 from PIL import Image
 import io
 import json
+from algorithms.geometry import polygon_metrics
+from services.plan_cache import plan_cache
+from services.dxf_reader import DXFReader
+from services.pdf_vectors import PDFVectorExtractor
+from services.plan_raster import PlanRasterizer
 
 
 class PlanReader:
     SUPPORTED_FORMATS = ['pdf', 'dwg', 'dxf', 'png', 'jpg', 'jpeg']
+    # Bump when the analysis output changes, so cached results are recomputed
+    ANALYSIS_VERSION = 3
+    VECTOR_MIN_SEGMENTS = 100
     
-    def __init__(self, file_path):
+    def __init__(self, file_path, cache=plan_cache):
         self.file_path = file_path
         self.extension = os.path.splitext(file_path)[1].lower().replace('.', '')
+        self.cache = cache
         self.metadata = {}
         self.is_scanned = False
         self.is_vector = False
         self.page_count = 1
         self.dimensions = None
+        self._digest = None
+        self._drawing = None
+    
+    @property
+    def digest(self):
+        """SHA-256 of the file, or None when there is no cache or the file cannot be read."""
+        if self._digest is None and self.cache:
+            try:
+                self._digest = self.cache.file_hash(self.file_path)
+            except OSError:
+                return None
+        return self._digest
     
     def analyze(self):
+        """Analyses the plan once per file content; later calls are served from the plan cache."""
+        name = f'analysis_{self.extension}_v{self.ANALYSIS_VERSION}'
+        
+        cached = self.cache.get_json(self.digest, name) if self.digest else None
+        if cached:
+            self._restore(cached)
+            return cached
+        
+        result = self._analyze()
+        if result.get('success') and self.digest:
+            self.cache.store_json(self.digest, name, result)
+        return result
+    
+    def _restore(self, result):
+        self.metadata = result['metadata']
+        self.page_count = self.metadata.get('page_count', 1)
+        self.dimensions = self.metadata.get('dimensions')
+        self.is_vector = self.metadata.get('is_vector', False)
+        self.is_scanned = self.metadata.get('is_scanned', False)
+    
+    def _analyze(self):
         if self.extension == 'pdf':
             return self._analyze_pdf()
         elif self.extension in ['dwg', 'dxf']:
@@ -44,7 +86,12 @@ class PlanReader:
             for page in reader.pages[:3]:
                 text_content += page.extract_text() or ''
             
-            self.is_vector = len(text_content.strip()) > 50
+            # Rooms are looked for on the first page, the one displayed for measuring
+            extractor = PDFVectorExtractor(first_page, dpi=PlanRasterizer.DPI)
+            segments = extractor.segments()
+            rooms = extractor.candidate_rooms(segments) if segments else []
+            
+            self.is_vector = len(text_content.strip()) > 50 or len(segments) >= self.VECTOR_MIN_SEGMENTS or bool(rooms)
             self.is_scanned = not self.is_vector
             
             self.metadata = {
@@ -53,7 +100,9 @@ class PlanReader:
                 'is_vector': self.is_vector,
                 'is_scanned': self.is_scanned,
                 'has_text': len(text_content.strip()) > 0,
-                'format': 'PDF'
+                'format': 'PDF',
+                'vector_segments': len(segments),
+                'candidate_rooms': rooms
             }
             
             return {
@@ -72,13 +121,41 @@ class PlanReader:
             self.is_vector = True
             self.is_scanned = False
             
+            if self.extension == 'dwg':
+                self.metadata = {
+                    'page_count': 1,
+                    'is_vector': True,
+                    'is_scanned': False,
+                    'file_size': file_size,
+                    'format': 'DWG',
+                    'requires_conversion': True
+                }
+                
+                return {
+                    'success': True,
+                    'metadata': self.metadata,
+                    'recommendations': self._get_cad_recommendations()
+                }
+            
+            drawing = self.drawing
+            self.dimensions = drawing.dimensions
+            width, height = drawing.size
+            
             self.metadata = {
                 'page_count': 1,
+                'dimensions': self.dimensions,
                 'is_vector': True,
                 'is_scanned': False,
                 'file_size': file_size,
-                'format': self.extension.upper(),
-                'requires_conversion': True
+                'format': 'DXF',
+                'requires_conversion': False,
+                'units': drawing.units,
+                'units_assumed': drawing.units_assumed,
+                'scale_factor': drawing.scale_factor,
+                'raster_size': {'width': width, 'height': height},
+                'entity_counts': drawing.entity_counts(),
+                'layers': drawing.layers(),
+                'candidate_rooms': drawing.candidate_rooms()
             }
             
             return {
@@ -90,6 +167,13 @@ class PlanReader:
         except Exception as e:
             return {'success': False, 'error': str(e)}
     
+    @property
+    def drawing(self):
+        """Parsed DXF entities, read once per PlanReader."""
+        if self._drawing is None:
+            self._drawing = DXFReader(self.file_path).read()
+        return self._drawing
+    
     def _analyze_image(self):
         try:
             with Image.open(self.file_path) as img:
@@ -138,6 +222,13 @@ class PlanReader:
                 'message': 'Plan vectoriel détecté. Les mesures seront plus précises.'
             })
         
+        rooms = len(self.metadata.get('candidate_rooms') or [])
+        if rooms:
+            recs.append({
+                'type': 'info',
+                'message': f'{rooms} pièce(s) détectée(s) dans le tracé vectoriel. Leurs surfaces seront calculées après calibration.'
+            })
+        
         if self.dimensions:
             width_mm = self.dimensions['width'] * 0.3528 if self.dimensions['unit'] == 'pt' else self.dimensions['width']
             if width_mm > 1000:
@@ -149,34 +240,86 @@ class PlanReader:
         return recs
     
     def _get_cad_recommendations(self):
-        return [
-            {
-                'type': 'info',
-                'message': f'Fichier {self.extension.upper()} détecté.'
-            },
+        if self.extension == 'dwg':
+            return [
+                {
+                    'type': 'info',
+                    'message': 'Fichier DWG détecté.'
+                },
+                {
+                    'type': 'action',
+                    'message': 'Exportez le plan en DXF pour un affichage et des mesures automatiques. La calibration est recommandée.'
+                }
+            ]
+        
+        recs = [
             {
-                'type': 'action',
-                'message': 'Ce format sera converti en image pour affichage. La calibration est recommandée.'
+                'type': 'success',
+                'message': f"Plan vectoriel DXF détecté (unités : {self.metadata['units']}). L'échelle est lue dans le fichier, aucune calibration n'est nécessaire."
             }
         ]
+        
+        if self.metadata['units_assumed']:
+            recs.append({
+                'type': 'warning',
+                'message': 'Unités absentes du fichier : millimètres supposés. Vérifiez une cote connue.'
+            })
+        
+        rooms = len(self.metadata['candidate_rooms'])
+        if rooms:
+            recs.append({
+                'type': 'info',
+                'message': f'{rooms} pièce(s) détectée(s) à partir des polylignes fermées.'
+            })
+        
+        return recs
     
     def convert_to_image(self, page_number=0, dpi=150):
+        """Returns the path of a PNG of the page, rendered once per file content and DPI."""
+        if self.extension in ['png', 'jpg', 'jpeg']:
+            return self.file_path
         if self.extension == 'pdf':
-            return self._pdf_to_image(page_number, dpi)
+            name = f'page_{page_number}_{dpi}.png'
         elif self.extension in ['dwg', 'dxf']:
-            return self._cad_to_image()
-        elif self.extension in ['png', 'jpg', 'jpeg']:
-            return self.file_path
-        return None
+            name = 'preview.png'
+        else:
+            return None
+        
+        if not self.digest:
+            return self._render_image(self._image_path(page_number), page_number, dpi)
+        
+        cached = self.cache.get(self.digest, name)
+        if cached:
+            return cached
+        
+        image = self._to_image(page_number, dpi)
+        if image is None:
+            return None
+        return self.cache.store_image(self.digest, name, image)
+    
+    def _image_path(self, page_number):
+        if self.extension == 'pdf':
+            return self.file_path.replace('.pdf', f'_page_{page_number}.png')
+        return self.file_path + '_preview.png'
+    
+    def _render_image(self, output_path, page_number, dpi):
+        image = self._to_image(page_number, dpi)
+        if image is None:
+            return None
+        image.save(output_path, 'PNG')
+        return output_path
+    
+    def _to_image(self, page_number, dpi):
+        if self.extension == 'pdf':
+            return self._pdf_to_image(page_number, dpi)
+        return self._cad_to_image()
     
     def _pdf_to_image(self, page_number=0, dpi=150):
         try:
             from pdf2image import convert_from_path
             images = convert_from_path(self.file_path, dpi=dpi, first_page=page_number+1, last_page=page_number+1)
             if images:
-                output_path = self.file_path.replace('.pdf', f'_page_{page_number}.png')
-                images[0].save(output_path, 'PNG')
-                return output_path
+                return images[0]
         except ImportError:
             return None
         except Exception:
@@ -184,12 +327,10 @@ class PlanReader:
         return None
     
     def _cad_to_image(self):
-        placeholder_path = self.file_path + '_preview.png'
-        
+        if self.extension != 'dxf':
+            return None
         try:
-            img = Image.new('RGB', (800, 600), color='white')
-            img.save(placeholder_path, 'PNG')
-            return placeholder_path
+            return self.drawing.render()
         except Exception:
             return None
 
@@ -219,17 +360,7 @@ def calculate_polygon_area(points, scale):
     if len(points) < 3:
         return 0
     
-    n = len(points)
-    area_px = 0
-    
-    for i in range(n):
-        j = (i + 1) % n
-        area_px += points[i]['x'] * points[j]['y']
-        area_px -= points[j]['x'] * points[i]['y']
-    
-    area_px = abs(area_px) / 2
-    
-    area_m2 = area_px * (scale['meters_per_pixel'] ** 2)
+    area_m2 = polygon_metrics(points, scale['meters_per_pixel']).area
     
     return round(area_m2, 2)
 
@@ -238,19 +369,6 @@ def calculate_polygon_perimeter(points, scale):
     if len(points) < 2:
         return 0
     
-    import math
-    
-    perimeter_px = 0
-    n = len(points)
-    
-    for i in range(n):
-        j = (i + 1) % n
-        distance = math.sqrt(
-            (points[j]['x'] - points[i]['x']) ** 2 +
-            (points[j]['y'] - points[i]['y']) ** 2
-        )
-        perimeter_px += distance
-    
-    perimeter_m = perimeter_px * scale['meters_per_pixel']
+    perimeter_m = polygon_metrics(points, scale['meters_per_pixel']).perimeter
     
     return round(perimeter_m, 2)
@@ -0,0 +1,59 @@
+from collections import OrderedDict
+import threading
+import time
+
+
+class PriceBookCache:
+    """
+    Process-local LRU/TTL cache of resolved price books.
+
+    Entries are keyed by (company_id, library_id, price_column) and carry a
+    stamp of the company's BPU customisations and of the library articles, so
+    a write committed by another worker is detected on the next read even
+    before the TTL expires.
+    """
+
+    def __init__(self, max_entries=256, ttl=600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, stamp=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            value, entry_stamp, expires_at = entry
+            if expires_at < time.monotonic() or entry_stamp != stamp:
+                del self._entries[key]
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, stamp=None):
+        with self._lock:
+            self._entries[key] = (value, stamp, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, company_id):
+        """Drops every price book of a company (overrides or custom articles changed)."""
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == company_id]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+price_book_cache = PriceBookCache()
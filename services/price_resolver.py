@@ -0,0 +1,122 @@
+from models import db, BPUArticle, CompanyBPUOverride, CompanyBPUArticle
+from services.price_cache import price_book_cache
+from services.library_registry import library_registry
+from collections import namedtuple
+from decimal import Decimal
+from sqlalchemy import func
+
+
+ResolvedPrice = namedtuple('ResolvedPrice', ['base_price', 'designation', 'article_id', 'custom_article_id'])
+
+# codes: resolution by code (custom article first), articles: library articles by id
+PriceBook = namedtuple('PriceBook', ['codes', 'articles'])
+
+
+def company_bpu_stamp(company_id, library_id=None):
+    """
+    Cheap fingerprint of a company's overrides and custom articles, and of
+    the articles of its library, so a re-seed by another process is seen too.
+    """
+    def count_and_max(model, criterion):
+        return (
+            db.session.query(func.count(model.id)).filter(criterion).scalar_subquery(),
+            db.session.query(func.max(model.updated_at)).filter(criterion).scalar_subquery()
+        )
+
+    return tuple(db.session.query(
+        *count_and_max(CompanyBPUOverride, CompanyBPUOverride.company_id == company_id),
+        *count_and_max(CompanyBPUArticle, CompanyBPUArticle.company_id == company_id),
+        *count_and_max(BPUArticle, BPUArticle.library_id == library_id)
+    ).one())
+
+
+class PriceResolver:
+    """
+    Resolves BPU prices for a company, library and tier price column.
+
+    Resolution order is custom article -> library article -> company override.
+    The whole price book is built in two queries and kept in the
+    process-local price book cache. The tier coefficient is left to the caller.
+    """
+
+    def __init__(self, company, price_column='unit_price_standard', library=None):
+        self.company = company
+        self.price_column = price_column
+        self.library = library or library_registry.active_library(company.country)
+
+    def resolve(self, codes):
+        book = self.price_book()
+        return {code: book.codes[code] for code in set(codes) if code in book.codes}
+
+    def price_book(self):
+        library_id = self.library.id if self.library else None
+        key = (self.company.id, library_id, self.price_column)
+        # One query per call, the price of a cache that sees the writes of every process
+        stamp = company_bpu_stamp(self.company.id, library_id)
+
+        book = price_book_cache.get(key, stamp)
+        if book is None:
+            book = self._build_price_book()
+            price_book_cache.set(key, book, stamp)
+
+        return book
+
+    def _build_price_book(self):
+        codes = {}
+        articles = {}
+
+        # 1. Library Articles (Standard BPU) with their company override, if any
+        if self.library:
+            rows = db.session.query(BPUArticle, CompanyBPUOverride)\
+                .outerjoin(CompanyBPUOverride, db.and_(
+                    CompanyBPUOverride.article_id == BPUArticle.id,
+                    CompanyBPUOverride.company_id == self.company.id
+                ))\
+                .filter(BPUArticle.library_id == self.library.id)\
+                .all()
+
+            for library_article, override in rows:
+                resolved = self._resolve_library_article(library_article, override)
+                articles[library_article.id] = resolved
+                codes[library_article.code] = resolved
+
+        # 2. Custom Articles (Company BPU) take precedence on the same code
+        custom_articles = CompanyBPUArticle.query.filter_by(
+            company_id=self.company.id,
+            is_active=True
+        ).all()
+
+        for custom_article in custom_articles:
+            codes[custom_article.code] = ResolvedPrice(
+                base_price=self._to_decimal(getattr(custom_article, self.price_column)),
+                designation=custom_article.designation,
+                article_id=None,
+                custom_article_id=custom_article.id
+            )
+
+        return PriceBook(codes=codes, articles=articles)
+
+    def _resolve_library_article(self, library_article, override):
+        designation = library_article.designation
+        base_price = self._to_decimal(getattr(library_article, self.price_column))
+
+        if override and override.is_disabled:
+            # Explicitly disabled: keep the article reference but let the caller
+            # fall back to its default price.
+            return ResolvedPrice(None, designation, library_article.id, None)
+
+        if override:
+            if override.designation_override:
+                designation = override.designation_override
+
+            override_price = getattr(override, self.price_column)
+            if override_price is not None:
+                base_price = self._to_decimal(override_price)
+
+        return ResolvedPrice(base_price, designation, library_article.id, None)
+
+    @staticmethod
+    def _to_decimal(value):
+        if value is None:
+            return None
+        return Decimal(str(value))
@@ -0,0 +1,86 @@
+from collections import namedtuple, defaultdict
+from types import MappingProxyType
+from models import db, Room, Measurement, ProjectAnswer, QuestionTemplate
+
+
+RoomData = namedtuple('RoomData', [
+    'id', 'name', 'room_type', 'level', 'area', 'perimeter', 'ceiling_height', 'measurements'
+])
+MeasurementData = namedtuple('MeasurementData', [
+    'id', 'plan_id', 'room_id', 'measurement_type', 'unit', 'quantity', 'source'
+])
+AnswerData = namedtuple('AnswerData', [
+    'code', 'category', 'question_text', 'room_id', 'answer_value', 'answer_data', 'is_confirmed'
+])
+
+
+class ProjectSnapshot(namedtuple('ProjectSnapshot', ['project_id', 'project_type', 'rooms', 'answers', 'measurements'])):
+    """
+    Read-only view of what quote generation needs from a project: its rooms
+    (with their measurements) and its answers joined to their questions.
+
+    Everything is loaded up front with plain column queries (three per batch
+    of projects, whatever their size), so consumers never trigger lazy loads.
+    """
+
+    __slots__ = ()
+
+    @property
+    def answers_by_code(self):
+        # Later answers win, e.g. a room-level answer over the project-level one
+        return {answer.code: answer for answer in self.answers}
+
+    @classmethod
+    def load(cls, project):
+        return cls.load_many([project])[project.id]
+
+    @classmethod
+    def load_many(cls, projects):
+        """Returns {project_id: ProjectSnapshot} for the given projects."""
+        projects = list(projects)
+        project_ids = [project.id for project in projects]
+        if not project_ids:
+            return {}
+
+        measurements = defaultdict(list)
+        for row in db.session.query(
+            Measurement.id, Measurement.plan_id, Measurement.room_id, Measurement.measurement_type,
+            Measurement.unit, Measurement.quantity, Measurement.source, Room.project_id
+        ).join(Room, Measurement.room_id == Room.id)\
+                .filter(Room.project_id.in_(project_ids))\
+                .order_by(Measurement.id):
+            measurements[row.project_id].append(MeasurementData(*row[:-1]))
+
+        measurements_by_room = defaultdict(list)
+        for project_measurements in measurements.values():
+            for measurement in project_measurements:
+                measurements_by_room[measurement.room_id].append(measurement)
+
+        rooms = defaultdict(list)
+        for row in db.session.query(
+            Room.id, Room.name, Room.room_type, Room.level, Room.area,
+            Room.perimeter, Room.ceiling_height, Room.project_id
+        ).filter(Room.project_id.in_(project_ids)).order_by(Room.id):
+            rooms[row.project_id].append(RoomData(*row[:-1], tuple(measurements_by_room[row.id])))
+
+        answers = defaultdict(list)
+        for row in db.session.query(
+            QuestionTemplate.code, QuestionTemplate.category, QuestionTemplate.question_text,
+            ProjectAnswer.room_id, ProjectAnswer.answer_value, ProjectAnswer.answer_data,
+            ProjectAnswer.is_confirmed, ProjectAnswer.project_id
+        ).join(QuestionTemplate, ProjectAnswer.question_id == QuestionTemplate.id)\
+                .filter(ProjectAnswer.project_id.in_(project_ids))\
+                .order_by(ProjectAnswer.id):
+            answer_data = MappingProxyType(row.answer_data) if isinstance(row.answer_data, dict) else row.answer_data
+            answers[row.project_id].append(AnswerData(*row[:5], answer_data, row.is_confirmed))
+
+        return {
+            project.id: cls(
+                project_id=project.id,
+                project_type=project.project_type.value if project.project_type else None,
+                rooms=tuple(rooms[project.id]),
+                answers=tuple(answers[project.id]),
+                measurements=tuple(measurements[project.id])
+            )
+            for project in projects
+        }
@@ -0,0 +1,164 @@
+from collections import defaultdict
+from datetime import datetime, timedelta
+from models import db, Project, Quote, QuoteStatus, QuoteVersion, QuoteLine, QuoteAssumption, PricingTier
+from services.price_resolver import PriceResolver
+from services.project_snapshot import ProjectSnapshot
+from services.quote_generator import QuoteGenerator
+
+
+class BatchQuoteGenerator:
+    """
+    Generates one quote per (project, pricing tier) pair in a single transaction.
+
+    The price book of each tier and the snapshot of every project are
+    loaded once and shared by all the runs; quotes and versions are flushed in
+    one batch each and lines/assumptions are written with bulk inserts.
+    """
+
+    MAX_PROJECTS = 50
+
+    def __init__(self, company, user):
+        self.company = company
+        self.user = user
+
+    def generate(self, project_ids, tier_ids=None, valid_days=30, notes=''):
+        """
+        Returns a per-project summary:
+        [{'project_id', 'project_name', 'quotes': [{'quote_id', 'reference', 'tier', 'subtotal_ht', 'total_ttc'}]}]
+        Projects that do not belong to the company come back with an 'error'.
+        """
+        project_ids = list(dict.fromkeys(project_ids))
+        if not project_ids:
+            raise ValueError('Aucun projet sélectionné')
+        if len(project_ids) > self.MAX_PROJECTS:
+            raise ValueError(f'Maximum {self.MAX_PROJECTS} projets par lot')
+
+        projects = {
+            project.id: project for project in Project.query.filter(
+                Project.company_id == self.company.id,
+                Project.id.in_(project_ids)
+            )
+        }
+        tiers = self._load_tiers(tier_ids)
+
+        prices = {}
+        for tier in tiers:
+            price_column = tier.price_column if tier else 'unit_price_standard'
+            if price_column not in prices:
+                prices[price_column] = PriceResolver(self.company, price_column).resolve(QuoteGenerator.ARTICLE_CODES)
+
+        snapshots = ProjectSnapshot.load_many(projects.values())
+
+        runs = self._create_quotes(
+            [projects[project_id] for project_id in project_ids if project_id in projects],
+            tiers, valid_days, notes
+        )
+
+        versions = []
+        line_rows = []
+        assumption_rows = []
+        for quote, project, tier in runs:
+            generator = QuoteGenerator(
+                project,
+                tier=tier,
+                prices=prices[tier.price_column if tier else 'unit_price_standard'],
+                snapshot=snapshots[project.id]
+            )
+            version = QuoteVersion(
+                quote_id=quote.id,
+                version_number=quote.current_version,
+                tier_id=tier.id if tier else None,
+                vat_rate=generator.vat_rate,
+                created_by_id=self.user.id
+            )
+            generator.build(version)
+            versions.append((version, generator))
+
+        db.session.add_all([version for version, _ in versions])
+        db.session.flush()
+
+        for version, generator in versions:
+            line_rows.extend(self._row(line, version.id) for line in generator.lines)
+            assumption_rows.extend(self._row(assumption, version.id) for assumption in generator.assumptions)
+
+        # render_nulls keeps a single parameter set shape, i.e. one executemany per table
+        if line_rows:
+            db.session.execute(db.insert(QuoteLine).execution_options(render_nulls=True), line_rows)
+        if assumption_rows:
+            db.session.execute(db.insert(QuoteAssumption).execution_options(render_nulls=True), assumption_rows)
+
+        db.session.commit()
+
+        return self._summary(project_ids, projects, runs, versions)
+
+    def _load_tiers(self, tier_ids):
+        if tier_ids:
+            tiers = PricingTier.query.filter(
+                PricingTier.company_id == self.company.id,
+                PricingTier.id.in_(tier_ids)
+            ).order_by(PricingTier.sort_order).all()
+            if not tiers:
+                raise ValueError('Aucune des gammes de prix demandées n\'appartient à votre entreprise')
+            return tiers
+
+        return [QuoteGenerator.resolve_tier(self.company)]
+
+    def _create_quotes(self, projects, tiers, valid_days, notes):
+        # References are numbered from one count instead of one count per quote
+        year = datetime.utcnow().year
+        number = Quote.count_for_year(self.company.id, year)
+        valid_until = datetime.utcnow().date() + timedelta(days=valid_days)
+
+        runs = []
+        for project in projects:
+            for tier in tiers:
+                number += 1
+                quote = Quote(
+                    project_id=project.id,
+                    company_id=project.company_id,
+                    reference=Quote.format_reference(year, number),
+                    status=QuoteStatus.DRAFT,
+                    current_version=1,
+                    valid_until=valid_until,
+                    notes=notes
+                )
+                runs.append((quote, project, tier))
+
+        db.session.add_all([quote for quote, _, _ in runs])
+        db.session.flush()
+        return runs
+
+    @staticmethod
+    def _row(obj, version_id):
+        row = {
+            column.key: getattr(obj, column.key)
+            for column in obj.__table__.columns
+            if column.key not in ('id', 'created_at', 'updated_at')
+        }
+        row['version_id'] = version_id
+        return row
+
+    @staticmethod
+    def _summary(project_ids, projects, runs, versions):
+        quotes = defaultdict(list)
+        for (quote, project, tier), (version, _) in zip(runs, versions):
+            quotes[project.id].append({
+                'quote_id': quote.id,
+                'reference': quote.reference,
+                'tier': tier.name if tier else None,
+                'subtotal_ht': float(version.subtotal_ht or 0),
+                'total_ttc': float(version.total_ttc or 0)
+            })
+
+        summary = []
+        for project_id in project_ids:
+            project = projects.get(project_id)
+            if not project:
+                summary.append({'project_id': project_id, 'error': 'Projet introuvable'})
+                continue
+            summary.append({
+                'project_id': project.id,
+                'project_name': project.name,
+                'quotes': quotes[project.id]
+            })
+        return summary
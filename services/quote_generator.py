@@ -1,28 +1,61 @@
-from models import db, QuoteVersion, QuoteLine, QuoteAssumption, BPUArticle, CompanyBPUOverride, CompanyBPUArticle, PricingTier, BPULibrary, Measurement, Room, ProjectAnswer
+from models import db, QuoteVersion, QuoteLine, QuoteAssumption, PricingTier
+from services.price_resolver import PriceResolver
+from services.project_snapshot import ProjectSnapshot
 from flask_login import current_user
 from decimal import Decimal
 
 
 class QuoteGenerator:
-    def __init__(self, project, tier_id=None):
+    FLOOR_PRICES = {'carrelage': 120, 'parquet': 180, 'marbre': 350, 'beton_cire': 150}
+    FLOOR_CODES = {
+        'carrelage': 'SO-SOL-CARR',
+        'parquet': 'SO-SOL-PARQ',
+        'marbre': 'SO-SOL-MARB',
+        'beton_cire': 'SO-SOL-BETON'
+    }
+
+    # Every BPU code a generation run may read, resolved up front in one pass
+    ARTICLE_CODES = (
+        'GO-FOND', 'GO-MUR', 'DEMO-01', 'SO-PLOMB', 'SO-ELEC', 'SO-SOL-STD',
+        *FLOOR_CODES.values(),
+        'CVC-SPLIT', 'CVC-GAIN', 'EXT-PISCINE'
+    )
+
+    def __init__(self, project, tier_id=None, tier=None, prices=None, snapshot=None):
+        """
+        `tier`, `prices` and the project `snapshot` may be handed in already loaded
+        (see BatchQuoteGenerator); otherwise they are read for this project.
+        """
         self.project = project
         self.company = project.company
-        self.tier = None
+        self.tier = tier or self.resolve_tier(self.company, tier_id)
+        
+        self.coefficient = Decimal(str(self.tier.coefficient)) if self.tier else Decimal('1')
+        self.price_column = self.tier.price_column if self.tier else 'unit_price_standard'
+        self.vat_rate = self.company.tax_profile.default_vat_rate if self.company.tax_profile else Decimal('20')
+        self.prices = prices
+        self.snapshot = snapshot
+        self.lines = []
+        self.assumptions = []
+    
+    @staticmethod
+    def resolve_tier(company, tier_id=None):
+        """Requested tier, else the company default tier, else its first tier."""
+        tier = None
         
         if tier_id:
-            self.tier = PricingTier.query.get(tier_id)
+            tier = PricingTier.query.get(tier_id)
         
-        if not self.tier:
-            self.tier = PricingTier.query.filter_by(
-                company_id=self.company.id,
+        if not tier:
+            tier = PricingTier.query.filter_by(
+                company_id=company.id,
                 is_default=True
             ).first()
         
-        if not self.tier:
-            self.tier = PricingTier.query.filter_by(company_id=self.company.id).first()
+        if not tier:
+            tier = PricingTier.query.filter_by(company_id=company.id).first()
         
-        self.coefficient = Decimal(str(self.tier.coefficient)) if self.tier else Decimal('1')
-        self.vat_rate = self.company.tax_profile.default_vat_rate if self.company.tax_profile else Decimal('20')
+        return tier
     
     def generate_version(self, quote):
         version = QuoteVersion(
@@ -35,6 +68,25 @@ class QuoteGenerator:
         db.session.add(version)
         db.session.flush()
         
+        self.build(version)
+        db.session.add_all(self.lines)
+        db.session.add_all(self.assumptions)
+        
+        return version
+    
+    def build(self, version):
+        """
+        Computes the lines, assumptions and totals of a version in memory.
+        Nothing is added to the session: the caller persists `lines` and `assumptions`.
+        """
+        if self.prices is None:
+            self.prices = PriceResolver(self.company, self.price_column).resolve(self.ARTICLE_CODES)
+        if self.snapshot is None:
+            self.snapshot = ProjectSnapshot.load(self.project)
+        
+        self.lines = []
+        self.assumptions = []
+        
         self._generate_lines(version)
         self._generate_assumptions(version)
         self._calculate_totals(version)
@@ -43,88 +95,29 @@ class QuoteGenerator:
 
     def _get_article_data(self, code, default_category, default_designation, default_unit, default_price):
         """
-        Retrieves article price and designation from BPU based on code and current tier.
-        Falls back to default values if not found.
+        Retrieves article price and designation from the resolved price table
+        based on code and current tier. Falls back to default values if not found.
         """
-        price = default_price * self.coefficient
-        designation = default_designation
-        article_id = None
-        custom_article_id = None
-
-        # 1. Try Custom Article (Company BPU)
-        custom_article = CompanyBPUArticle.query.filter_by(
-            company_id=self.company.id,
-            code=code,
-            is_active=True
-        ).first()
-
-        if custom_article:
-            custom_article_id = custom_article.id
-            designation = custom_article.designation
-            # Get price from the column matching the tier (eco/std/prem)
-            price_col = self.tier.price_column
-            base_price = getattr(custom_article, price_col)
-            if base_price is not None:
-                price = Decimal(str(base_price)) * self.coefficient
-            return price, designation, article_id, custom_article_id
-
-        # 2. Try Library Article (Standard BPU)
-        library_article = BPUArticle.query.join(BPULibrary).filter(
-            BPUArticle.code == code,
-            BPULibrary.country == self.company.country,
-            BPULibrary.is_active == True
-        ).first()
-
-        if library_article:
-            article_id = library_article.id
-            designation = library_article.designation
+        resolved = self.prices.get(code)
 
-            # Check for Override
-            override = CompanyBPUOverride.query.filter_by(
-                company_id=self.company.id,
-                article_id=library_article.id
-            ).first()
-
-            price_col = self.tier.price_column
+        if not resolved:
+            return default_price * self.coefficient, default_designation, None, None
 
-            if override and not override.is_disabled:
-                if override.designation_override:
-                    designation = override.designation_override
+        base_price = resolved.base_price if resolved.base_price is not None else default_price
+        price = base_price * self.coefficient
 
-                # Check if override has a specific price for this tier
-                override_price = getattr(override, price_col)
-                if override_price is not None:
-                    price = Decimal(str(override_price)) * self.coefficient
-                else:
-                    # Fallback to library price if override doesn't specify this tier
-                    base_price = getattr(library_article, price_col)
-                    if base_price is not None:
-                        price = Decimal(str(base_price)) * self.coefficient
-            elif override and override.is_disabled:
-                # If explicitly disabled, treat as not found (or return defaults)
-                # But here we fallback to defaults passed in arguments
-                pass
-            else:
-                base_price = getattr(library_article, price_col)
-                if base_price is not None:
-                    price = Decimal(str(base_price)) * self.coefficient
-
-        return price, designation, article_id, custom_article_id
+        return price, resolved.designation, resolved.article_id, resolved.custom_article_id
     
     def _generate_lines(self, version):
-        rooms = Room.query.filter_by(project_id=self.project.id).all()
-        measurements = Measurement.query.join(Room).filter(
-            Room.project_id == self.project.id
-        ).all()
-        
-        answers = {a.question.code: a for a in self.project.answers}
+        rooms = self.snapshot.rooms
+        answers = self.snapshot.answers_by_code
         
         sort_order = 0
         
-        if self.project.project_type.value == 'construction':
+        if self.snapshot.project_type == 'construction':
             sort_order = self._add_gros_oeuvre_lines(version, rooms, sort_order)
         
-        if self.project.project_type.value == 'renovation':
+        if self.snapshot.project_type == 'renovation':
             if 'demolition' in answers and answers['demolition'].answer_value == 'oui':
                 sort_order = self._add_demolition_lines(version, rooms, sort_order)
         
@@ -157,7 +150,7 @@ class QuoteGenerator:
             quantity_source='calculated',
             sort_order=sort_order
         )
-        db.session.add(line)
+        self._add_line(line)
         sort_order += 1
         
         # Murs
@@ -178,7 +171,7 @@ class QuoteGenerator:
             quantity_source='calculated',
             sort_order=sort_order
         )
-        db.session.add(line)
+        self._add_line(line)
         sort_order += 1
         
         return sort_order
@@ -203,7 +196,7 @@ class QuoteGenerator:
             quantity_source='calculated',
             sort_order=sort_order
         )
-        db.session.add(line)
+        self._add_line(line)
         return sort_order + 1
     
     def _add_second_oeuvre_lines(self, version, rooms, answers, sort_order):
@@ -232,7 +225,7 @@ class QuoteGenerator:
             quantity_source='calculated',
             sort_order=sort_order
         )
-        db.session.add(line)
+        self._add_line(line)
         sort_order += 1
         
         # Electricité
@@ -253,7 +246,7 @@ class QuoteGenerator:
             quantity_source='calculated',
             sort_order=sort_order
         )
-        db.session.add(line)
+        self._add_line(line)
         sort_order += 1
         
         # Sol
@@ -262,15 +255,8 @@ class QuoteGenerator:
         code = 'SO-SOL-STD'
 
         if floor_type and floor_type.answer_value:
-            floor_prices = {'carrelage': 120, 'parquet': 180, 'marbre': 350, 'beton_cire': 150}
-            floor_codes = {
-                'carrelage': 'SO-SOL-CARR',
-                'parquet': 'SO-SOL-PARQ',
-                'marbre': 'SO-SOL-MARB',
-                'beton_cire': 'SO-SOL-BETON'
-            }
-            default_price = Decimal(str(floor_prices.get(floor_type.answer_value, 120)))
-            code = floor_codes.get(floor_type.answer_value, 'SO-SOL-STD')
+            default_price = Decimal(str(self.FLOOR_PRICES.get(floor_type.answer_value, 120)))
+            code = self.FLOOR_CODES.get(floor_type.answer_value, 'SO-SOL-STD')
 
         price, designation, art_id, cust_id = self._get_article_data(
             code, 'Second Œuvre', 'Revêtement de sol', 'm²', default_price
@@ -289,7 +275,7 @@ class QuoteGenerator:
             quantity_source='calculated',
             sort_order=sort_order
         )
-        db.session.add(line)
+        self._add_line(line)
         sort_order += 1
         
         return sort_order
@@ -326,7 +312,7 @@ class QuoteGenerator:
             quantity_source='manual',
             sort_order=sort_order
         )
-        db.session.add(line)
+        self._add_line(line)
         return sort_order + 1
     
     def _add_pool_lines(self, version, answers, sort_order):
@@ -357,22 +343,20 @@ class QuoteGenerator:
             quantity_source='manual',
             sort_order=sort_order
         )
-        db.session.add(line)
+        self._add_line(line)
         return sort_order + 1
     
     def _generate_assumptions(self, version):
-        answers = self.project.answers
-        
-        for answer in answers:
+        for answer in self.snapshot.answers:
             assumption = QuoteAssumption(
                 version_id=version.id,
-                category=answer.question.category,
-                description=answer.question.question_text,
+                category=answer.category,
+                description=answer.question_text,
                 value=answer.answer_value,
                 is_confirmed=answer.is_confirmed,
                 source='question_engine'
             )
-            db.session.add(assumption)
+            self.assumptions.append(assumption)
         
         assumption = QuoteAssumption(
             version_id=version.id,
@@ -382,11 +366,13 @@ class QuoteGenerator:
             is_confirmed=True,
             source='system'
         )
-        db.session.add(assumption)
+        self.assumptions.append(assumption)
+    
+    def _add_line(self, line):
+        self.lines.append(line)
     
     def _calculate_totals(self, version):
-        lines = QuoteLine.query.filter_by(version_id=version.id).all()
-        
-        version.subtotal_ht = sum(line.total_price for line in lines)
+        # Lines were built in this run: no need to read them back
+        version.subtotal_ht = sum((line.total_price for line in self.lines), Decimal('0'))
         version.vat_amount = version.subtotal_ht * version.vat_rate / 100
         version.total_ttc = version.subtotal_ht + version.vat_amount
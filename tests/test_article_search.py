@@ -0,0 +1,102 @@
+import unittest
+from types import SimpleNamespace
+from flask import Flask
+from sqlalchemy.dialects import postgresql
+from models import db, Company, BPULibrary, BPUArticle, CompanyBPUArticle, CompanyBPUOverride
+from services.article_search import ArticleSearch, code_key, normalize
+
+
+class NormalizeTestCase(unittest.TestCase):
+    def test_accents_ligatures_and_punctuation(self):
+        self.assertEqual(normalize('Béton armé (Œuvre) - Façade'), 'beton arme oeuvre facade')
+        self.assertEqual(code_key('GO-FOND.01'), 'gofond01')
+
+
+class ArticleSearchTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+        db.init_app(self.app)
+        self.context = self.app.app_context()
+        self.context.push()
+        db.create_all()
+
+        self.library = BPULibrary(country='MA', version='2025.1', name='Maroc')
+        self.company = Company(name='Test', slug='test', country='MA')
+        db.session.add_all([self.library, self.company])
+        db.session.flush()
+
+        self.articles = {}
+        for order, (code, designation) in enumerate([
+            ('GO-FOND-01', 'Fondations en béton armé'),
+            ('GO-FOND-02', 'Semelles filantes'),
+            ('GO-MUR-01', 'Murs en agglos 20x20x50'),
+            ('SO-PEINT', 'Peinture acrylique murs'),
+            ('GO-DAL', 'Dallage 100% armé'),
+        ]):
+            article = BPUArticle(library_id=self.library.id, code=code, category='Gros Œuvre', designation=designation,
+                                 unit='m²', unit_price_standard=100 + order, sort_order=order)
+            db.session.add(article)
+            self.articles[code] = article
+        db.session.commit()
+        self.search = ArticleSearch(self.company, self.library)
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.context.pop()
+
+    def codes(self, query, **kwargs):
+        return [(entry.source, entry.code) for entry in self.search.search(query, **kwargs)]
+
+    def test_exact_code_then_prefix_then_terms(self):
+        self.assertEqual(self.codes('go-fond'), [('library', 'GO-FOND-01'), ('library', 'GO-FOND-02')])
+        self.assertEqual(self.codes('GO-FOND-02')[0], ('library', 'GO-FOND-02'))
+        self.assertEqual(self.codes('murs'), [('library', 'GO-MUR-01'), ('library', 'SO-PEINT')])
+        self.assertEqual(self.codes('peinture murs'), [('library', 'SO-PEINT')])
+        self.assertEqual(self.codes('murs', category='Second Œuvre'), [])
+
+    def test_like_wildcards_matched_literally(self):
+        self.assertEqual(self.codes('100%'), [('library', 'GO-DAL')])
+        self.assertEqual(self.codes('GO_'), [])
+
+    def test_overrides_and_custom_articles(self):
+        db.session.add_all([
+            CompanyBPUOverride(company_id=self.company.id, article_id=self.articles['GO-MUR-01'].id,
+                               designation_override='Murs porteurs', unit_price_standard=250),
+            CompanyBPUOverride(company_id=self.company.id, article_id=self.articles['SO-PEINT'].id, is_disabled=True),
+            CompanyBPUArticle(company_id=self.company.id, code='GO-FOND-02', category='Gros Œuvre',
+                              designation='Semelles maison', unit='ml'),
+            CompanyBPUArticle(company_id=self.company.id, code='X-1', category='Divers',
+                              designation='Murs anciens', unit='u', is_active=False),
+        ])
+        db.session.commit()
+
+        entry, = self.search.search('porteurs')
+        self.assertEqual((entry.source, entry.designation, entry.unit_price_standard), ('library', 'Murs porteurs', 250))
+        self.assertEqual(self.codes('murs'), [('library', 'GO-MUR-01')])
+        self.assertEqual(self.codes('go-fond'), [('custom', 'GO-FOND-02'), ('library', 'GO-FOND-01')])
+
+        # The BPU listing filter keeps disabled and replaced articles
+        self.assertEqual(self.search.library_ids('go-fond'),
+                         [self.articles['GO-FOND-01'].id, self.articles['GO-FOND-02'].id])
+        self.assertEqual(self.search.library_ids('peinture'), [self.articles['SO-PEINT'].id])
+
+    def test_empty_query(self):
+        self.assertEqual(self.search.search(' - '), [])
+
+
+class TrigramStatementTestCase(unittest.TestCase):
+    def test_postgresql_query_on_the_search_indexes(self):
+        search = ArticleSearch(SimpleNamespace(id=1), SimpleNamespace(id=2))
+        statement = search.statement("Béton'; DROP TABLE x", trigram=True)
+        sql = str(statement.compile(dialect=postgresql.dialect()))
+        params = statement.compile(dialect=postgresql.dialect()).params
+
+        self.assertIn("devispro_search_text(bpu_articles.code || ' ' || bpu_articles.designation)", sql)
+        self.assertIn('devispro_code_key(company_bpu_articles.code) LIKE', sql)
+        self.assertIn('word_similarity(', sql)
+        self.assertIn('<%', sql)
+        self.assertNotIn('DROP', sql)
+        self.assertIn('beton drop table x', params.values())
+        self.assertIn('betondroptablex%', params.values())
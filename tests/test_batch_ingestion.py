@@ -0,0 +1,94 @@
+import unittest
+from flask import Flask
+from flask_login import LoginManager
+from models import db, Company, User, Project, ProjectType, ProjectTypology, ProjectPlan, Room, Measurement
+from routes import register_blueprints
+
+
+class BatchIngestionTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+        self.app.secret_key = 'test'
+        db.init_app(self.app)
+        login_manager = LoginManager(self.app)
+        login_manager.user_loader(lambda user_id: db.session.get(User, int(user_id)))
+        register_blueprints(self.app)
+        self.context = self.app.app_context()
+        self.context.push()
+        db.create_all()
+
+        company = Company(name='Test', slug='test', country='MA')
+        db.session.add(company)
+        db.session.flush()
+        user = User(company_id=company.id, email='owner@test.ma', password_hash='x', is_company_owner=True)
+        self.project = Project(company_id=company.id, name='Villa', project_type=ProjectType.CONSTRUCTION,
+                               typology=ProjectTypology.VILLA)
+        db.session.add_all([user, self.project])
+        db.session.flush()
+        self.plan = ProjectPlan(project_id=self.project.id, name='RDC', file_path='plan.png', file_type='png')
+        db.session.add(self.plan)
+        db.session.commit()
+
+        self.client = self.app.test_client()
+        with self.client.session_transaction() as session:
+            session['_user_id'] = str(user.id)
+            session['_fresh'] = True
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.context.pop()
+
+    def post_rooms(self, rooms):
+        return self.client.post(f'/api/projects/{self.project.id}/rooms/batch', json={'rooms': rooms})
+
+    def post_measurements(self, measurements):
+        return self.client.post(f'/api/plans/{self.plan.id}/measurements/batch', json={'measurements': measurements})
+
+    def test_rooms_created_in_one_batch(self):
+        response = self.post_rooms([{'name': 'Séjour', 'area': '32.5', 'perimeter': 24}, {}])
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.get_json()['created'], 2)
+        self.assertEqual([(room.name, float(room.area or 0)) for room in Room.query.order_by(Room.id)],
+                         [('Séjour', 32.5), ('Nouvelle pièce', 0)])
+
+    def test_invalid_rooms_reject_the_whole_batch(self):
+        response = self.post_rooms([
+            {'name': 'x' * 101},
+            {'name': 'Cuisine', 'area': 'abc', 'plan_id': 999},
+            {'name': 12},
+            'Chambre',
+        ])
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.get_json()['results'], [
+            {'index': 0, 'errors': ['name invalide (100 caractères maximum)']},
+            {'index': 1, 'errors': ['Plan inconnu', 'area invalide']},
+            {'index': 2, 'errors': ['name invalide (100 caractères maximum)']},
+            {'index': 3, 'errors': ['Objet attendu']},
+        ])
+        self.assertEqual(Room.query.count(), 0)
+
+    def test_batch_size_checked(self):
+        self.assertEqual(self.post_rooms([]).get_json(), {'error': 'Aucun élément fourni'})
+        self.assertEqual(self.post_rooms([{}] * 501).status_code, 400)
+
+    def test_measurements_validated_then_created(self):
+        room = Room(project_id=self.project.id, name='Séjour')
+        db.session.add(room)
+        db.session.commit()
+
+        response = self.post_measurements([{'room_id': 999}, {'unit': 'mètres carrés'}])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.get_json()['results'], [
+            {'index': 0, 'errors': ['Pièce inconnue']},
+            {'index': 1, 'errors': ['unit invalide (10 caractères maximum)']},
+        ])
+
+        response = self.post_measurements([{'room_id': room.id, 'quantity': 12.5}, {'measurement_type': 'linear', 'unit': 'ml'}])
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual([(m.room_id, m.measurement_type, m.unit, float(m.quantity))
+                          for m in Measurement.query.order_by(Measurement.id)],
+                         [(room.id, 'area', 'm²', 12.5), (None, 'linear', 'ml', 0)])
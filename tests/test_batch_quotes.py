@@ -0,0 +1,79 @@
+import unittest
+from decimal import Decimal
+from flask import Flask
+from flask_login import LoginManager
+from models import (
+    db, Company, User, PricingTier, Project, ProjectType, ProjectTypology, Room, Quote, QuoteVersion, QuoteLine
+)
+from routes import register_blueprints
+
+
+class BatchQuotesTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+        self.app.secret_key = 'test'
+        db.init_app(self.app)
+        login_manager = LoginManager(self.app)
+        login_manager.user_loader(lambda user_id: db.session.get(User, int(user_id)))
+        register_blueprints(self.app)
+        self.context = self.app.app_context()
+        self.context.push()
+        db.create_all()
+
+        company, other = Company(name='Test', slug='test', country='MA'), Company(name='Autre', slug='autre')
+        db.session.add_all([company, other])
+        db.session.flush()
+        user = User(company_id=company.id, email='owner@test.ma', password_hash='x', is_company_owner=True)
+        self.eco = PricingTier(company_id=company.id, name='Économique eco', code='ECO', coefficient=Decimal('0.9'))
+        self.standard = PricingTier(company_id=company.id, name='Standard', code='STD', coefficient=Decimal('1'),
+                                    is_default=True, sort_order=1)
+        self.foreign = PricingTier(company_id=other.id, name='Standard', code='STD', coefficient=Decimal('1'))
+        self.project = Project(company_id=company.id, name='Villa', project_type=ProjectType.CONSTRUCTION,
+                               typology=ProjectTypology.VILLA)
+        self.foreign_project = Project(company_id=other.id, name='Autre', project_type=ProjectType.CONSTRUCTION,
+                                       typology=ProjectTypology.VILLA)
+        db.session.add_all([user, self.eco, self.standard, self.foreign, self.project, self.foreign_project])
+        db.session.flush()
+        db.session.add(Room(project_id=self.project.id, name='Séjour', area=Decimal('20')))
+        db.session.commit()
+
+        self.client = self.app.test_client()
+        with self.client.session_transaction() as session:
+            session['_user_id'] = str(user.id)
+            session['_fresh'] = True
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.context.pop()
+
+    def post(self, **data):
+        return self.client.post('/api/quotes/batch', json=data)
+
+    def test_foreign_tiers_rejected(self):
+        response = self.post(project_ids=[self.project.id], tier_ids=[self.foreign.id])
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.get_json()['error'],
+                         'Aucune des gammes de prix demandées n\'appartient à votre entreprise')
+        self.assertEqual(Quote.query.count(), 0)
+
+    def test_one_quote_per_project_and_own_tier(self):
+        response = self.post(project_ids=[self.project.id, self.foreign_project.id],
+                             tier_ids=[self.standard.id, self.eco.id, self.foreign.id], notes=None)
+
+        self.assertEqual(response.status_code, 201)
+        projects = response.get_json()['projects']
+        self.assertEqual([quote['tier'] for quote in projects[0]['quotes']], ['Économique eco', 'Standard'])
+        self.assertEqual(projects[1], {'project_id': self.foreign_project.id, 'error': 'Projet introuvable'})
+
+        versions = QuoteVersion.query.order_by(QuoteVersion.id).all()
+        self.assertEqual([version.tier_id for version in versions], [self.eco.id, self.standard.id])
+        self.assertEqual(QuoteVersion.verify_totals(), [])
+        self.assertEqual(len({quote.reference for quote in Quote.query}), 2)
+        self.assertTrue(QuoteLine.query.filter_by(version_id=versions[0].id).count())
+
+    def test_invalid_parameters(self):
+        self.assertEqual(self.post(project_ids=['x']).status_code, 400)
+        self.assertEqual(self.post(project_ids=[]).get_json(), {'error': 'Aucun projet sélectionné'})
@@ -0,0 +1,107 @@
+import unittest
+from unittest import mock
+from flask import Flask
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from models import db, Company, BPULibrary, BPUArticle, CompanyBPUArticle, BPUCategoryFacet
+
+
+class CategoryFacetsTestCase(unittest.TestCase):
+    def setUp(self):
+        self.engine = create_engine('sqlite://')
+        db.metadata.create_all(self.engine)
+        self.session = Session(self.engine)
+
+        self.library = BPULibrary(country='MA', version='2025.1', name='Maroc')
+        self.company = Company(name='Test', slug='test', country='MA')
+        self.session.add_all([self.library, self.company])
+        self.session.flush()
+
+    def tearDown(self):
+        self.session.close()
+        self.engine.dispose()
+
+    def facets(self, **scope):
+        return {
+            (facet.category, facet.subcategory): facet.article_count
+            for facet in self.session.query(BPUCategoryFacet).filter_by(**scope)
+            if facet.article_count
+        }
+
+    def custom(self, code, category, subcategory=None):
+        article = CompanyBPUArticle(company_id=self.company.id, code=code, category=category,
+                                    subcategory=subcategory, designation=code, unit='u')
+        self.session.add(article)
+        return article
+
+    def test_library_articles_counted(self):
+        self.session.add_all([
+            BPUArticle(library_id=self.library.id, code=f'GO-{i}', category='Gros Œuvre',
+                       subcategory='Fondations' if i < 2 else None, designation='x', unit='m³')
+            for i in range(3)
+        ])
+        self.session.commit()
+
+        self.assertEqual(self.facets(library_id=self.library.id),
+                         {('Gros Œuvre', 'Fondations'): 2, ('Gros Œuvre', ''): 1})
+
+    def test_custom_articles_moved_and_archived(self):
+        first = self.custom('A-1', 'Divers', 'A')
+        second = self.custom('A-2', 'Divers')
+        self.session.commit()
+
+        first.category = 'Autre'
+        second.is_active = False
+        self.session.commit()
+        self.assertEqual(self.facets(company_id=self.company.id), {('Autre', 'A'): 1})
+
+        self.session.delete(first)
+        self.session.commit()
+        self.assertEqual(self.facets(company_id=self.company.id), {})
+        self.assertEqual(BPUCategoryFacet.counted(('company', self.company.id), self.session), {})
+
+    def test_counts_stored_once_per_key(self):
+        scope = ('company', self.company.id)
+        self.custom('A-1', 'Divers')
+        self.session.commit()
+
+        # A first count that raced with the one of the flush is ignored
+        BPUCategoryFacet._store(scope, {('Divers', ''): 5}, self.session)
+        BPUCategoryFacet._increment(self.session, scope, ('Divers', ''), 2)
+        self.session.commit()
+
+        rows = self.session.query(BPUCategoryFacet).filter_by(company_id=self.company.id).all()
+        self.assertEqual([(row.category, row.article_count) for row in rows], [('Divers', 3)])
+
+
+class FacetsForScopesTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+        db.init_app(self.app)
+        self.context = self.app.app_context()
+        self.context.push()
+        db.create_all()
+
+        self.company = Company(name='Test', slug='test', country='MA')
+        db.session.add(self.company)
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.context.pop()
+
+    def test_scope_without_articles_counted_once(self):
+        scope = ('company', self.company.id)
+        with mock.patch.object(BPUCategoryFacet, 'counted', wraps=BPUCategoryFacet.counted) as counted:
+            self.assertEqual([facet.article_count for facet in BPUCategoryFacet.for_scopes(scope)], [0])
+            BPUCategoryFacet.for_scopes(scope)
+        self.assertEqual(counted.call_count, 1)
+
+        # The first article counts from the stored empty scope
+        db.session.add(CompanyBPUArticle(company_id=self.company.id, code='A-1', category='Divers',
+                                         designation='A', unit='u'))
+        db.session.commit()
+        self.assertEqual(sorted((facet.category, facet.article_count) for facet in BPUCategoryFacet.for_scopes(scope)),
+                         [('', 0), ('Divers', 1)])
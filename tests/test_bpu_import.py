@@ -0,0 +1,83 @@
+import unittest
+from decimal import Decimal
+from io import BytesIO
+from flask import Flask
+from openpyxl import Workbook
+from models import db, Company, CompanyBPUArticle, BPUCategoryFacet
+from services.bpu_service import BPUService
+
+
+class BPUImportTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+        db.init_app(self.app)
+        self.context = self.app.app_context()
+        self.context.push()
+        db.create_all()
+
+        self.company = Company(name='Test', slug='test', country='MA')
+        db.session.add(self.company)
+        db.session.flush()
+        db.session.add(CompanyBPUArticle(company_id=self.company.id, code='A-1', category='Divers',
+                                         designation='Ancien', unit='u', is_active=False))
+        db.session.commit()
+        self.service = BPUService(self.company)
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.context.pop()
+
+    def workbook(self, *rows):
+        wb = Workbook()
+        ws = wb.active
+        ws.append(['Code', 'Catégorie', 'Désignation', 'Unité', 'Prix Éco', 'Prix Standard', 'Prix Premium'])
+        for row in rows:
+            ws.append(row)
+        stream = BytesIO()
+        wb.save(stream)
+        stream.seek(0)
+        return stream
+
+    def articles(self):
+        return {
+            article.code: (article.designation, article.unit_price_eco, article.unit_price_standard, article.is_active)
+            for article in CompanyBPUArticle.query.filter_by(company_id=self.company.id)
+        }
+
+    def test_upsert_with_duplicates_and_error_rows(self):
+        self.service.IMPORT_CHUNK_SIZE = 1
+        result = self.service.import_from_excel(self.workbook(
+            ['A-1', 'Divers', 'Mis à jour', 'u', '1,5', 2, 3],
+            ['B-1', 'Divers', 'Nouveau', 'm²', None, '10', 12],
+            [None, None, None, None, None, None, None],
+            ['C-1', 'Divers', 'Prix faux', 'u', 'abc', 1, 1],
+            ['B-1', 'Divers', 'Nouveau, corrigé', 'm²', 0, '11', 12],
+            ['D-' + 'x' * 60, 'Divers', 'Code long', 'u', 1, 1, 1],
+            ['E-1', 'Divers', 'Négatif', 'u', 1, -5, 1],
+        ))
+
+        self.assertTrue(result['success'])
+        self.assertEqual(result['stats'], {'created': 1, 'updated': 1, 'errors': 3})
+        self.assertEqual([(error['row'], error['error']) for error in result['errors']], [
+            (5, 'Prix invalide: abc'),
+            (7, 'Code trop long (50 caractères max)'),
+            (8, 'Prix invalide: -5'),
+        ])
+
+        db.session.expire_all()
+        self.assertEqual(self.articles(), {
+            'A-1': ('Mis à jour', Decimal('1.50'), Decimal('2.00'), True),
+            'B-1': ('Nouveau, corrigé', Decimal('0.00'), Decimal('11.00'), True),
+        })
+        self.assertEqual(BPUCategoryFacet.counted(('company', self.company.id)), {('Divers', ''): 2})
+        self.assertEqual(
+            [(facet.category, facet.article_count) for facet in BPUCategoryFacet.query.filter_by(company_id=self.company.id)],
+            [('Divers', 2)]
+        )
+
+    def test_unreadable_file(self):
+        result = self.service.import_from_excel(BytesIO(b'pas un classeur'))
+        self.assertFalse(result['success'])
+        self.assertEqual(len(self.articles()), 1)
@@ -0,0 +1,77 @@
+import unittest
+from flask import Flask
+from models import db, Company, CompanyStats, Project, ProjectStatus, ProjectType, ProjectTypology, Quote
+
+
+class CompanyStatsTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+        db.init_app(self.app)
+        self.context = self.app.app_context()
+        self.context.push()
+        db.create_all()
+
+        self.company = Company(name='Test', slug='test', country='MA')
+        db.session.add(self.company)
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.context.pop()
+
+    def add_project(self, name, status=None):
+        project = Project(company_id=self.company.id, name=name, project_type=ProjectType.CONSTRUCTION,
+                          typology=ProjectTypology.VILLA, status=status)
+        db.session.add(project)
+        db.session.commit()
+        return project
+
+    def counters(self):
+        stats = db.session.get(CompanyStats, self.company.id)
+        db.session.refresh(stats)
+        return stats.project_count, stats.active_project_count, stats.quote_count
+
+    def test_counted_on_first_use(self):
+        db.session.add_all([
+            Project(company_id=self.company.id, name=name, project_type=ProjectType.CONSTRUCTION,
+                    typology=ProjectTypology.VILLA, status=status)
+            for name, status in (('Villa', ProjectStatus.IN_PROGRESS), ('Riad', ProjectStatus.COMPLETED))
+        ])
+        db.session.flush()
+        # Rows written behind the listener back: counted from the tables
+        db.session.query(CompanyStats).delete()
+        db.session.commit()
+
+        stats = CompanyStats.for_company(self.company.id)
+        self.assertEqual((stats.project_count, stats.active_project_count, stats.quote_count), (2, 1, 0))
+        self.assertIs(CompanyStats.for_company(self.company.id), stats)
+
+    def test_counters_follow_projects_and_quotes(self):
+        villa = self.add_project('Villa')
+        riad = self.add_project('Riad', ProjectStatus.COMPLETED)
+        self.assertEqual(self.counters(), (2, 1, 0))
+        version = db.session.get(CompanyStats, self.company.id).version
+
+        db.session.add(Quote(project_id=villa.id, company_id=self.company.id, reference='DEV-2026-0001'))
+        db.session.commit()
+        self.assertEqual(self.counters(), (2, 1, 1))
+        self.assertGreater(db.session.get(CompanyStats, self.company.id).version, version)
+
+        villa.status = ProjectStatus.ARCHIVED
+        riad.status = ProjectStatus.IN_PROGRESS
+        db.session.commit()
+        self.assertEqual(self.counters(), (2, 1, 1))
+
+        riad.status = ProjectStatus.QUOTE_READY
+        db.session.commit()
+        self.assertEqual(self.counters(), (2, 0, 1))
+
+        db.session.delete(Quote.query.one())
+        db.session.delete(villa)
+        db.session.commit()
+        self.assertEqual(self.counters(), (1, 0, 0))
+
+        counted = CompanyStats.counted(self.company.id)
+        self.assertEqual(self.counters(), (counted.project_count, counted.active_project_count, counted.quote_count))
@@ -0,0 +1,105 @@
+import math
+import os
+import tempfile
+import unittest
+from algorithms.spatial import GridIndex
+from services.dxf_reader import DXFReader
+
+
+def lwpolyline(points, bulges=None, layer='MURS'):
+    groups = ['0', 'LWPOLYLINE', '8', layer, '90', len(points), '70', '1']
+    for i, (x, y) in enumerate(points):
+        groups += ['10', x, '20', y]
+        if bulges and bulges.get(i):
+            groups += ['42', bulges[i]]
+    return groups
+
+
+def text(x, y, value, height=200):
+    return ['0', 'TEXT', '8', 'TEXTES', '10', x, '20', y, '40', height, '1', value]
+
+
+class GridIndexTestCase(unittest.TestCase):
+    def test_query(self):
+        index = GridIndex(10)
+        index.insert('a', (0, 0, 5, 5))
+        index.insert('b', (50, 50, 80, 60))
+        index.insert('c', (4, 4, 55, 55))
+
+        self.assertEqual(index.query((1, 1, 2, 2)), ['a'])
+        self.assertEqual(index.query((52, 52, 53, 53)), ['b', 'c'])
+        self.assertEqual(index.query_point(30, 30, radius=1), ['c'])
+        self.assertEqual(index.query((-100, -100, -90, -90)), [])
+
+
+class DXFReaderTestCase(unittest.TestCase):
+    def read(self, entities, insunits=4):
+        groups = ['0', 'SECTION', '2', 'HEADER', '9', '$INSUNITS', '70', insunits, '0', 'ENDSEC',
+                  '0', 'SECTION', '2', 'ENTITIES']
+        for entity in entities:
+            groups += entity
+        groups += ['0', 'ENDSEC', '0', 'EOF']
+
+        handle, path = tempfile.mkstemp(suffix='.dxf')
+        with os.fdopen(handle, 'w', encoding='cp1252') as f:
+            f.write('\n'.join(str(g) for g in groups) + '\n')
+        self.addCleanup(os.remove, path)
+        return DXFReader(path).read()
+
+    def test_units_and_scale(self):
+        drawing = self.read([lwpolyline([(0, 0), (10000, 0), (10000, 5000), (0, 5000)])])
+
+        self.assertEqual(drawing.units, 'mm')
+        self.assertFalse(drawing.units_assumed)
+        self.assertEqual(drawing.dimensions, {'width': 10.0, 'height': 5.0, 'unit': 'm'})
+        self.assertAlmostEqual(drawing.scale_factor, 0.01)
+        self.assertEqual(drawing.size, (1001, 501))
+
+    def test_exact_area_with_bulge(self):
+        # 6 m x 5 m room whose right wall is a half circle bulging outward
+        drawing = self.read([lwpolyline([(0, 0), (6000, 0), (6000, 5000), (0, 5000)], bulges={1: 1})])
+        room = drawing.candidate_rooms()[0]
+
+        self.assertAlmostEqual(room['area'], round(30 + math.pi * 2.5 ** 2 / 2, 2))
+        self.assertAlmostEqual(room['perimeter'], round(17 + math.pi * 2.5, 2))
+
+    def test_candidate_rooms(self):
+        drawing = self.read([
+            lwpolyline([(0, 0), (10000, 0), (10000, 8000), (0, 8000)]),
+            lwpolyline([(0, 0), (4000, 0), (4000, 5000), (0, 5000)]),
+            lwpolyline([(4000, 0), (10000, 0), (10000, 5000), (4000, 5000)]),
+            # Wall outline: too narrow to be a room
+            lwpolyline([(0, 5000), (10000, 5000), (10000, 5200), (0, 5200)]),
+            text(1500, 2500, 'Séjour'),
+            text(6000, 2500, 'Cuisine'),
+            text(6000, 2000, 'carrelage', height=80),
+        ])
+        rooms = drawing.candidate_rooms()
+
+        # The envelope enclosing both rooms is not a candidate
+        self.assertEqual([(r['name'], r['area']) for r in rooms], [('Séjour', 20.0), ('Cuisine', 30.0)])
+        self.assertEqual(rooms[0]['polygon'][0], {'x': 0.0, 'y': 800.0})
+
+    def test_mtext_label(self):
+        drawing = self.read([
+            lwpolyline([(0, 0), (4000, 0), (4000, 5000), (0, 5000)]),
+            ['0', 'MTEXT', '8', 'TEXTES', '10', 1500, '20', 2500, '40', 200, '1', '{\\fArial|b1;Séjour}\\P20 m²'],
+        ])
+        self.assertEqual(drawing.candidate_rooms()[0]['name'], 'Séjour 20 m²')
+
+    def test_render_window(self):
+        drawing = self.read([
+            ['0', 'LINE', '8', '0', '10', 0, '20', 0, '11', 10000, '21', 10000],
+            ['0', 'ARC', '8', '0', '10', 5000, '20', 5000, '40', 1000, '50', 0, '51', 180],
+        ])
+        self.assertEqual(drawing.render().size, (1001, 1001))
+
+        tile = drawing.render(scale=2, box=(0, 0, 256, 256))
+        self.assertEqual(tile.size, (256, 256))
+        # Top-left tile at twice the resolution only sees empty paper
+        self.assertEqual(tile.getextrema(), (255, 255))
+        self.assertEqual(drawing.render(scale=2, box=(872, 872, 1128, 1128)).getextrema()[0], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,38 @@
+import unittest
+from algorithms.geometry import polygon_metrics, batch_polygon_metrics
+from algorithms.measurements import calculate_polygon_area, calculate_perimeter
+
+
+class PolygonMetricsTestCase(unittest.TestCase):
+    def test_rectangle(self):
+        points = [{'x': 0, 'y': 0}, {'x': 4, 'y': 0}, {'x': 4, 'y': 2}, {'x': 0, 'y': 2}]
+        metrics = polygon_metrics(points, scale_factor=0.5)
+
+        self.assertAlmostEqual(metrics.area, 2.0)
+        self.assertAlmostEqual(metrics.perimeter, 6.0)
+        self.assertEqual(metrics.centroid, (2.0, 1.0))
+        self.assertEqual(metrics.bbox, (0.0, 0.0, 4.0, 2.0))
+
+    def test_batch_matches_single_and_handles_degenerate_polygons(self):
+        triangle = [(0, 0), (3, 0), (0, 3)]
+        square = [(10, 10), (12, 10), (12, 12), (10, 12)]
+        results = batch_polygon_metrics([triangle, [], [(1, 1), (4, 5)], square])
+
+        self.assertEqual(results[0], polygon_metrics(triangle))
+        self.assertAlmostEqual(results[0].centroid[0], 1.0)
+        self.assertEqual(results[1].area, 0.0)
+        self.assertIsNone(results[1].bbox)
+        # Two vertices: closed path there and back, no area
+        self.assertEqual(results[2].area, 0.0)
+        self.assertAlmostEqual(results[2].perimeter, 10.0)
+        self.assertEqual(results[2].centroid, (2.5, 3.0))
+        self.assertAlmostEqual(results[3].area, 4.0)
+
+    def test_measurement_helpers(self):
+        points = [{'x': 0, 'y': 0}, {'x': 100, 'y': 0}, {'x': 100, 'y': 50}]
+        self.assertEqual(str(calculate_polygon_area(points, 0.01)), '0.25')
+        self.assertEqual(str(calculate_perimeter(points[:1])), '0')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+import os
+import tempfile
+import unittest
+from flask import Flask
+from sqlalchemy import event
+from models import db, BPULibrary
+from services.library_registry import library_registry, version_key
+
+
+class VersionKeyTestCase(unittest.TestCase):
+    def test_numeric_order(self):
+        versions = ['2025.10', '2025.2', '2024.12', '2025.1', 'v2026']
+        self.assertEqual(sorted(versions, key=version_key, reverse=True),
+                         ['v2026', '2025.10', '2025.2', '2025.1', '2024.12'])
+
+    def test_pre_release_before_release(self):
+        self.assertLess(version_key('2025.1-beta'), version_key('2025.1'))
+        self.assertLess(version_key('2025.1'), version_key('2025.1.1'))
+
+
+class LibraryRegistryTestCase(unittest.TestCase):
+    def setUp(self):
+        # A file, the registry loads through a connection of its own
+        handle, self.path = tempfile.mkstemp(suffix='.db')
+        os.close(handle)
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{self.path}'
+        db.init_app(self.app)
+        self.context = self.app.app_context()
+        self.context.push()
+        db.create_all()
+        library_registry.invalidate()
+
+        self.statements = []
+        event.listen(db.engine, 'before_cursor_execute', self.count)
+
+    def tearDown(self):
+        event.remove(db.engine, 'before_cursor_execute', self.count)
+        library_registry.invalidate()
+        db.session.remove()
+        db.engine.dispose()
+        self.context.pop()
+        os.remove(self.path)
+
+    def count(self, conn, cursor, statement, *args):
+        self.statements.append(statement)
+
+    def test_active_library_cached_and_invalidated_on_commit(self):
+        db.session.add(BPULibrary(country='MA', version='2025.2', name='Maroc 2025.2'))
+        db.session.commit()
+        self.assertEqual(library_registry.active_library('MA').version, '2025.2')
+
+        # Served from the cache and merged into a new session without a query
+        db.session.remove()
+        self.statements.clear()
+        library = library_registry.active_library('MA')
+        self.assertEqual((library.version, library.name), ('2025.2', 'Maroc 2025.2'))
+        self.assertIn(library, db.session)
+        self.assertEqual(self.statements, [])
+
+        # A new version activated and committed replaces the cached one
+        db.session.add(BPULibrary(country='MA', version='2025.10', name='Maroc 2025.10'))
+        db.session.commit()
+        self.assertEqual(library_registry.active_library('MA').version, '2025.10')
+        self.assertEqual([l.version for l in library_registry.active_libraries('MA')], ['2025.10', '2025.2'])
+        self.assertIsNone(library_registry.active_library('SN'))
@@ -0,0 +1,63 @@
+import unittest
+from datetime import datetime, timedelta
+from sqlalchemy import Column, DateTime, Integer, create_engine
+from sqlalchemy.orm import DeclarativeBase, Session
+from utils.pagination import decode_cursor, encode_cursor, keyset_paginate
+
+
+class Base(DeclarativeBase):
+    pass
+
+
+class Entry(Base):
+    __tablename__ = 'entries'
+
+    id = Column(Integer, primary_key=True)
+    updated_at = Column(DateTime, nullable=False)
+
+
+class CursorTestCase(unittest.TestCase):
+    def test_round_trip(self):
+        values = [datetime(2026, 3, 1, 12, 30, 15, 250), 'Gros Œuvre', 42]
+        self.assertEqual(decode_cursor(encode_cursor(values), 3), values)
+
+    def test_malformed(self):
+        self.assertIsNone(decode_cursor('!!!', 2))
+        self.assertIsNone(decode_cursor(encode_cursor([1]), 2))
+        self.assertIsNone(decode_cursor(encode_cursor([None, 1]), 2))
+
+
+class KeysetPaginateTestCase(unittest.TestCase):
+    def setUp(self):
+        engine = create_engine('sqlite://')
+        Base.metadata.create_all(engine)
+        self.session = Session(engine)
+        start = datetime(2026, 1, 1)
+        # Several rows share each timestamp, the id breaks the ties
+        self.session.add_all(Entry(id=i, updated_at=start + timedelta(minutes=i // 4)) for i in range(1, 24))
+        self.session.commit()
+
+    def tearDown(self):
+        self.session.close()
+
+    def test_walks_every_row_once(self):
+        keys = [Entry.updated_at, Entry.id]
+        seen = []
+        cursor = None
+        while True:
+            page = keyset_paginate(self.session.query(Entry), keys, cursor=cursor, per_page=5, descending=True)
+            seen += [entry.id for entry in page]
+            if not page.has_next:
+                break
+            cursor = page.next_cursor
+
+        self.assertEqual(seen, list(range(23, 0, -1)))
+
+    def test_ascending_filtered(self):
+        query = self.session.query(Entry).filter(Entry.id % 2 == 0)
+        first = keyset_paginate(query, [Entry.updated_at, Entry.id], per_page=4)
+        second = keyset_paginate(query, [Entry.updated_at, Entry.id], cursor=first.next_cursor, per_page=4)
+
+        self.assertEqual([e.id for e in first], [2, 4, 6, 8])
+        self.assertEqual([e.id for e in second], [10, 12, 14, 16])
+        self.assertEqual(second.after, [datetime(2026, 1, 1, 0, 2), 8])
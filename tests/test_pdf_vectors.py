@@ -0,0 +1,62 @@
+import os
+import tempfile
+import unittest
+from PyPDF2 import PdfReader
+from reportlab.pdfgen import canvas
+from algorithms.planar import planar_faces
+from services.pdf_vectors import PDFVectorExtractor
+
+
+class PlanarFacesTestCase(unittest.TestCase):
+    def test_split_snap_and_prune(self):
+        segments = [
+            ((0, 0), (10, 0)), ((10, 0), (10, 10)), ((10, 10), (0, 10)), ((0, 10), (0, 0)),
+            # Partition stopping just short of the bottom wall
+            ((4, 0.3), (4, 10)),
+            # T-junction overshooting the right wall
+            ((4, 5), (10.2, 5)),
+            # Dangling stroke
+            ((2, 2), (3, 3)),
+        ]
+        faces = planar_faces(segments, tolerance=0.5)
+
+        self.assertEqual(sorted(round(face.area) for face in faces), [30, 30, 40])
+        self.assertTrue(all(len(face.points) == 4 for face in faces))
+
+    def test_nested_outline_is_a_hole(self):
+        outer = [((0, 0), (10, 0)), ((10, 0), (10, 10)), ((10, 10), (0, 10)), ((0, 10), (0, 0))]
+        inner = [((1, 1), (9, 1)), ((9, 1), (9, 9)), ((9, 9), (1, 9)), ((1, 9), (1, 1))]
+        faces = sorted(planar_faces(outer + inner, tolerance=0.1), key=lambda face: len(face.holes))
+
+        self.assertAlmostEqual(faces[0].area, 64.0)
+        # The band between the outlines, net of the inner square
+        self.assertEqual(len(faces[1].holes), 1)
+        self.assertAlmostEqual(faces[1].area, 100.0 - 64.0)
+
+
+class PDFVectorExtractorTestCase(unittest.TestCase):
+    def test_rooms_between_double_walls(self):
+        handle, path = tempfile.mkstemp(suffix='.pdf')
+        os.close(handle)
+        self.addCleanup(os.remove, path)
+
+        pdf = canvas.Canvas(path, pagesize=(842, 595))
+        # Outer walls as two outlines, one double-line partition
+        pdf.rect(100, 100, 300, 200)
+        pdf.rect(106, 106, 288, 188)
+        pdf.line(200, 106, 200, 294)
+        pdf.line(206, 106, 206, 294)
+        pdf.drawString(130, 200, 'Chambre')
+        pdf.save()
+
+        extractor = PDFVectorExtractor(PdfReader(path).pages[0], dpi=72)
+        rooms = extractor.candidate_rooms()
+
+        self.assertEqual([room['name'] for room in rooms], ['Chambre', 'Pièce 2'])
+        xs = sorted({point['x'] for point in rooms[0]['polygon']})
+        ys = sorted({point['y'] for point in rooms[0]['polygon']})
+        self.assertEqual((xs, ys), ([106.0, 200.0], [301.0, 489.0]))
+
+
+if __name__ == '__main__':
+    unittest.main()
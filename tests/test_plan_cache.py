@@ -0,0 +1,78 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from unittest import mock
+from PIL import Image
+from services.plan_cache import PlanCache
+from services.plan_reader import PlanReader
+
+
+class PlanCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cache = PlanCache(root=os.path.join(self.directory, 'cache'), max_bytes=10 * 1024 * 1024)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def make_plan(self, name, size=(400, 300)):
+        path = os.path.join(self.directory, name)
+        Image.new('RGB', size, 'white').save(path, 'PNG')
+        return path
+
+    def test_analysis_shared_by_content(self):
+        first = self.make_plan('a.png')
+        copy = os.path.join(self.directory, 'copy.png')
+        shutil.copy(first, copy)
+
+        result = PlanReader(first, cache=self.cache).analyze()
+        self.assertTrue(result['success'])
+
+        with mock.patch.object(PlanReader, '_analyze_image') as analyze_image:
+            reader = PlanReader(copy, cache=self.cache)
+            cached = reader.analyze()
+            self.assertEqual(cached['recommendations'], result['recommendations'])
+            analyze_image.assert_not_called()
+        self.assertEqual(reader.dimensions['width'], 400)
+
+    def test_tiles_rendered_once(self):
+        path = self.make_plan('a.png', size=(600, 300))
+        digest = self.cache.file_hash(path)
+
+        manifest = self.cache.tiles(digest, path)
+        self.assertEqual(manifest['hash'], digest)
+        self.assertEqual(manifest['pages'][0]['max_zoom'], 2)
+        self.assertTrue(os.path.isfile(os.path.join(self.cache.tiles_dir(digest), '0', '0', '0_0.png')))
+
+        with mock.patch('services.plan_cache.PlanRasterizer') as rasterizer:
+            self.assertEqual(self.cache.tiles(digest, path), manifest)
+            rasterizer.assert_not_called()
+
+    def test_eviction_by_size_keeps_recent_entries(self):
+        self.cache.max_bytes = 1500
+        for index, digest in enumerate(('aa' + '0' * 62, 'bb' + '0' * 62, 'cc' + '0' * 62)):
+            self.cache.store(digest, 'blob', lambda path: open(path, 'wb').write(b'x' * 600))
+            os.utime(self.cache.entry_dir(digest), (time.time() + index, time.time() + index))
+
+        self.cache.evict()
+        self.assertIsNone(self.cache.get('aa' + '0' * 62, 'blob'))
+        self.assertIsNotNone(self.cache.get('cc' + '0' * 62, 'blob'))
+
+    def test_tree_walked_once_the_budget_is_exceeded(self):
+        write = lambda path: open(path, 'wb').write(b'x' * 600)
+        self.cache.store('aa' + '0' * 62, 'blob', write)
+
+        with mock.patch.object(self.cache, 'evict') as evict:
+            for index in range(5):
+                self.cache.store('bb' + '0' * 62, f'blob_{index}', write)
+            evict.assert_not_called()
+
+            self.cache.max_bytes = 4000
+            self.cache.store('bb' + '0' * 62, 'blob_5', write)
+            evict.assert_called_once()
+
+
+if __name__ == '__main__':
+    unittest.main()
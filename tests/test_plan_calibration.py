@@ -0,0 +1,95 @@
+import unittest
+from decimal import Decimal
+from flask import Flask
+from flask_login import LoginManager
+from models import db, Company, User, Project, ProjectType, ProjectTypology, ProjectPlan, Room, Measurement
+from routes import register_blueprints
+
+
+SQUARE = [{'x': 0, 'y': 0}, {'x': 100, 'y': 0}, {'x': 100, 'y': 100}, {'x': 0, 'y': 100}]
+
+
+class PlanCalibrationTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+        self.app.secret_key = 'test'
+        db.init_app(self.app)
+        login_manager = LoginManager(self.app)
+        login_manager.user_loader(lambda user_id: db.session.get(User, int(user_id)))
+        register_blueprints(self.app)
+        self.context = self.app.app_context()
+        self.context.push()
+        db.create_all()
+
+        company = Company(name='Test', slug='test', country='MA')
+        db.session.add(company)
+        db.session.flush()
+        user = User(company_id=company.id, email='owner@test.ma', password_hash='x', is_company_owner=True)
+        project = Project(company_id=company.id, name='Villa', project_type=ProjectType.CONSTRUCTION,
+                          typology=ProjectTypology.VILLA)
+        db.session.add_all([user, project])
+        db.session.flush()
+        self.plan = ProjectPlan(project_id=project.id, name='RDC', file_path='plan.png')
+        db.session.add(self.plan)
+        db.session.flush()
+
+        self.room = Room(project_id=project.id, plan_id=self.plan.id, name='Séjour', area=Decimal('1'),
+                         perimeter=Decimal('4'), polygon_data=SQUARE, pixel_space='plan')
+        self.canvas_room = Room(project_id=project.id, plan_id=self.plan.id, name='Cuisine', area=Decimal('7'),
+                                polygon_data=SQUARE, pixel_space='canvas')
+        db.session.add_all([self.room, self.canvas_room])
+        db.session.flush()
+        self.linear = Measurement(plan_id=self.plan.id, room_id=self.room.id, measurement_type='linear', unit='ml',
+                                  quantity=Decimal('1'), polygon_data=SQUARE[:3], pixel_space='plan')
+        self.count = Measurement(plan_id=self.plan.id, measurement_type='count', unit='u', quantity=Decimal('3'),
+                                 polygon_data=SQUARE[:1], pixel_space='plan')
+        db.session.add_all([self.linear, self.count])
+        db.session.commit()
+
+        self.client = self.app.test_client()
+        with self.client.session_transaction() as session:
+            session['_user_id'] = str(user.id)
+            session['_fresh'] = True
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.context.pop()
+
+    def calibrate(self, **data):
+        return self.client.post(f'/api/plans/{self.plan.id}/calibrate', json=data)
+
+    def test_calibration_remeasures_the_plan_space(self):
+        # 100 plan pixels for 5 m
+        response = self.calibrate(point1={'x': 0, 'y': 0}, point2={'x': 0, 'y': 100}, real_distance=5,
+                                  pixel_space='plan')
+
+        self.assertEqual(response.status_code, 200)
+        result = response.get_json()
+        self.assertEqual(result['scale_factor'], 0.05)
+        self.assertEqual(result['rooms'], [{
+            'id': self.room.id, 'name': 'Séjour',
+            'old_area': 1.0, 'area': 25.0, 'delta_area': 24.0,
+            'old_perimeter': 4.0, 'perimeter': 20.0, 'delta_perimeter': 16.0
+        }])
+        self.assertEqual((result['measurements_updated'], result['skipped']), (1, 1))
+
+        db.session.expire_all()
+        self.assertEqual((self.room.area, self.room.perimeter), (Decimal('25.00'), Decimal('20.00')))
+        # Traced in the other pixel space, or not derived from geometry: left as they are
+        self.assertEqual(self.canvas_room.area, Decimal('7.00'))
+        self.assertEqual(self.linear.quantity, Decimal('10.0000'))
+        self.assertEqual(self.count.quantity, Decimal('3.0000'))
+        self.assertTrue(self.plan.is_calibrated)
+        self.assertEqual(self.plan.calibration_data['pixel_space'], 'plan')
+
+    def test_invalid_calibration_left_unsaved(self):
+        self.assertEqual(self.calibrate(point1={'x': 0, 'y': 0}, point2={'x': 0, 'y': 100},
+                                        real_distance=5, pixel_space='ecran').status_code, 400)
+        self.assertEqual(self.calibrate(point1={'x': 1, 'y': 1}, point2={'x': 1, 'y': 1},
+                                        real_distance=5).get_json(), {'error': 'Distance pixels invalide'})
+
+        db.session.expire_all()
+        self.assertFalse(self.plan.is_calibrated)
+        self.assertEqual(self.room.area, Decimal('1.00'))
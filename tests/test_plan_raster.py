@@ -0,0 +1,33 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+from PIL import Image
+from services.plan_raster import PlanRasterizer, build_pyramid
+
+
+class PlanRasterTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_pyramid_of_a_downscaled_render(self):
+        # A 2048 x 1024 page rendered at a quarter of its resolution
+        pyramid = build_pyramid(Image.new('RGB', (512, 256), 'white'), self.directory, 256, size=(2048, 1024))
+
+        self.assertEqual(pyramid, {'width': 2048, 'height': 1024, 'max_zoom': 3, 'top_zoom': 1})
+        self.assertEqual(sorted(os.listdir(self.directory)), ['0', '1'])
+        self.assertEqual(sorted(os.listdir(os.path.join(self.directory, '1'))), ['0_0.png', '1_0.png'])
+
+    def test_pdf_rendering_errors_raised(self):
+        path = os.path.join(self.directory, 'plan.pdf')
+        open(path, 'wb').close()
+        rasterizer = PlanRasterizer(path, output_dir=os.path.join(self.directory, 'tiles'))
+
+        with mock.patch.dict('sys.modules', {'pdf2image': mock.Mock()}), \
+                mock.patch('services.plan_raster._render_pdf_page', side_effect=MemoryError('page trop grande')):
+            with self.assertRaises(MemoryError):
+                rasterizer.render(page_count=1)
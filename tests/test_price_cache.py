@@ -0,0 +1,43 @@
+import unittest
+from unittest import mock
+from services.price_cache import PriceBookCache
+
+
+class PriceBookCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        self.cache = PriceBookCache(max_entries=2, ttl=60)
+
+    def test_hit_and_stamp_mismatch(self):
+        self.cache.set((1, 10, 'unit_price_standard'), 'book', stamp=(3, None))
+        self.assertEqual(self.cache.get((1, 10, 'unit_price_standard'), stamp=(3, None)), 'book')
+
+        # A write committed elsewhere changes the stamp and evicts the entry
+        self.assertIsNone(self.cache.get((1, 10, 'unit_price_standard'), stamp=(4, None)))
+        self.assertIsNone(self.cache.get((1, 10, 'unit_price_standard'), stamp=(3, None)))
+
+    def test_lru_eviction(self):
+        self.cache.set((1, 10, 'a'), 'a')
+        self.cache.set((1, 10, 'b'), 'b')
+        self.cache.get((1, 10, 'a'))
+        self.cache.set((1, 10, 'c'), 'c')
+
+        self.assertEqual(self.cache.get((1, 10, 'a')), 'a')
+        self.assertIsNone(self.cache.get((1, 10, 'b')))
+
+    def test_ttl_expiry(self):
+        with mock.patch('services.price_cache.time.monotonic', return_value=0):
+            self.cache.set((1, 10, 'a'), 'a')
+        with mock.patch('services.price_cache.time.monotonic', return_value=61):
+            self.assertIsNone(self.cache.get((1, 10, 'a')))
+
+    def test_invalidation(self):
+        self.cache.set((1, 10, 'a'), 'a')
+        self.cache.set((2, 10, 'a'), 'b')
+
+        self.cache.invalidate(1)
+        self.assertIsNone(self.cache.get((1, 10, 'a')))
+        self.assertEqual(self.cache.get((2, 10, 'a')), 'b')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+import unittest
+from decimal import Decimal
+from flask import Flask
+from models import (
+    db, Company, PricingTier, BPULibrary, BPUArticle, CompanyBPUOverride, CompanyBPUArticle,
+    Project, ProjectType, ProjectTypology, Room, QuestionTemplate, ProjectAnswer, QuoteVersion
+)
+from services.price_cache import price_book_cache
+from services.price_resolver import PriceResolver
+from services.quote_generator import QuoteGenerator
+
+
+class PriceResolverTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+        db.init_app(self.app)
+        self.context = self.app.app_context()
+        self.context.push()
+        db.create_all()
+        price_book_cache.clear()
+
+        self.library = BPULibrary(country='MA', version='2025.1', name='Maroc')
+        self.company = Company(name='Test', slug='test', country='MA')
+        db.session.add_all([self.library, self.company])
+        db.session.flush()
+
+        self.articles = {}
+        for code, designation, price in [
+            ('GO-FOND', 'Fondations', '340'),
+            ('GO-MUR', 'Murs', '450'),
+            ('SO-ELEC', 'Électricité', '60'),
+            ('SO-SOL-PARQ', 'Parquet', '200'),
+        ]:
+            self.articles[code] = BPUArticle(library_id=self.library.id, code=code, category='Divers',
+                                             designation=designation, unit='m²', unit_price_standard=Decimal(price))
+        db.session.add_all(self.articles.values())
+        db.session.flush()
+
+        db.session.add_all([
+            CompanyBPUArticle(company_id=self.company.id, code='GO-FOND', category='Divers',
+                              designation='Fondations maison', unit='m²', unit_price_standard=Decimal('999')),
+            CompanyBPUArticle(company_id=self.company.id, code='SO-PLOMB', category='Divers',
+                              designation='Plomberie archivée', unit='m²', unit_price_standard=Decimal('1'),
+                              is_active=False),
+            CompanyBPUOverride(company_id=self.company.id, article_id=self.articles['GO-MUR'].id,
+                               designation_override='Murs porteurs', unit_price_standard=Decimal('500')),
+            CompanyBPUOverride(company_id=self.company.id, article_id=self.articles['SO-ELEC'].id, is_disabled=True),
+        ])
+        db.session.commit()
+
+    def tearDown(self):
+        price_book_cache.clear()
+        db.session.remove()
+        db.drop_all()
+        self.context.pop()
+
+    def test_custom_article_then_override_then_library(self):
+        prices = PriceResolver(self.company, library=self.library).resolve(
+            ['GO-FOND', 'GO-MUR', 'SO-ELEC', 'SO-SOL-PARQ', 'SO-PLOMB']
+        )
+
+        self.assertEqual(prices['GO-FOND'].base_price, Decimal('999'))
+        self.assertIsNone(prices['GO-FOND'].article_id)
+        self.assertIsNotNone(prices['GO-FOND'].custom_article_id)
+        self.assertEqual((prices['GO-MUR'].base_price, prices['GO-MUR'].designation), (Decimal('500'), 'Murs porteurs'))
+        # Disabled: the article is kept, its price left to the caller's default
+        self.assertEqual((prices['SO-ELEC'].base_price, prices['SO-ELEC'].article_id),
+                         (None, self.articles['SO-ELEC'].id))
+        self.assertEqual(prices['SO-SOL-PARQ'].base_price, Decimal('200'))
+        self.assertNotIn('SO-PLOMB', prices)
+
+    def test_generated_lines_use_the_resolved_prices(self):
+        tier = PricingTier(company_id=self.company.id, name='Standard', code='STD', coefficient=Decimal('1.5'),
+                           is_default=True)
+        project = Project(company_id=self.company.id, name='Villa', project_type=ProjectType.RENOVATION,
+                          typology=ProjectTypology.VILLA)
+        question = QuestionTemplate(code='floor_type', category='Sols', question_text='Sol ?', question_type='select')
+        db.session.add_all([tier, project, question])
+        db.session.flush()
+        db.session.add_all([
+            Room(project_id=project.id, name='Séjour', area=Decimal('10')),
+            ProjectAnswer(project_id=project.id, question_id=question.id, answer_value='parquet'),
+        ])
+        db.session.commit()
+
+        generator = QuoteGenerator(project, tier=tier,
+                                   prices=PriceResolver(self.company, library=self.library).resolve(QuoteGenerator.ARTICLE_CODES))
+        generator.build(QuoteVersion(vat_rate=generator.vat_rate))
+        lines = {line.designation: (line.article_id, line.unit_price) for line in generator.lines}
+
+        self.assertEqual(lines['Parquet'], (self.articles['SO-SOL-PARQ'].id, Decimal('300.0')))
+        # Disabled override and missing article: default prices, with the coefficient
+        self.assertEqual(lines['Électricité'], (self.articles['SO-ELEC'].id, Decimal('82.5')))
+        self.assertEqual(lines['Plomberie et sanitaires (ratio)'], (None, Decimal('67.5')))
@@ -0,0 +1,82 @@
+import unittest
+from decimal import Decimal
+from flask import Flask
+from sqlalchemy import event
+from models import (
+    db, Company, Project, ProjectType, ProjectTypology, ProjectPlan, Room, Measurement,
+    QuestionTemplate, ProjectAnswer
+)
+from services.project_snapshot import ProjectSnapshot
+
+
+class ProjectSnapshotTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+        db.init_app(self.app)
+        self.context = self.app.app_context()
+        self.context.push()
+        db.create_all()
+
+        company = Company(name='Test', slug='test', country='MA')
+        db.session.add(company)
+        db.session.flush()
+        self.projects = [
+            Project(company_id=company.id, name=name, project_type=project_type, typology=ProjectTypology.VILLA)
+            for name, project_type in (('Villa', ProjectType.CONSTRUCTION), ('Appartement', ProjectType.RENOVATION))
+        ]
+        question = QuestionTemplate(code='floor_type', category='Sols', question_text='Sol ?', question_type='select')
+        db.session.add_all([*self.projects, question])
+        db.session.flush()
+
+        villa, flat = self.projects
+        plan = ProjectPlan(project_id=villa.id, name='RDC', file_path='plan.png')
+        living, kitchen = Room(project_id=villa.id, name='Séjour', area=Decimal('30')), \
+            Room(project_id=villa.id, name='Cuisine', area=Decimal('12'))
+        db.session.add_all([plan, living, kitchen, Room(project_id=flat.id, name='Chambre', area=Decimal('9'))])
+        db.session.flush()
+        db.session.add_all([
+            Measurement(plan_id=plan.id, room_id=living.id, measurement_type='area', unit='m²', quantity=Decimal('30')),
+            Measurement(plan_id=plan.id, room_id=living.id, measurement_type='linear', unit='ml', quantity=Decimal('22')),
+            Measurement(plan_id=plan.id, room_id=None, measurement_type='count', unit='u', quantity=Decimal('1')),
+            ProjectAnswer(project_id=villa.id, question_id=question.id, answer_value='carrelage'),
+            ProjectAnswer(project_id=villa.id, question_id=question.id, room_id=kitchen.id, answer_value='marbre',
+                          answer_data={'finish': 'poli'}),
+        ])
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.context.pop()
+
+    def test_projects_loaded_in_three_queries(self):
+        # Refresh the committed projects first, only the snapshot queries are counted
+        for project in self.projects:
+            db.session.refresh(project)
+        statements = []
+        listener = lambda conn, cursor, statement, *args: statements.append(statement)
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            snapshots = ProjectSnapshot.load_many(self.projects)
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+        self.assertEqual(len(statements), 3)
+
+        villa, flat = (snapshots[project.id] for project in self.projects)
+        self.assertEqual((villa.project_type, flat.project_type), ('construction', 'renovation'))
+        self.assertEqual([(room.name, room.area) for room in villa.rooms],
+                         [('Séjour', Decimal('30.00')), ('Cuisine', Decimal('12.00'))])
+        self.assertEqual([m.measurement_type for m in villa.rooms[0].measurements], ['area', 'linear'])
+        # Measurements outside a room are not linked to the project
+        self.assertEqual(len(villa.measurements), 2)
+        self.assertEqual([room.name for room in flat.rooms], ['Chambre'])
+        self.assertEqual(flat.answers, ())
+
+        # The room-level answer comes last and wins
+        self.assertEqual(villa.answers_by_code['floor_type'].answer_value, 'marbre')
+        with self.assertRaises(TypeError):
+            villa.answers_by_code['floor_type'].answer_data['finish'] = 'mat'
+
+    def test_empty(self):
+        self.assertEqual(ProjectSnapshot.load_many([]), {})
@@ -0,0 +1,22 @@
+import unittest
+from sqlalchemy import create_engine, text
+from models import db
+from utils.query_plans import sequential_scans
+
+
+class SequentialScansTestCase(unittest.TestCase):
+    def setUp(self):
+        self.engine = create_engine('sqlite://')
+        db.metadata.create_all(self.engine)
+
+    def tearDown(self):
+        self.engine.dispose()
+
+    def test_declared_indexes_serve_hot_queries(self):
+        self.assertEqual(sequential_scans(self.engine), [])
+
+    def test_missing_index_is_flagged(self):
+        with self.engine.begin() as connection:
+            connection.execute(text('DROP INDEX ix_rooms_project'))
+
+        self.assertEqual(sequential_scans(self.engine), [('pièces du projet', 'rooms')])
@@ -0,0 +1,107 @@
+import unittest
+from decimal import Decimal
+from flask import Flask
+from models import (
+    db, Company, Project, ProjectType, ProjectTypology, Quote, QuoteVersion, QuoteLine, QuoteAssumption
+)
+
+
+class QuoteVersionTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+        db.init_app(self.app)
+        self.context = self.app.app_context()
+        self.context.push()
+        db.create_all()
+
+        company = Company(name='Test', slug='test', country='MA')
+        db.session.add(company)
+        db.session.flush()
+        project = Project(company_id=company.id, name='Villa', project_type=ProjectType.CONSTRUCTION,
+                          typology=ProjectTypology.VILLA)
+        db.session.add(project)
+        db.session.flush()
+        self.quote = Quote(project_id=project.id, company_id=company.id, reference='DEV-2026-0001')
+        db.session.add(self.quote)
+        db.session.flush()
+        self.version = QuoteVersion(quote_id=self.quote.id, version_number=1, vat_rate=Decimal('10'))
+        db.session.add(self.version)
+        db.session.flush()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.context.pop()
+
+    def add_line(self, designation, quantity, unit_price, sort_order=0):
+        line = QuoteLine(version_id=self.version.id, category='Gros Œuvre', designation=designation, unit='m²',
+                         quantity=Decimal(quantity), unit_price=Decimal(unit_price),
+                         total_price=Decimal(quantity) * Decimal(unit_price), quantity_source='room',
+                         sort_order=sort_order)
+        db.session.add(line)
+        db.session.flush()
+        self.version.apply_line_delta(line.total_price)
+        return line
+
+    def test_line_deltas_match_the_lines(self):
+        first = self.add_line('Fondations', '12.5', '340.00')
+        self.add_line('Murs', '40', '350.00')
+        db.session.commit()
+        self.assertEqual((self.version.subtotal_ht, self.version.vat_amount, self.version.total_ttc),
+                         (Decimal('18250.00'), Decimal('1825.00'), Decimal('20075.00')))
+
+        # Edited and removed lines shift the totals by their delta
+        delta = Decimal('10') * first.unit_price - first.total_price
+        first.quantity, first.total_price = Decimal('10'), Decimal('10') * first.unit_price
+        self.version.apply_line_delta(delta)
+        self.assertEqual(QuoteVersion.verify_totals(), [])
+        db.session.delete(first)
+        self.version.apply_line_delta(-first.total_price)
+        db.session.commit()
+        self.assertEqual(QuoteVersion.verify_totals(), [])
+        self.assertEqual(self.version.total_ttc, Decimal('15400.00'))
+
+    def test_drift_reported_and_recalculated(self):
+        line = self.add_line('Fondations', '1', '100.00')
+        # Written without its delta
+        line.total_price = Decimal('150.00')
+        db.session.commit()
+
+        self.assertEqual(QuoteVersion.verify_totals(), [(self.version.id, Decimal('100.00'), Decimal('150.00'))])
+        self.assertEqual(QuoteVersion.recalculate_totals([self.version.id]), 1)
+        db.session.commit()
+        self.assertEqual(QuoteVersion.verify_totals(), [])
+        self.assertEqual(self.version.total_ttc, Decimal('165.00'))
+
+    def test_clone_copies_lines_assumptions_and_totals(self):
+        self.add_line('Fondations', '12.5', '340.00')
+        self.add_line('Murs', '40', '350.00', sort_order=1)
+        db.session.add(QuoteAssumption(version_id=self.version.id, category='Général', description='Hauteur',
+                                       value='2.80 m', is_confirmed=True, source='answer'))
+        db.session.commit()
+
+        clone = self.version.clone(2, created_by_id=None)
+        db.session.commit()
+        db.session.expire_all()
+
+        def lines(version):
+            return [(line.designation, line.quantity, line.unit_price, line.total_price, line.quantity_source,
+                     line.sort_order) for line in version.lines]
+
+        self.assertEqual(lines(clone), lines(self.version))
+        self.assertEqual([(a.description, a.value, a.is_confirmed, a.source) for a in clone.assumptions],
+                         [('Hauteur', '2.80 m', True, 'answer')])
+        self.assertEqual((clone.subtotal_ht, clone.vat_amount, clone.total_ttc, clone.vat_rate),
+                         (Decimal('18250.00'), Decimal('1825.00'), Decimal('20075.00'), Decimal('10.00')))
+        self.assertEqual(QuoteVersion.verify_totals([clone.id]), [])
+
+    def test_clone_starts_without_discount_or_margin(self):
+        self.version.discount_percentage = Decimal('5')
+        self.version.margin_percentage = Decimal('12')
+        db.session.commit()
+
+        clone = self.version.clone(2, created_by_id=None)
+        db.session.commit()
+        db.session.expire_all()
+        self.assertEqual((clone.discount_percentage, clone.discount_amount, clone.margin_percentage), (0, 0, 0))
@@ -1,4 +1,8 @@
 from utils.formatters import format_currency, format_number, format_date
 from utils.validators import validate_email, validate_phone
+from utils.pagination import KeysetPage, keyset_paginate, keyset_query, encode_cursor, decode_cursor
 
-__all__ = ['format_currency', 'format_number', 'format_date', 'validate_email', 'validate_phone']
+__all__ = [
+    'format_currency', 'format_number', 'format_date', 'validate_email', 'validate_phone',
+    'KeysetPage', 'keyset_paginate', 'keyset_query', 'encode_cursor', 'decode_cursor'
+]
@@ -0,0 +1,114 @@
+import base64
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from sqlalchemy import literal, tuple_
+
+
+DEFAULT_PER_PAGE = 50
+MAX_PER_PAGE = 200
+
+
+class KeysetPage:
+    """
+    One page of a keyset listing, the cursor of the next one and `after`,
+    the key values the page starts after (None on the first page).
+    """
+
+    def __init__(self, items, next_cursor=None, after=None):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.after = after
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    def __bool__(self):
+        return bool(self.items)
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {'dt': value.isoformat()}
+    if isinstance(value, date):
+        return {'d': value.isoformat()}
+    if isinstance(value, Decimal):
+        return {'n': str(value)}
+    return value
+
+
+def _decode_value(value):
+    if isinstance(value, dict):
+        if 'dt' in value:
+            return datetime.fromisoformat(value['dt'])
+        if 'd' in value:
+            return date.fromisoformat(value['d'])
+        if 'n' in value:
+            return Decimal(value['n'])
+        raise ValueError('valeur de curseur inconnue')
+    return value
+
+
+def encode_cursor(values):
+    payload = json.dumps([_encode_value(v) for v in values], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, length):
+    """Key values of a cursor, or None when it is malformed or does not fit the keys."""
+    if not cursor:
+        return None
+    try:
+        payload = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        values = [_decode_value(v) for v in json.loads(payload)]
+    except (ValueError, TypeError):
+        return None
+    if len(values) != length or any(v is None for v in values):
+        return None
+    return values
+
+
+def keyset_query(query, keys, values=None, descending=False):
+    """
+    Orders `query` (a Query or a select) by `keys` and, given the key values
+    of the last row seen, keeps the rows after it with a row value
+    comparison, (a, b, id) > (:a, :b, :id), which an index on the same
+    columns answers without skipping the rows of the previous pages.
+    """
+    if values is not None:
+        bound = tuple_(*(literal(value, type_=key.type) for key, value in zip(keys, values)))
+        query = query.filter(tuple_(*keys) < bound if descending else tuple_(*keys) > bound)
+    return query.order_by(*(key.desc() if descending else key.asc() for key in keys))
+
+
+def keyset_paginate(query, keys, cursor=None, per_page=DEFAULT_PER_PAGE, descending=False):
+    """
+    Pages through `query` by the values of `keys` instead of an OFFSET.
+
+    `keys` are column expressions sorted in the same direction, the last
+    one unique (the primary key), none of them NULL. No COUNT is run, and a
+    malformed cursor restarts the listing.
+
+    Returns a KeysetPage of the query entities; `next_cursor` is None on the
+    last page.
+    """
+    per_page = max(1, min(per_page or DEFAULT_PER_PAGE, MAX_PER_PAGE))
+
+    values = decode_cursor(cursor, len(keys))
+    rows = keyset_query(query.add_columns(*keys), keys, values, descending)\
+        .limit(per_page + 1)\
+        .all()
+
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        next_cursor = encode_cursor(rows[-1][1:])
+
+    return KeysetPage([row[0] for row in rows], next_cursor, values)
@@ -0,0 +1,92 @@
+import re
+from datetime import datetime
+from sqlalchemy import select, text
+from models import Project, ProjectPlan, Room, Measurement, Quote, QuoteLine, AuditLog, BPUArticle, BPUCategoryFacet
+from utils.pagination import DEFAULT_PER_PAGE, keyset_query
+
+
+SQLITE_SCAN = re.compile(r'^SCAN (\w+)$')
+
+
+def hot_queries(company_id=1, project_id=1, plan_id=1, version_id=1, library_id=1):
+    """
+    (name, select) of the queries run on every page of the listings and
+    editors, shaped like the routes build them. Only the plan is looked at,
+    the ids do not need to exist.
+    """
+    limit = DEFAULT_PER_PAGE + 1
+    after = datetime(2000, 1, 1)
+
+    projects = select(Project).where(Project.company_id == company_id)
+    project_keys = [Project.updated_at, Project.id]
+    quotes = select(Quote).join(Project).where(Quote.company_id == company_id)
+    quote_keys = [Quote.updated_at, Quote.id]
+    logs = select(AuditLog).where(AuditLog.company_id == company_id)
+    log_keys = [AuditLog.created_at, AuditLog.id]
+    articles = select(BPUArticle).where(BPUArticle.library_id == library_id)
+
+    return [
+        ('projects.index', keyset_query(projects, project_keys, descending=True).limit(limit)),
+        ('projects.index (suite)', keyset_query(projects, project_keys, [after, 1], descending=True).limit(limit)),
+        ('quotes.index', keyset_query(quotes, quote_keys, descending=True).limit(limit)),
+        ('quotes.index (suite)', keyset_query(quotes, quote_keys, [after, 1], descending=True).limit(limit)),
+        ('admin.audit_log', keyset_query(logs, log_keys, descending=True).limit(limit)),
+        ('admin.audit_log (suite)', keyset_query(logs, log_keys, [after, 1], descending=True).limit(limit)),
+        ('bpu.index', keyset_query(articles, BPUArticle.listing_keys()).limit(limit)),
+        ('bpu.index (suite)', keyset_query(articles, BPUArticle.listing_keys(), ['A', 0, 1]).limit(limit)),
+        ('catégories BPU', select(BPUCategoryFacet).where(
+            (BPUCategoryFacet.library_id == library_id) | (BPUCategoryFacet.company_id == company_id)
+        )),
+        ('quotes.view (historique)', select(AuditLog).where(
+            AuditLog.entity_type == 'quote', AuditLog.entity_id == project_id
+        ).order_by(AuditLog.created_at.desc())),
+        ('plans du projet', select(ProjectPlan).where(ProjectPlan.project_id == project_id)),
+        ('pièces du projet', select(Room).where(Room.project_id == project_id)),
+        ('pièces du plan', select(Room).where(Room.plan_id == plan_id)),
+        ('métrés du plan', select(Measurement).where(Measurement.plan_id == plan_id)),
+        ('lignes de devis', select(QuoteLine).where(QuoteLine.version_id == version_id).order_by(QuoteLine.sort_order)),
+    ]
+
+
+def _plan_nodes(node):
+    yield node
+    for child in node.get('Plans', []):
+        yield from _plan_nodes(child)
+
+
+def sequential_scans(engine, queries=None):
+    """
+    (query name, table) of the hot queries planned with a full scan of a
+    table, on SQLite and PostgreSQL.
+
+    On PostgreSQL sequential scans are disabled for the check, so one left
+    in the plan means no index can serve the query, however small the
+    table is in this database.
+    """
+    queries = hot_queries() if queries is None else queries
+    flagged = []
+
+    with engine.connect() as connection:
+        dialect = connection.dialect.name
+        if dialect not in ('sqlite', 'postgresql'):
+            raise ValueError(f"Dialecte non pris en charge: {dialect}")
+        if dialect == 'postgresql':
+            # Rolled back with the connection
+            connection.execute(text('SET LOCAL enable_seqscan = off'))
+
+        for name, statement in queries:
+            sql = str(statement.compile(dialect=connection.dialect, compile_kwargs={'literal_binds': True}))
+
+            if dialect == 'postgresql':
+                plan = connection.execute(text(f'EXPLAIN (FORMAT JSON) {sql}')).scalar()[0]['Plan']
+                flagged += [
+                    (name, node['Relation Name'])
+                    for node in _plan_nodes(plan) if node['Node Type'] == 'Seq Scan'
+                ]
+            else:
+                for row in connection.execute(text(f'EXPLAIN QUERY PLAN {sql}')):
+                    match = SQLITE_SCAN.match(row[-1])
+                    if match:
+                        flagged.append((name, match.group(1)))
+
+    return flagged